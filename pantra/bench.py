@@ -0,0 +1,528 @@
+"""Micro benchmarks of the rendering pipeline
+
+Run them with management CLI::
+
+    pantra bench.delta rows=200
+    pantra bench.eval rows=1000
+    pantra bench.instantiate component=DataTable
+    pantra bench.encode nodes=1000
+    pantra bench.codecs app=test5
+    pantra bench.resend depth=20
+    pantra bench.static count=100
+    pantra bench.shot entries=100000
+"""
+from __future__ import annotations
+
+import linecache
+import tempfile
+import time
+import typing
+from pathlib import Path
+
+if typing.TYPE_CHECKING:
+    from typing import *
+
+__all__ = ['bench_delta', 'bench_eval', 'bench_instantiate', 'bench_encode', 'bench_codecs', 'bench_resend', 'bench_static',
+           'bench_shot']
+
+EVAL_TEMPLATE = """\
+<table>
+{{#for row in rows #row['id']}}
+<tr class:odd="{row['id'] % 2}" data:id="{row['id']}" title="Row {row['id']}">
+  <td>{{row['name']}}</td>
+  <td>{{round(row['price'], 2)}}</td>
+  <td>{{row['qty'] * row['price']}}</td>
+  <td>{{'many' if row['qty'] > 3 else 'few'}}</td>
+</tr>
+{{/for}}
+</table>
+"""
+
+UPDATE_TEMPLATE = """\
+<ul class="list">
+{{#for i in range(count) #i}}
+<li class="item" class:odd="{i % 2}" data:id="{i}" title="Item {i}" style="width: {i}px">Item {{i}}</li>
+{{/for}}
+</ul>
+"""
+
+#: nested blocks between elements, the way component contexts and slots nest in MDI windows
+DEEP_TEMPLATE = """\
+<div class="window">
+{{#for w in range(windows) #w}}
+{blocks}<div class="frame" data:id="{w}">
+  <ul>
+  {{#for i in range(count) #i}}
+  {blocks}<li class="item" data:id="{i}">Item {{i}}</li>{ends}
+  {{/for}}
+  </ul>
+</div>{ends}
+{{/for}}
+</div>
+"""
+
+#: cards with mostly static content
+STATIC_TEMPLATE = """\
+<div class="cards">
+{{#for i in range(count) #i}}
+<div class="card" data:id="{i}">
+  <div class="header"><h3>Card title</h3><span class="badge">new</span></div>
+  <ul class="features"><li>Fast</li><li>Small</li><li>Simple</li></ul>
+  <p class="note">The same text for every card, <b>bold</b> and <i>italic</i>.</p>
+  <div class="footer">{{i}}</div>
+</div>
+{{/for}}
+</div>
+"""
+
+#: typical messages from client-side
+INBOUND_MESSAGES = [
+    {'C': 'CLICK', 'method': 'on_click', 'oid': 1234},
+    {'C': 'B', 'v': 'value', 'oid': 1234, 'x': 'typed text'},
+    {'C': 'KEY', 'method': 'on_key', 'oid': 1234, 'key': 'Enter'},
+    {'C': 'DM', 'x': 640, 'y': 480},
+    {'C': 'M', 'oid': 1234, 'box': [10, 20, 300, 40]},
+    {'C': 'WIN', 'oid': 1234, 'start': 200, 'size': 50},
+]
+
+
+def _load_template(source: str):
+    from .components.loader import load
+
+    with tempfile.TemporaryDirectory() as path:
+        filename = Path(path) / 'Bench.html'
+        filename.write_text(source, encoding='utf-8')
+        template = load(filename, print)
+    if template is None:
+        raise RuntimeError('benchmark template failed to load')
+    return template
+
+
+def _collect_macros(template) -> list:
+    from .components.template import MacroCode
+
+    macros = []
+    for node in template.select(lambda _: True):
+        macros.extend(v for v in node.attributes.values() if type(v) is MacroCode)
+        if type(node.content) is MacroCode:
+            macros.append(node.content)
+    return macros
+
+
+def _render_update(app: str | None, nodes: int):
+    """render `Main` component of `app`, or `nodes` list items, and make message to send the whole tree"""
+    from .components.context import Context
+    from .components.render.renderer_html import RendererHTML
+    from .components.shot import ContextShot
+    from .protocol import Messages
+    from .session import Session
+    from .settings import config
+
+    if app is None:
+        RendererHTML.templates['Bench'] = _load_template(UPDATE_TEMPLATE)
+        session = Session('bench', config.DEFAULT_APP, ['en'], {})
+        ctx = Context('Bench', shot=ContextShot(), session=session, locals={'count': nodes})
+    else:
+        session = Session(f'bench-{app}', app, ['en'], {})
+        ctx = Context('Main', shot=ContextShot(), session=session)
+    ctx.renderer.build()
+    return session, Messages.update(list(session.iter_rendered(ctx)))
+
+
+def _measure(func: Callable[[], None], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_delta(rows: int = 200, changed: int = 20, repeat: int = 5) -> dict[str, dict[str, float]]:
+    """measure DataTable refresh message of `rows` rows after `changed` prices are changed, in full and in deltas
+
+    All rendered nodes are sent, the way it is done on refresh. Elements go in full when no state
+    is sent before, otherwise only their changes.
+
+    Returns:
+        by mode: `size` - update message size in bytes, `encode` - update messages per second
+    """
+    from . import serializer as serializer_module
+    from .components.context import Context
+    from .components.render.renderer_html import RendererHTML
+    from .components.shot import ContextShot
+    from .protocol import Messages
+    from .session import Session
+    from .settings import config
+
+    RendererHTML.templates['Bench'] = _load_template('<DataTable data="{rows}" col_id="id"/>')
+    session = Session('bench', config.DEFAULT_APP, ['en'], {})
+    data = [{'id': i, 'name': f'item {i}', 'price': i * 1.5, 'qty': i % 7} for i in range(rows)]
+    ctx = Context('Bench', shot=ContextShot(), session=session, locals={'rows': data})
+    ctx.renderer.build()
+    session.sent_states.clear()
+    serializer_module.serializer.encode(Messages.update(list(session.iter_rendered(ctx))))
+    states = dict(session.sent_states)
+
+    for row in data[::max(rows // changed, 1)][:changed]:
+        row['price'] += 1
+    ctx.renderer.update(ctx, True)
+    ctx.shot.pop()
+    message = Messages.update(list(session.iter_rendered(ctx)))
+
+    def full():
+        session.sent_states.clear()
+        return serializer_module.serializer.encode(message)
+
+    def delta():
+        session.sent_states.update(states)
+        return serializer_module.serializer.encode(message)
+
+    return {
+        'full': {'size': len(full()), 'encode': 1 / _measure(full, repeat)},
+        'delta': {'size': len(delta()), 'encode': 1 / _measure(delta, repeat)},
+    }
+
+
+def bench_eval(rows: int = 1000, repeat: int = 5) -> dict[str, float]:
+    """measure template expression evaluations per second over a loop of `rows` items
+
+    Every expression of the loop body is evaluated once per row, with precompiled macro functions and
+    with plain `eval` the way expressions were evaluated before.
+
+    Returns:
+        evaluations per second by method
+    """
+    from .components.reactdict import ReactDict
+    from .components.template import MacroType
+    from .session import Session
+
+    template = _load_template(EVAL_TEMPLATE)
+    macros = [m for m in _collect_macros(template) if m.type not in (MacroType.ITERATOR, MacroType.INDEX)]
+    items = [{'id': i, 'name': f'item {i}', 'price': i * 1.5, 'qty': i % 7} for i in range(rows)]
+    scope = ReactDict()
+    scope['rows'] = items
+    ctx, this = object(), object()
+
+    def compiled():
+        for row in items:
+            scope['row'] = row
+            for macro in macros:
+                macro.func(ctx, this, scope)
+
+    def evaluated():
+        for row in items:
+            scope['row'] = row
+            for macro in macros:
+                with Session.node_context(this):
+                    if isinstance(macro.code, str):
+                        scope[macro.code]
+                    else:
+                        eval(macro.code, {'ctx': ctx, 'this': this}, scope)
+
+    count = rows * len(macros)
+    return {
+        'compiled': count / _measure(compiled, repeat),
+        'eval': count / _measure(evaluated, repeat),
+    }
+
+
+def bench_instantiate(component: str = 'DataTable', count: int = 2000, repeat: int = 5) -> dict[str, float]:
+    """measure component module executions per second, as done for each new component instance
+
+    The module of the component template and the module generated for it by the in-memory cache builder
+    are executed in fresh locals, with plain `exec` and through the component prototype.
+
+    Returns:
+        executions per second by module and method
+    """
+    from .cached.renderer import RendererJIT
+    from .compiler import Prototype
+    from .components.render.renderer_html import RendererHTML
+    from .settings import config
+
+    template = RendererHTML.collect_template(component, app=config.DEFAULT_APP)
+    python = template and next(template.select(lambda t: t.tag_name == '@python' and t.content), None)
+    if python is None:
+        raise RuntimeError(f'component `{component}` not found or has no code')
+    modules = {
+        'html': (python.content, str(template.filename)),
+    }
+    if (code := RendererJIT.collect_template(component, app=config.DEFAULT_APP)) is not None:
+        modules['jit'] = (''.join(linecache.getlines(code.co_filename)), code.co_filename)
+
+    result = {}
+    for kind, (source, filename) in modules.items():
+        code = compile(source, filename, 'exec')
+        proto = Prototype.make(source, filename)
+
+        def executed():
+            for _ in range(count):
+                exec(code, {})
+
+        def installed():
+            for _ in range(count):
+                proto.install({})
+
+        result[f'{kind} exec'] = count / _measure(executed, repeat)
+        if proto is not None:
+            result[f'{kind} prototype'] = count / _measure(installed, repeat)
+    return result
+
+
+def bench_encode(nodes: int = 1000, repeat: int = 5) -> dict[str, float]:
+    """measure `Messages.update` encoding of rendered `nodes` list items, messages per second
+
+    Elements are encoded in full each time, with the fast encoder and with the reference one
+    writing into a file object.
+
+    Returns:
+        messages per second by encoder
+    """
+    from io import BytesIO
+    from .contrib.bsdf_lite import BsdfLiteSerializer
+    from .serializer import EXTENSIONS
+
+    serializer = BsdfLiteSerializer(EXTENSIONS, compression='bz2')
+    session, message = _render_update(None, nodes)
+
+    def encoded():
+        session.sent_states.clear()
+        return serializer.encode(message)
+
+    def saved():
+        session.sent_states.clear()
+        f = BytesIO()
+        serializer.save(f, message)
+        return f.getvalue()
+
+    if encoded() != saved():
+        raise RuntimeError('encoders output differ')
+    return {
+        'fast': 1 / _measure(encoded, repeat),
+        'reference': 1 / _measure(saved, repeat),
+    }
+
+
+def bench_codecs(app: str | None = None, nodes: int = 1000, repeat: int = 5) -> dict[str, dict[str, float]]:
+    """compare wire codecs on rendered tree of `app`, or `nodes` list items
+
+    Measured on the message sent to client-side after page refresh, and on typical messages from client-side.
+    Codecs with missing modules are skipped.
+
+    Returns:
+        by codec name: `size` of update message in bytes, `compressed` - its size in compressed frame,
+        `encode` - update messages per second, `decode` - client messages per second
+    """
+    from .codecs.bsdf import BsdfCodec
+    from .compression import FrameCompressor
+    from .serializer import EXTENSIONS
+
+    codecs = [BsdfCodec]
+    try:
+        from .codecs.msgpack import MsgpackCodec
+    except ImportError:
+        pass
+    else:
+        codecs.append(MsgpackCodec)
+
+    session, message = _render_update(app, nodes)
+    result = {}
+    for codec_class in codecs:
+        codec = codec_class(EXTENSIONS)
+
+        def encoded():
+            session.sent_states.clear()
+            return codec.encode(message)
+
+        inbound = [codec.encode(m) for m in INBOUND_MESSAGES]
+
+        def decoded():
+            for data in inbound:
+                codec.decode(data)
+
+        data = encoded()
+        result[codec.name] = {
+            'size': len(data),
+            'compressed': len(FrameCompressor(threshold=0).compress(data)),
+            'encode': 1 / _measure(encoded, repeat),
+            'decode': len(inbound) / _measure(decoded, repeat),
+        }
+    return result
+
+
+def bench_resend(depth: int = 20, windows: int = 10, count: int = 100, repeat: int = 5) -> float:
+    """measure page refresh messages per second over `windows` of `count` items, nested `depth` blocks deep
+
+    Returns:
+        messages per second
+    """
+    from .components.context import Context
+    from .components.render.renderer_html import RendererHTML
+    from .components.shot import ContextShot
+    from .protocol import Messages
+    from .serializer import serializer
+    from .session import Session
+    from .settings import config
+
+    source = DEEP_TEMPLATE.replace('{blocks}', '{{#if True}}' * depth).replace('{ends}', '{{/if}}' * depth)
+    RendererHTML.templates['Bench'] = _load_template(source)
+    session = Session('bench', config.DEFAULT_APP, ['en'], {})
+    ctx = Context('Bench', shot=ContextShot(), session=session, locals={'windows': windows, 'count': count})
+    ctx.renderer.build()
+
+    def resent():
+        # the same as `Session.resend_root` does, in one chunk
+        session.sent_states.clear()
+        return serializer.encode(Messages.update(list(session.iter_rendered(ctx))))
+
+    return 1 / _measure(resent, repeat)
+
+
+def bench_static(count: int = 100, repeat: int = 5) -> dict[str, dict[str, float]]:
+    """measure building and sending `count` cards of mostly static content, with static fragments and without them
+
+    Returns:
+        by mode: `nodes` - amount of rendered nodes, `size` - update message size in bytes,
+        `build` - builds per second, `encode` - update messages per second
+    """
+    from . import serializer as serializer_module
+    from .components.context import Context
+    from .components.render.renderer_html import RendererHTML
+    from .components.shot import ContextShot
+    from .protocol import Messages
+    from .session import Session
+    from .settings import config
+
+    session = Session('bench', config.DEFAULT_APP, ['en'], {})
+
+    def built():
+        ctx = Context('Bench', shot=ContextShot(), session=session, locals={'count': count})
+        ctx.renderer.build()
+        return ctx
+
+    result = {}
+    saved = config.STATIC_FRAGMENTS
+    try:
+        for mode, static in (('static', True), ('elements', False)):
+            config.STATIC_FRAGMENTS = static
+            RendererHTML.templates['Bench'] = _load_template(STATIC_TEMPLATE)
+            RendererHTML.templates.pop(f'{session.app}/Bench', None)
+            lst = list(session.iter_rendered(built()))
+            message = Messages.update(lst)
+
+            def encoded():
+                session.sent_states.clear()
+                return serializer_module.serializer.encode(message)
+
+            result[mode] = {
+                'nodes': len(lst),
+                'size': len(encoded()),
+                'build': 1 / _measure(built, repeat),
+                'encode': 1 / _measure(encoded, repeat),
+            }
+    finally:
+        config.STATIC_FRAGMENTS = saved
+    return result
+
+
+class _QueueShot:
+    """`ContextShot` the way it was before, with queues and lists, for reference"""
+    __slots__ = ['created', 'updated', 'deleted', 'flickering']
+
+    def __init__(self):
+        from queue import Queue
+        self.created, self.updated, self.flickering, self.deleted = Queue(), Queue(), Queue(), Queue()
+
+    def pop(self):
+        deleted = []
+        while not self.deleted.empty():
+            deleted.append(self.deleted.get())
+        created = []
+        while not self.created.empty():
+            item = self.created.get()
+            if item.oid not in deleted:
+                created.append(item)
+        updated = []
+        while not self.updated.empty():
+            item = self.updated.get()
+            if item.oid not in deleted and item not in created:
+                updated.append(item)
+        flickering = []
+        while not self.flickering.empty():
+            item = self.flickering.get()
+            if item not in deleted and item not in created and item not in updated:
+                flickering.append(item)
+        return flickering, created, updated, deleted
+
+    def __call__(self, node):
+        self.updated.put(node)
+
+    def __add__(self, node):
+        self.created.put(node)
+        return self
+
+    def __sub__(self, other):
+        self.deleted.put(other.oid)
+        return self
+
+    def flick(self, node):
+        self.flickering.put(node)
+        return self
+
+
+class _ShotNode:
+    __slots__ = ['oid', 'parent', 'rebind_requested']
+
+    def __init__(self, oid: int, parent: _ShotNode | None):
+        self.oid = oid
+        self.parent = parent
+        self.rebind_requested = False
+
+
+def bench_shot(sizes: Iterable[int] = (10000, 100000), old_limit: int = 20000,
+               repeat: int = 3) -> dict[int, dict[str, float]]:
+    """measure collecting changes of every of `sizes` nodes by `ContextShot` and popping them,
+    and the way it was done before
+
+    A quarter of nodes is created (half of them under created ones), a half is updated twice,
+    a tenth is deleted and a tenth is flickering. The reference shot is quadratic,
+    so it is measured up to `old_limit` nodes only.
+
+    Returns:
+        by size: seconds per fill and pop by shot
+    """
+    from .components.shot import ContextShot
+
+    result = {}
+    for size in sizes:
+        root = _ShotNode(0, None)
+        count = size
+        nodes = [_ShotNode(i + 1, root) for i in range(count)]
+        for i in range(count // 8, count // 4):
+            nodes[i].parent = nodes[i - count // 8]
+        created = nodes[:count // 4]
+        updated = nodes[count // 8:count // 8 + count // 2]
+        deleted = nodes[count - count // 10:]
+        flickering = nodes[count // 2:count // 2 + count // 10]
+
+        def filled(shot_class):
+            def run():
+                shot = shot_class()
+                for node in created:
+                    shot += node
+                for node in updated:
+                    shot(node)
+                for node in updated:
+                    shot(node)
+                for node in deleted:
+                    shot -= node
+                for node in flickering:
+                    shot.flick(node)
+                shot.pop()
+            return run
+
+        result[size] = {'new': _measure(filled(ContextShot), repeat)}
+        if size <= old_limit:
+            result[size]['old'] = _measure(filled(_QueueShot), repeat)
+    return result
@@ -18,7 +18,7 @@ import sass
 from pantra.components.render.renderer_base import ValueOrCode
 from pantra.components.render.render_node import RenderNode
 from pantra.components.template import NodeType, AttrType, MacroCode, MacroType, collect_template, collect_styles, \
-    get_template_path, HTMLTemplate
+    get_template_path, HTMLTemplate, StaticFragment
 from pantra.jsmap.gen import make_js_bundle, JS_BUNDLE_FILENAME, JS_BUNDLE_MAP_FILENAME
 from pantra.settings import config
 from pantra.compiler import CodeMetrics
@@ -145,16 +145,24 @@ def remix_imports(s):
     return ast.unparse(new_tree)
 
 class CacheBuilder:
+    """Generator of renderer classes from component templates
+
+    Arguments:
+        app: application name
+        in_memory: generate code for runtime use only, keeping sub-components and helper modules as is
+    """
     templates_ready: set[str] = set()
 
-    def __init__(self, app: str):
+    def __init__(self, app: str, in_memory: bool = False):
         self.app: str  = app
+        self.in_memory: bool = in_memory
         self.funcs: dict[str, str | LoopFunc | SetFunc] = {}
         self.in_loop_body: int = 0
         self.python_code: str = ""
         self.code_metrics: CodeMetrics = CodeMetrics()
         self.prefixes: dict[str, int] = defaultdict(int)
         self.current_react_vars: set[str] = set()
+        self.statics: dict[str, StaticFragment] = {}
 
     def collect_styles(self):
         print("Collecting styles...")
@@ -514,21 +522,22 @@ class CacheBuilder:
 
         for attr, value in template.attributes.items():
             res += self.process_attribute_html(template.attr_specs[attr], attr, value, node)
-        res += self.collect_react_vars(node)
 
         if self.code_metrics.has_node_processor:
             #res += f"{CI}.run_safe(self.ctx.session, lambda: node_processor({node}), dont_refresh=True)\n"
             res += f"node_processor({node})\n"
 
-        if len(template.children) == 1:
-            single_child = template.children[0]
-            if single_child.tag_name == '@text':
-                res += f"{node}.attributes['$'] = {self.makeup_value(single_child.content, node)}\n"
-                res += f"{node}.text = {node}.attributes['$']\n"
-            else:
-                res += self.build_node(single_child, node)
-        elif template.children:
-            res += self._build_group(template, node)
+        if len(template.children) == 1 and template.children[0].tag_name == '@text':
+            res += f"{node}.attributes['$'] = {self.makeup_value(template.children[0].content, node)}\n"
+            res += f"{node}.text = {node}.attributes['$']\n"
+            res += self.collect_react_vars(node)
+        else:
+            # reactions of this node go first, children collect their own
+            res += self.collect_react_vars(node)
+            if len(template.children) == 1:
+                res += self.build_node(template.children[0], node)
+            elif template.children:
+                res += self._build_group(template, node)
 
         res += self._call_after_render(template, node)
 
@@ -536,11 +545,13 @@ class CacheBuilder:
 
     def _build_at_text(self, template, parent):
         res = f'{CTX}.TextNode({parent}, {self.makeup_value(template.content, parent)})\n'
+        res += self.collect_react_vars(parent)
         return res
 
     def _build_template_tag(self, template, parent):
         node = next_node_name(parent)
-        CacheBuilder(self.app).make(template.tag_name)
+        if not self.in_memory:
+            CacheBuilder(self.app).make(template.tag_name)
 
         if 'not:render' in template.attributes:
             return ''
@@ -647,13 +658,24 @@ class CacheBuilder:
     def _build_macro_for(self, template, parent):
         node = next_node_name(parent)
         func_prefix = self.gen_prefix('for')
-        res = f'{node} = {CTX}.LoopNode({parent}, None)\n'
-        res += f'{node}.loop_template = {self.func_ctx_prefix()}{func_prefix}\n'
         loop_template = template[0]
+        windowed = loop_template.attributes.get('window', False)
+        if type(windowed) is MacroCode:
+            # loop variant is chosen by the flag once the node is built
+            res = f'{node}_windowed = bool({self.makeup_value(windowed, parent, True)})\n'
+            res += f'{node} = ({CTX}.WindowLoopNode if {node}_windowed else {CTX}.LoopNode)({parent}, None)\n'
+        else:
+            res = f'{node} = {CTX}.{"WindowLoopNode" if windowed else "LoopNode"}({parent}, None)\n'
+        res += f'{node}.loop_template = {self.func_ctx_prefix()}{func_prefix}\n'
         res += f'{node}.var_name = {loop_template.attributes["var_name"]!r}\n'
         res += f'{node}.iterator = {self.makeup_value(loop_template.attributes["iter"], node)}\n'
         if (index_func:=loop_template.attributes.get('index_func')) is not None:
             res += f'{node}.index_func = {self.makeup_value(index_func, node, var_list="forloop, "+loop_template.attributes["var_name"])}\n'
+        elif type(windowed) is MacroCode:
+            res += f'if {node}_windowed:\n'
+            res += f'    {node}.index_func = lambda forloop, _: forloop.counter0\n'
+        elif windowed:
+            res += f'{node}.index_func = lambda forloop, _: forloop.counter0\n'
         has_react_vars: bool = bool(self.current_react_vars)
         res += self.collect_react_vars(node)
 
@@ -672,7 +694,10 @@ class CacheBuilder:
 
         self.funcs[func_prefix] = loop_func
 
-        if has_react_vars:
+        if has_react_vars and type(windowed) is MacroCode:
+            if block := self.arrange_the_block(node, template):
+                res += f'if not {node}_windowed:\n' + indent(block, 1)
+        elif has_react_vars and not windowed:
             res += self.arrange_the_block(node, template)
         res += f'self.update({node})\n'
         return res
@@ -748,7 +773,8 @@ class CacheBuilder:
         self.python_code += '# main code\n'
         self.python_code += template.content.strip('\n')
         self.python_code = self.python_code.replace('\r\n', '\n')
-        self.python_code = remix_imports(self.python_code)
+        if not self.in_memory:
+            self.python_code = remix_imports(self.python_code)
         self.code_metrics = CodeMetrics.collect(self.python_code)
 
         res = ''
@@ -766,7 +792,7 @@ class CacheBuilder:
         attributes = template.attributes.copy()
         put_to_head = attributes.pop('location', 'head') == 'head'
         res = (f"{CTX}.ScriptNode({parent}, "
-               f"f'{{self.__class__.__name__}}_{template.script_index}', "
+               f"{f'{template.root.name}_{template.script_index}'!r}, "
                f"{attributes!r}, "
                f"{self.makeup_value(template.content, parent, True)}, "
                f"{put_to_head})\n")
@@ -775,14 +801,14 @@ class CacheBuilder:
     def _build_at_style(self, template, parent):
         # styles collected elsewhere
         if 'global' not in template.attributes:
-            res = 'ctx._restyle = True\n'
+            res = 'self.ctx._restyle = True\n'
         else:
             res = ''
         return res
 
     def _build_at_event(self, template, parent):
         node = next_node_name(parent)
-        res = f'{node} = EventNode({parent})\n'
+        res = f'{node} = {CTX}.EventNode({parent})\n'
         for k, v in template.attributes.items():
             if k == 'selector':
                 if 'global' in template.attributes:
@@ -818,6 +844,15 @@ class CacheBuilder:
 
         return res
 
+    def _build_at_static(self, template, parent):
+        res = self.build_node(template.children[0], parent)
+        if self.code_metrics.has_node_processor:
+            return res
+        name = self.gen_prefix('static')
+        self.statics[name] = template.content
+        return (f'if self.use_static({parent}):\n' + indent(f'{CTX}.StaticNode({parent}, self.{name}, self.ctx)\n', 1) +
+                'else:\n' + indent(res, 1))
+
     NODE_BUILDERS: dict[int, Callable[[Self, HTMLTemplate, str], str]] = {
         NodeType.HTML_TAG.value: _build_html_tag,
         NodeType.AT_TEXT.value: _build_at_text,
@@ -834,6 +869,7 @@ class CacheBuilder:
         NodeType.AT_STYLE.value: _build_at_style,
         NodeType.AT_EVENT.value: _build_at_event,
         NodeType.AT_REACT.value: _build_at_react,
+        NodeType.AT_STATIC.value: _build_at_static,
     }
     #endregion
 
@@ -848,27 +884,37 @@ class CacheBuilder:
             parent = "data_node"
         return res + self.NODE_BUILDERS[template.node_type.value](self, template, parent)
 
-    def make(self, template_name: str):
-        if template_name in self.templates_ready:
-            return
+    def generate(self, template: HTMLTemplate) -> str:
+        """generate module source with renderer class of the component
 
-        print(f'    {template_name}')
-
-        template = collect_template(template_name, app=self.app)
-        if template is None:
-            raise RuntimeError(f'Component `{template_name}` load error')
+        Arguments:
+            template: root template of the component
+        """
         code = self.build_node(template, 'None')
 
         funcs = self.collect_funcs()
+        statics = ''.join(f'{name} = {CTX}.{fragment!r}\n' for name, fragment in self.statics.items())
 
         result = CACHED_CONTENT.format(
-            template_name=template_name,
+            template_name=template.name,
+            statics=indent(statics, 1),
             funcs=indent(funcs, 1),
             build_code=indent(code, 2),
             python_code=self.python_code,
         )
 
-        result = result.replace("    \n    \n", "\n")
+        return result.replace("    \n    \n", "\n")
+
+    def make(self, template_name: str):
+        if template_name in self.templates_ready:
+            return
+
+        print(f'    {template_name}')
+
+        template = collect_template(template_name, app=self.app)
+        if template is None:
+            raise RuntimeError(f'Component `{template_name}` load error')
+        result = self.generate(template)
 
         if template.filename.is_relative_to(config.APPS_PATH):
             (config.CACHE_PATH / 'apps' / self.app).mkdir(parents=True, exist_ok=True)
@@ -884,7 +930,7 @@ import pantra.cached.imports as {CI}
 
 class {{template_name}}Renderer({CI}.RendererCached):
     __slots__ = ()
-{{funcs}}
+{{statics}}{{funcs}}
     def build_node(self, template, parent = None):
 {{build_code}}
         
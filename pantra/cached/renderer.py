@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import linecache
+import traceback
 import typing
 
 from pantra.components.render.renderer_base import RendererBase, ForLoopType
@@ -7,6 +9,7 @@ from pantra.components.render.renderer_html import RendererHTML
 from pantra.common import typename
 from pantra.components.template import HTMLTemplate
 from pantra.settings import config, logger
+from pantra.compiler import exec_code
 
 if typing.TYPE_CHECKING:
     from typing import *
@@ -47,12 +50,12 @@ class RendererCached(RendererBase):
         raise NotImplementedError("All nodes are being built in derived component classes")
 
     def build(self):
-        if self.__class__ is RendererCached:
+        if type(self).build_node is RendererCached.build_node:
             # override self class to ComponentRenderer derived class from the compiled context
             initial_locals = {k: v for k, v in self.ctx.locals.items() if k not in ('init', 'on_restart', 'ctx', 'refs')}
             common_locals = {'ctx': self.ctx, 'refs': self.ctx.refs, 'session': self.ctx.session, '_': self.ctx.session.gettext, 'logger': logger}
             self.ctx.locals.update(common_locals)
-            exec(self.ctx.template, self.ctx.locals)
+            exec_code(self.ctx.template, self.ctx.locals)
             self.ctx.locals.update(initial_locals)
             self.__class__ = self.ctx.locals[f'{self.ctx.name}Renderer']
         self.build_node(self.ctx.template, self.ctx)
@@ -95,7 +98,7 @@ class RendererCached(RendererBase):
                 parentloop = self.ctx.locals.get('forloop')
                 for_loop = ForLoopType(parentloop)
                 self.ctx.locals['forloop'] = for_loop
-                for i, value in enumerate(iter):
+                for i, value in node.enumerate(iter):
                     empty = False
                     for_loop.counter = i + 1
                     for_loop.counter0 = i
@@ -109,35 +112,25 @@ class RendererCached(RendererBase):
             if empty:
                 node.empty()
             iter = node.iterator()
-            if iter:
+            if iter is not None:
                 oldmap = node.index_map
+                old_positions = {index: pos for pos, index in enumerate(oldmap)}
                 node.index_map = newmap = {}
 
-                pos = 0
                 parentloop = self.ctx.locals.get('forloop')
                 for_loop = ForLoopType(parentloop)
                 self.ctx.locals['forloop'] = for_loop
-                for i, value in enumerate(iter):
+                for i, value in node.enumerate(iter):
                     for_loop.counter = i + 1
                     for_loop.counter0 = i
                     index = node.index_func(for_loop, value)
                     for_loop.index = index
                     if index in oldmap:
-                        for sub in oldmap[index]:  # type: RenderNode
-                            sub.move(pos)
-                            sub.rebind()
-                            pos += 1
-                        newmap[index] = oldmap[index]
-                        del oldmap[index]
+                        newmap[index] = oldmap.pop(index)
                     else:
-                        newmap[index] = []
                         last_child_idx = len(node.children)
                         node.loop_template(node, for_loop, value)
-                        for k in range(last_child_idx, len(node.children)):
-                            sub = node.children[k]
-                            sub.move(pos)
-                            newmap[index].append(sub)
-                            pos += 1
+                        newmap[index] = node.children[last_child_idx:]
                 if parentloop:
                     self.ctx.locals['forloop'] = parentloop
                 else:
@@ -146,6 +139,7 @@ class RendererCached(RendererBase):
                     for sub in lst:
                         sub.remove()
                     lst.clear()
+                self.arrange_loop_items(node, newmap, old_positions)
                 empty = not node.index_map
 
         if empty and node.else_template:
@@ -174,11 +168,58 @@ class RendererCached(RendererBase):
         'TextNode': RendererHTML._update_text_node,
         'ConditionNode': _update_condition_node,
         'LoopNode': _update_loop_node,
+        'WindowLoopNode': _update_loop_node,
         'SetNode': _update_set_node,
         'ReactNode': lambda *args: True,
+        'GroupNode': lambda *args: True,
+        'EventNode': lambda *args: False,
+        'ScriptNode': lambda *args: False,
+        'StaticNode': lambda *args: False,
     }
     #endregion
 
     def update(self, node: RenderNode, recursive: bool = False):
         if self.NODE_UPDATERS[typename(node)](self, node, recursive):
             self.update_children(node)
+
+
+class RendererJIT(RendererCached):
+    """Renderer from component classes generated in memory
+
+    Each component template is parsed and turned into the same class :doc:`cache builder <cache>` produces,
+    on first use and without writing files. Parsed templates are shared with
+    :class:`~pantra.components.render.renderer_html.RendererHTML`, so the watchdog invalidation
+    makes the class regenerate at the next use.
+    """
+
+    templates: ClassVar[dict[str, HTMLTemplate | None]] = RendererHTML.templates
+    codes: ClassVar[dict[str, tuple[HTMLTemplate, CodeType]]] = {}
+    __slots__ = ()
+
+    @classmethod
+    def collect_template(cls, name: str, session: Optional[Session] = None, app: Optional[str] = None) -> Optional[CodeType]:
+        template = RendererHTML.collect_template(name, session, app)
+        if template is None:
+            return None
+
+        key = str(template.filename)
+        if (cached := cls.codes.get(key)) is not None and cached[0] is template:
+            return cached[1]
+
+        from pantra.cached.builder import CacheBuilder
+
+        app = session and session.app or app or config.DEFAULT_APP
+        try:
+            source = CacheBuilder(app, in_memory=True).generate(template)
+            file_name = str(template.filename.with_name(f'{template.filename.stem}.jit.py'))
+            code = compile(source, file_name, 'exec')
+        except Exception as e:
+            if session is not None:
+                session.error(traceback.format_exc(), e)
+            else:
+                logger.error(f'Component `{name}` generation failed', exc_info=e)
+            return None
+        # keep generated source available for tracebacks
+        linecache.cache[file_name] = len(source), None, source.splitlines(True), file_name
+        cls.codes[key] = template, code
+        return code
@@ -0,0 +1,48 @@
+"""Abstract codec of messages between server and client-side"""
+from __future__ import annotations
+
+import typing
+from abc import ABC, abstractmethod
+
+if typing.TYPE_CHECKING:
+    from typing import *
+
+
+class WireCodec(ABC):
+    """Abstract codec of messages between server and client-side
+
+    Nodes and other special values are converted by extensions, see :mod:`pantra.serializer`.
+    Each extension has one-letter name:
+
+    * `h` - HTML element
+    * `t` - text node
+    * `d` - stub element of condition, loop or reactive node
+    * `w` - windowed loop
+    * `f` - static fragment
+    * `e` - events binding
+    * `s` - script
+    * `r` - removed nodes
+    * `D`, `T` - date and time
+
+    Client-side decoder applies extensions in order of appearance, so codec has to keep values order.
+    Read :doc:`wire_codec` for more information.
+
+    Arguments:
+        extensions: :class:`~pantra.contrib.bsdf_lite.Extension` classes
+    """
+    name: ClassVar[str] = ''
+
+    @abstractmethod
+    def encode(self, message: Any) -> bytes:
+        """pack message to send to client-side"""
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """unpack message from client-side"""
+
+    def session_encoder(self) -> WireCodec:
+        """encoder of messages to one client-side, the codec itself if it has no session state"""
+        return self
+
+    def reset(self):
+        """start session encoder state over, when client-side starts from scratch"""
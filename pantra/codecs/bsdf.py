@@ -0,0 +1,44 @@
+"""BSDF codec, the default one"""
+from __future__ import annotations
+
+import typing
+
+from ..contrib import bsdf_lite
+from ..settings import config
+from .base import WireCodec
+
+if typing.TYPE_CHECKING:
+    from typing import *
+
+#: keys of values to send through string table: tag names, classes, component names, value types and static fragments
+STRING_VALUE_KEYS = ('n', 'C', 'C+', 'C-', '$', 'ctx', 'type', 'H')
+
+
+class BsdfCodec(WireCodec):
+    """Binary Structured Data Format codec, decoded by `bsdf.js` on client-side
+
+    Session encoder sends repeated names through a string table, unless `WIRE_STRINGS` is `0`.
+
+    Arguments:
+        extensions: :class:`~pantra.contrib.bsdf_lite.Extension` classes
+        serializer: serializer to use instead of a new one
+    """
+    name = 'bsdf'
+
+    def __init__(self, extensions: Iterable[type[bsdf_lite.Extension]], serializer: bsdf_lite.BsdfLiteSerializer | None = None):
+        self.serializer = serializer or bsdf_lite.BsdfLiteSerializer(extensions, compression='bz2')
+
+    def encode(self, message: Any) -> bytes:
+        return self.serializer.encode(message)
+
+    def decode(self, data: bytes) -> Any:
+        return self.serializer.decode(data)
+
+    def session_encoder(self) -> BsdfCodec:
+        if not config.WIRE_STRINGS:
+            return self
+        return BsdfCodec((), self.serializer.with_strings(config.WIRE_STRINGS, STRING_VALUE_KEYS))
+
+    def reset(self):
+        if self.serializer._strings is not None:
+            self.serializer.reset_strings()
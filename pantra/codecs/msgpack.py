@@ -0,0 +1,68 @@
+"""MessagePack codec, requires `msgpack <https://msgpack.org/>`__ module"""
+from __future__ import annotations
+
+import typing
+
+import msgpack
+
+from .base import WireCodec
+from .bsdf import BsdfCodec
+
+if typing.TYPE_CHECKING:
+    from typing import *
+    from ..contrib.bsdf_lite import Extension
+
+
+class MsgpackCodec(WireCodec):
+    """MessagePack codec, decoded by `msgpack.js` on client-side
+
+    Extension values go as MessagePack extension types, with code of extension one-letter name.
+    Client-side sends messages in BSDF until it gets the first one from server, so messages
+    with BSDF header are decoded by :class:`~pantra.codecs.bsdf.BsdfCodec`.
+
+    Arguments:
+        extensions: :class:`~pantra.contrib.bsdf_lite.Extension` classes
+    """
+    name = 'msgpack'
+
+    def __init__(self, extensions: Iterable[type[Extension]]):
+        extensions = list(extensions)
+        self.extensions: dict[int, Extension] = {}
+        self.classes: dict[type, tuple[int, Callable[[Any, Any], Any]]] = {}
+        for extension_class in extensions:
+            extension = extension_class()
+            if len(extension.name) != 1:
+                raise ValueError(f'Extension name `{extension.name}` should be one letter')
+            code = ord(extension.name)
+            self.extensions[code] = extension
+            classes = extension.cls if isinstance(extension.cls, (tuple, list)) else [extension.cls] if extension.cls else []
+            for cls in classes:
+                self.classes[cls] = code, extension.encode
+        self.bsdf = BsdfCodec(extensions)
+
+    def _default(self, value):
+        ex = self.classes.get(value.__class__)
+        if ex is None:
+            # subclasses are matched once
+            for code, extension in self.extensions.items():
+                if extension.match(self, value):
+                    ex = self.classes[value.__class__] = code, extension.encode
+                    break
+            else:
+                raise TypeError(f'Class {value.__class__.__name__!r} is not handled by any extension')
+        code, encode = ex
+        return msgpack.ExtType(code, msgpack.packb(encode(self, value), default=self._default))
+
+    def _ext_hook(self, code: int, data: bytes):
+        value = msgpack.unpackb(data, ext_hook=self._ext_hook, strict_map_key=False)
+        if (extension := self.extensions.get(code)) is None:
+            return value
+        return extension.decode(self, value)
+
+    def encode(self, message: Any) -> bytes:
+        return msgpack.packb(message, default=self._default)
+
+    def decode(self, data: bytes) -> Any:
+        if data[:4] == b'BSDF':
+            return self.bsdf.decode(data)
+        return msgpack.unpackb(data, ext_hook=self._ext_hook, strict_map_key=False)
@@ -170,6 +170,19 @@ class HTML(str):
         refs["message"].set_text(HTML("<h1>Big one</h1>"))
     """
 
+_missing = object()
+
+
+def _same(old: typing.Any, new: typing.Any) -> bool:
+    """cheap equality check, treating values that fail to compare as different"""
+    if old is new:
+        return True
+    try:
+        return bool(old == new) and type(old) is type(new)
+    except Exception:
+        return False
+
+
 class DynamicDict(dict[str, typing.Any]):
     """Dictionary with dynamic (computable) values.
 
@@ -183,21 +196,29 @@ class DynamicDict(dict[str, typing.Any]):
         d.refresh()
         print(d["f"]) # -> 9
 
+    Plain assignments and deletions are remembered as pending changes, so
+    :meth:`refresh` can tell whether the dictionary differs from its last
+    refreshed state.
+
     Arguments:
         _lazy_mode (bool): don't evaluate functions at the first assignment
     """
-    __slots__ = ['_lazy_mode', '_lambdas']
+    __slots__ = ['_lazy_mode', '_lambdas', '_changed']
     def __init__(self, *args, _lazy_mode: bool=False, **kwargs):
         super().__init__(*args, **kwargs)
         self._lambdas: dict[str, typing.Callable[[], typing.Any]] = {}
         self._lazy_mode: bool = _lazy_mode
+        self._changed: bool = False
 
     def __setitem__(self, key, value):
         if isinstance(value, types.LambdaType) and value.__name__ == '<lambda>':
             self._lambdas[key] = value
             if not self._lazy_mode and key not in self:
                 dict.__setitem__(self, key, value())
+                self._changed = True
         else:
+            if not self._changed and not _same(dict.get(self, key, _missing), value):
+                self._changed = True
             """
             try:
                 del self._factories[key]
@@ -206,6 +227,10 @@ class DynamicDict(dict[str, typing.Any]):
             """
             dict.__setitem__(self, key, value)
 
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._changed = True
+
     def __len__(self):
         if '$' in self.keys():
             return dict.__len__(self) - 1
@@ -216,20 +241,32 @@ class DynamicDict(dict[str, typing.Any]):
             if key != '$':
                 yield key, value
 
-    def refresh(self, attr_name: str | None = None):
+    def refresh(self, attr_name: str | None = None) -> bool:
         """repeated evaluations
 
         Affects all functions if `attr_name` is not specified.
 
         Arguments:
             attr_name (str): attribute name for repeated evaluations.
+
+        Returns:
+            whether any value changed since the last refresh
         """
+        changed = self._changed
+        self._changed = False
         if attr_name is None:
             for key, factory_func in self._lambdas.items():
-                dict.__setitem__(self, key, factory_func())
+                value = factory_func()
+                if not changed and not _same(dict.get(self, key, _missing), value):
+                    changed = True
+                dict.__setitem__(self, key, value)
         else:
             if attr_name in self._lambdas:
-                dict.__setitem__(self, attr_name, self._lambdas[attr_name]())
+                value = self._lambdas[attr_name]()
+                if not changed and not _same(dict.get(self, attr_name, _missing), value):
+                    changed = True
+                dict.__setitem__(self, attr_name, value)
+        return changed
 
     def refresh_items(self) -> Iterable[tuple[str, typing.Any]]:
         """iterate through evaluated items only"""
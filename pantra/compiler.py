@@ -1,22 +1,26 @@
 from __future__ import annotations
 
 import typing
-from functools import lru_cache, wraps
+from functools import lru_cache, wraps, partial
 import traceback
 import logging
+import linecache
 from pathlib import Path
 from dataclasses import dataclass, field
+from types import FunctionType
 import ast
+import copy
 
 import sass
 from .settings import config, logger
 
 if typing.TYPE_CHECKING:
-    from typing import Self, Optional
+    from typing import Self, Optional, Callable
     from types import CodeType
     from .components.context import Context, HTMLTemplate
 
 code_base: typing.Dict[str, CodeType] = {}
+prototypes: typing.Dict[str, tuple[CodeType, Optional[Prototype]]] = {}  # by file name, the last code only
 
 @dataclass(slots=True)
 class CodeMetrics:
@@ -69,6 +73,211 @@ class ContextInitFailed(Exception):
     pass
 
 
+def _is_literal(node: ast.expr | None) -> bool:
+    try:
+        ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return False
+    return True
+
+
+def _bound_names(stmt: ast.stmt) -> set[str]:
+    """names bound by the top-level statement, not looking into function bodies"""
+    names = set()
+    nodes = [stmt]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+            if node is not stmt:
+                continue
+            # decorators, defaults and bases are evaluated in module scope
+            nodes.extend(node.decorator_list)
+            if isinstance(node, ast.ClassDef):
+                nodes.extend(node.bases)
+            else:
+                nodes.extend(node.args.defaults)
+            continue
+        if isinstance(node, ast.Lambda):
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split('.')[0] for alias in node.names if alias.name != '*')
+        elif isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        nodes.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def _used_names(stmt: ast.stmt) -> set[str]:
+    """names read while the top-level statement is executed"""
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        args = stmt.args
+        nodes = [*stmt.decorator_list, *args.defaults, *filter(None, args.kw_defaults),
+                 *(a.annotation for a in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]
+                   if a is not None and a.annotation is not None)]
+        if stmt.returns is not None:
+            nodes.append(stmt.returns)
+    else:
+        nodes = [stmt]
+    return {node.id for root in nodes for node in ast.walk(root)
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+
+
+def _is_shareable(stmt: ast.stmt) -> bool:
+    """statement gives the same result for each component instance"""
+    if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+        return True
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return not stmt.decorator_list and _has_immutable_defaults(stmt.args)
+    if isinstance(stmt, ast.Expr):
+        return isinstance(stmt.value, ast.Constant)
+    if isinstance(stmt, ast.AnnAssign):
+        return type(stmt.target) is ast.Name and (stmt.value is None or _is_literal(stmt.value)
+                                                  or _is_plain_lambda(stmt.value))
+    if isinstance(stmt, ast.Assign):
+        return (all(type(t) is ast.Name for t in stmt.targets)
+                and (_is_literal(stmt.value) or _is_plain_lambda(stmt.value)))
+    return False
+
+
+def _is_immutable(value) -> bool:
+    if type(value) in (tuple, frozenset):
+        return all(_is_immutable(v) for v in value)
+    return type(value) not in (list, dict, set)
+
+
+def _is_plain_lambda(node: ast.expr) -> bool:
+    return isinstance(node, ast.Lambda) and _has_immutable_defaults(node.args)
+
+
+def _has_immutable_defaults(args: ast.arguments) -> bool:
+    return all(_is_literal(d) and type(ast.literal_eval(d)) not in (list, dict, set)
+               for d in args.defaults + [d for d in args.kw_defaults if d])
+
+
+class Prototype:
+    """Component module executed once per process
+
+    Statements giving the same result for each instance (imports, function definitions, literal values)
+    are executed once. A component instance gets copies of their results, with functions rebound to
+    the instance locals, and then executes the rest of the module in its own locals.
+
+    Attributes:
+        values: shared values, immutable ones
+        copies: copy makers of values, mutable ones
+        functions: functions to rebind for each instance
+        residual: code to execute for each instance
+    """
+    __slots__ = ['values', 'copies', 'functions', 'residual']
+
+    def __init__(self):
+        self.values: dict[str, typing.Any] = {}
+        self.copies: list[tuple[str, Callable[[], typing.Any]]] = []
+        self.functions: list[tuple[str, FunctionType]] = []
+        self.residual: CodeType | None = None
+
+    @classmethod
+    def make(cls, source: str, filename: str) -> Optional[Prototype]:
+        """split module source and execute shared part, return None if module can't be shared at all"""
+        try:
+            tree = ast.parse(source, filename)
+        except SyntaxError:
+            return None
+
+        statements = tree.body
+        shared = [_is_shareable(stmt) for stmt in statements]
+        bound = [_bound_names(stmt) for stmt in statements]
+
+        # names bound more than once keep their order of execution
+        seen, twice = set(), set()
+        for names in bound:
+            twice |= seen & names
+            seen |= names
+        for i, names in enumerate(bound):
+            if names & twice:
+                shared[i] = False
+
+        # shared statements can't depend on the instance ones
+        changed = True
+        while changed:
+            changed = False
+            residual_names = set().union(*(names for names, s in zip(bound, shared) if not s))
+            for i, stmt in enumerate(statements):
+                if shared[i] and _used_names(stmt) & residual_names:
+                    shared[i] = False
+                    changed = True
+
+        if not any(shared):
+            return None
+
+        namespace = {}
+        try:
+            exec(compile(ast.Module([s for s, ok in zip(statements, shared) if ok], []), filename, 'exec'), namespace)
+        except Exception as e:
+            logger.debug(f'{filename}: component prototype failed, {e!r}')
+            return None
+
+        # literal containers are mutable state of each instance
+        assigned = {'__annotations__'}.union(*(names for stmt, names, ok in zip(statements, bound, shared)
+                                               if ok and isinstance(stmt, (ast.Assign, ast.AnnAssign))))
+        proto = cls()
+        for name, value in namespace.items():
+            if type(value) is FunctionType and value.__globals__ is namespace:
+                proto.functions.append((name, value))
+            elif name in assigned and not _is_immutable(value):
+                # flat containers of literals don't need deep copies
+                flat = type(value) is not tuple and all(map(_is_immutable, value.values() if type(value) is dict else value))
+                proto.copies.append((name, value.copy if flat else partial(copy.deepcopy, value)))
+            else:
+                proto.values[name] = value
+
+        residual = [s for s, ok in zip(statements, shared) if not ok]
+        if residual:
+            proto.residual = compile(ast.Module(residual, []), filename, 'exec')
+        return proto
+
+    def install(self, ctx_locals: dict):
+        """execute the module for one component instance"""
+        dict.update(ctx_locals, self.values)
+        for name, make_copy in self.copies:
+            dict.__setitem__(ctx_locals, name, make_copy())
+        for name, func in self.functions:
+            new_func = FunctionType(func.__code__, ctx_locals, func.__name__, func.__defaults__, func.__closure__)
+            if func.__kwdefaults__:
+                new_func.__kwdefaults__ = func.__kwdefaults__
+            if func.__annotations__:
+                new_func.__annotations__ = func.__annotations__
+            dict.__setitem__(ctx_locals, name, new_func)
+        if self.residual is not None:
+            exec(self.residual, ctx_locals)
+
+
+def exec_code(code: CodeType, ctx_locals: dict, source: str | None = None):
+    """execute component module in context locals, through its :class:`Prototype` when possible
+
+    Arguments:
+        code: compiled module
+        ctx_locals: context locals
+        source: module source text, taken from `linecache` if not specified
+    """
+    if not config.COMPONENT_PROTOTYPES:
+        exec(code, ctx_locals)
+        return
+    entry = prototypes.get(code.co_filename)
+    if entry is None or entry[0] is not code:
+        # reloaded file replaces the prototype of its previous code
+        if source is None:
+            source = ''.join(linecache.getlines(code.co_filename))
+        entry = prototypes[code.co_filename] = code, source and Prototype.make(source, code.co_filename) or None
+    proto = entry[1]
+    if proto is None:
+        exec(code, ctx_locals)
+    else:
+        proto.install(ctx_locals)
+
+
 def exec_includes(lst: str, rel_name: Path, ctx_locals: typing.Dict[str, typing.Any], code_metrics: Optional[CodeMetrics]):
     is_collected = code_metrics.is_collected
     path = rel_name.parent
@@ -80,7 +289,7 @@ def exec_includes(lst: str, rel_name: Path, ctx_locals: typing.Dict[str, typing.
             if not is_collected:
                 code_metrics.add(CodeMetrics.collect(source))
             code_base[str(filename)] = compile(source, filename, 'exec')
-        exec(code_base[str(filename)], ctx_locals)
+        exec_code(code_base[str(filename)], ctx_locals)
 
 
 def trace_exec(func):
@@ -113,7 +322,7 @@ def compile_context_code(ctx: Context, template: HTMLTemplate):
         if not template.code:
             template.code = compile(template.content, template.filename, 'exec')
         # exec(template.code, common_globals(), self.ctx.locals)
-        exec(template.code, ctx.locals)#, {'__name__': template.name})
+        exec_code(template.code, ctx.locals, template.content)
     if not is_collected:
         template.code_metrics.add(CodeMetrics.collect(template.content))
 
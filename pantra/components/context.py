@@ -5,15 +5,16 @@ import typing
 from types import CodeType, LambdaType
 import threading
 from copy import deepcopy
+from collections.abc import Sequence
 from enum import Enum, auto
 from dataclasses import dataclass, field
 import inspect
 import re
 
 from ..common import DynamicStyles, DynamicClasses, WebUnits, DynamicDict
-from ..components.reactdict import ReactDict
+from ..components.reactdict import ReactDict, batch
 from ..settings import config
-from .template import collect_template, HTMLTemplate, get_template_path
+from .template import collect_template, HTMLTemplate, StaticFragment, get_template_path
 from .static import get_static_url
 from .render.render_node import RenderNode
 from ..compiler import CodeMetrics
@@ -25,13 +26,14 @@ if typing.TYPE_CHECKING:
     from .render.renderer_base import ForLoopType, ValueOrCode, RendererBase
 
 __all__ = ['NSType', 'HTMLTemplate', 'Context', 'HTMLElement', 'NSElement', 'LoopNode', 'ConditionNode', 'TextNode',
-           'EventNode', 'SetNode', 'ReactNode', 'ScriptNode', 'ActionType', 'AnyNode']
+           'EventNode', 'SetNode', 'ReactNode', 'ScriptNode', 'ActionType', 'AnyNode', 'WindowLoopNode', 'StaticNode',
+           'StaticFragment']
 
 ActionType = typing.Callable[['HTMLElement'], None] | None
 CallableTemplate = typing.Union[HTMLTemplate, typing.Callable[[...], None], None]
 
 AnyNode = typing.Union['HTMLElement', 'NSElement', 'Context', 'ConditionNode', 'LoopNode', 'TextNode', 'EventNode',
-'SetNode', 'ReactNode', 'ScriptNode']
+'SetNode', 'ReactNode', 'ScriptNode', 'StaticNode']
 
 TAG_PATTERN = re.compile(r"^(\w+)(\s+[a-z_:]+(=(['\"`].*?['\"`]|[^ ]+))?)+$", re.I)
 TAG_GROUPS = re.compile(r"^\s+([a-z_:]+)(=(['\"`].*?['\"`]|[^ ]+))?", re.I)
@@ -190,6 +192,16 @@ class Context(RenderNode):
         """shortcut to set local context variables quietly"""
         self.locals.set_quietly(key, value)
 
+    @staticmethod
+    def batch() -> ContextManager[None]:
+        """defer reactions to local variables changes till the end of the block::
+
+            with ctx.batch():
+                ctx['a'] = 1
+                ctx['b'] = 2
+        """
+        return batch()
+
     def __str__(self):
         return f'${self.name}' + (f':{self.ref_name}' if self.ref_name else '')
 
@@ -441,8 +453,8 @@ class HTMLElement(RenderNode):
         self.context.set_quietly(key, value)
 
     def reset_loop_cache(self):
-        """reset :class:`LoopNode` cache for all child nodes"""
-        for node in self.select("@", depth=1):
+        """reset :class:`LoopNode` cache for child nodes (including ones inside conditions)"""
+        for node in self.select(lambda node: isinstance(node, LoopNode), depth=2):
             node.reset_cache()
 
     def __str__(self):
@@ -470,11 +482,12 @@ class Condition:
 
 class ConditionNode(RenderNode):
     """Node for conditional `{{#if ...}}`, `{{#elif ...}}`, `{{#else}}`"""
-    __slots__ = ['state', 'conditions', 'template']
+    __slots__ = ['state', 'conditions', 'template', 'renderer']
 
-    def __init__(self, parent: RenderNode, template: Optional[HTMLTemplate]):
+    def __init__(self, parent: RenderNode, template: Optional[HTMLTemplate], renderer: Optional[RendererBase] = None):
         self.template = template
         super().__init__(parent)
+        self.renderer: RendererBase = renderer or self.context.renderer
         self.state = -1
         self.conditions: Optional[list[Condition]] = []
 
@@ -487,11 +500,13 @@ class ConditionNode(RenderNode):
 
 class LoopNode(RenderNode):
     """Node for loops `{{#for ...}}`"""
-    __slots__ = ['template', 'loop_template', 'else_template', 'var_name', 'iterator', 'index_func', 'index_map']
+    __slots__ = ['template', 'loop_template', 'else_template', 'var_name', 'iterator', 'index_func', 'index_map',
+                 'renderer']
 
-    def __init__(self, parent: RenderNode, template: Optional[HTMLTemplate]):
+    def __init__(self, parent: RenderNode, template: Optional[HTMLTemplate], renderer: Optional[RendererBase] = None):
         self.template: CallableTemplate = template
         super().__init__(parent)
+        self.renderer: RendererBase = renderer or self.context.renderer
 
         self.var_name: Optional[str] = None
         self.iterator: Optional[Callable[[], Iterable]] = None
@@ -510,6 +525,53 @@ class LoopNode(RenderNode):
         """reset index cache"""
         self.index_map.clear()
 
+    def enumerate(self, iterable: Iterable) -> Iterable[tuple[int, Any]]:
+        """enumerate loop items to render"""
+        return enumerate(iterable)
+
+
+class WindowLoopNode(LoopNode):
+    """Node for windowed loops `{{#for:window ...}}`
+
+    Only items around the client-side viewport are rendered. Client reports scroll position, window shifts then.
+
+    Attributes:
+        start: first visible item position
+        size: amount of visible items
+        overscan: extra items to render before and after visible ones
+        total: amount of all items
+        first: first rendered item position
+    """
+    __slots__ = ['start', 'size', 'overscan', 'total', 'first']
+
+    def __init__(self, parent: RenderNode, template: Optional[HTMLTemplate], renderer: Optional[RendererBase] = None):
+        super().__init__(parent, template, renderer)
+        self.start: int = 0
+        self.size: int = config.LOOP_WINDOW_SIZE
+        self.overscan: int = config.LOOP_WINDOW_OVERSCAN
+        self.total: int = 0
+        self.first: int = 0
+        self.shot += self
+
+    def enumerate(self, iterable: Iterable) -> Iterable[tuple[int, Any]]:
+        """enumerate items inside the window only and request client-side update after all
+
+        Iterable has to be a sequence, so the window shift costs its size and not the length of the collection.
+        """
+        if not isinstance(iterable, Sequence):
+            raise TypeError(f'windowed loop requires a sequence, got {type(iterable).__name__}')
+        length = self.size + 2 * self.overscan
+        self.total = len(iterable)
+        self.first = first = max(0, min(self.start - self.overscan, self.total - length))
+        yield from enumerate(iterable[first:first + length], first)
+        self.shot(self)
+
+    def set_window(self, start: int, size: int):
+        """shift the window to client-side viewport"""
+        self.start = max(0, start)
+        self.size = max(1, size)
+        self.renderer.update(self)
+
 
 class TextNode(RenderNode):
     """node for raw text content
@@ -541,15 +603,39 @@ class TextNode(RenderNode):
     def __str__(self):
         return 'text'
 
-    def refresh(self):
+    def refresh(self) -> bool:
+        """re-evaluate text and send it if it differs"""
         if self.factory is not None:
-            self.text = self.factory()
-            self.update()
+            text = self.factory()
+            if text != self.text or type(text) is not type(self.text):
+                self.text = text
+                self.update()
+                return True
+        return False
 
     def _frozen_clone(self, new_parent: RenderNode) -> Union[HTMLElement, TextNode]:
         return TextNode(new_parent, self.text)
 
 
+class StaticNode(RenderNode):
+    """node of static subtree, rendered by client-side from pre-built HTML fragment
+
+    Static subtrees are detected on template loading, see :ref:`static fragments <static fragments>`.
+    """
+    render_this = True
+    __slots__ = ['fragment']
+
+    def __init__(self, parent: RenderNode, fragment: StaticFragment, context: Context = None):
+        super().__init__(parent, context=context)
+        self.fragment: StaticFragment = fragment
+
+    def __str__(self):
+        return 'static'
+
+    def _frozen_clone(self, new_parent: RenderNode) -> StaticNode:
+        return StaticNode(new_parent, self.fragment)
+
+
 class EventNode(RenderNode):
     """:ref:`Event <events>` node"""
     render_this = True
@@ -566,10 +652,11 @@ class EventNode(RenderNode):
 
 class SetNode(RenderNode):
     """:ref:`Set node <set node>`"""
-    __slots__ = ['variables', 'template', 'scoped', 'self_clear']
+    __slots__ = ['variables', 'template', 'scoped', 'self_clear', 'renderer']
 
-    def __init__(self, parent: RenderNode, template: CallableTemplate):
+    def __init__(self, parent: RenderNode, template: CallableTemplate, renderer: Optional[RendererBase] = None):
         super().__init__(parent)
+        self.renderer: RendererBase = renderer or self.context.renderer
         self.template: CallableTemplate = template
         self.variables: DynamicDict = DynamicDict(_lazy_mode=True)
         self.scoped: bool = False
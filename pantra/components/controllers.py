@@ -10,7 +10,7 @@ from ..workers.decorators import thread_worker
 
 if typing.TYPE_CHECKING:
     from typing import *
-    from .context import HTMLElement, Context
+    from .context import HTMLElement, Context, WindowLoopNode
 
 __all__ = ['DragOptions', 'DragController']
 
@@ -130,6 +130,13 @@ def process_drag_stop(session: Session, x: int, y: int):
     session.state['drag'].mouseup()
     del session.state["drag"]
 
+@thread_worker
+@trace_errors
+def process_window(session: Session, oid: int, start: int, size: int):
+    node: WindowLoopNode = session.get_node(oid)
+    if node is None: return
+    node.set_window(start, size)
+
 @trace_errors
 def process_call(session: Session, node: Context | HTMLElement, method: str, *args):
     for m in method.split(' '):
@@ -17,9 +17,10 @@ from .grammar.PMLLexer import PMLLexer
 from .grammar.PMLParser import PMLParser
 from .grammar.PMLParserVisitor import PMLParserVisitor
 
+from pantra.common import DynamicClasses, DynamicStyles
 from pantra.settings import config
 from pantra.trans.processor import demux_fstring
-from .template import HTMLTemplate, MacroCode, MacroType
+from .template import HTMLTemplate, MacroCode, MacroType, NodeType, AttrType, StaticFragment, CLASS_MARK, NO_CLASS_MARK
 from .static import get_static_url
 
 __all__ = ['load', 'load_styles']
@@ -30,7 +31,22 @@ SPECIAL_ELEMENTS = 'slot event scope react component'.split()
 VARNAME_REFERENCE = re.compile(r'^@[a-zA-Z_][a-zA-Z0-9_]*$')
 FORMATTED_EXPRESSION = re.compile(r'^([^{]|\{\{)*\{([^}]|\{\{|}})*}(?!})')
 FORMATTED_EXPRESSION2 = re.compile(r'^([^{]|[{][^{]|`[^{])*(\{\{|`\{)(.*?)(}}|}`)')
-MACRO_CHUNKS = re.compile(r"^(\w+(:\w+)?)\s+(.*)$", re.M | re.DOTALL)
+MACRO_CHUNKS = re.compile(r"^(\w+(?::\w+)?)(?:=(\S+))?\s+(.*)$", re.M | re.DOTALL)
+
+# HTML parser of client-side rebuilds some trees differently from DOM calls, such subtrees are never static
+NOT_STATIC_ELEMENTS = set('svg math select option optgroup datalist textarea title script style template iframe noscript '
+                          'noembed noframes xmp plaintext listing pre html head body frameset image nobr'.split())
+P_CLOSING_ELEMENTS = set('address article aside blockquote center details dialog dir div dl dd dt fieldset figcaption '
+                         'figure footer form h1 h2 h3 h4 h5 h6 header hgroup hr li main menu nav ol p pre search section '
+                         'table ul'.split())
+HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+NOT_NESTED_ELEMENTS = {'a': {'a'}, 'form': {'form'}, 'button': {'button'}, 'li': {'li'}, 'dt': {'dt', 'dd'},
+                       'dd': {'dt', 'dd'}} | {h: HEADINGS for h in HEADINGS}
+TABLE_ELEMENTS = {'table': {'caption', 'colgroup', 'thead', 'tbody', 'tfoot'}, 'thead': {'tr'}, 'tbody': {'tr'},
+                  'tfoot': {'tr'}, 'tr': {'td', 'th'}, 'colgroup': {'col'}}
+TABLE_PARTS = {'caption', 'colgroup', 'col', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th'}
+STATIC_ATTRIBUTES = {AttrType.ATTR, AttrType.CLASS, AttrType.STYLE, AttrType.TYPE}
+NOT_STATIC_CHARS = re.compile(f'[\r\0{CLASS_MARK}{NO_CLASS_MARK}]')
 
 class HTMLVisitor(PMLParserVisitor):
 
@@ -248,7 +264,7 @@ class HTMLVisitor(PMLParserVisitor):
             self.current.set_attr('condition',
                                   MacroCode(MacroType.BOOLEAN, reactive, False,
                                             compile(text, f"<{self.current.path()}>", "eval"), text))
-        elif tag_name == 'for':
+        elif tag_name in ('for', 'for:window'):
             parent = HTMLTemplate('#for', self.current)
             sides = text.split('#')
             chunks = sides[0].split(' in ')
@@ -260,6 +276,13 @@ class HTMLVisitor(PMLParserVisitor):
             self.current.set_attr('var_name', var_name)
             self.current.set_attr('iter',
                                   MacroCode(MacroType.ITERATOR, reactive, False, iterator, chunks[1]))
+            if tag_name == 'for:window':
+                if (flag := macro_chunks.group(2)) is None:
+                    self.current.set_attr('window', True)
+                else:
+                    self.current.set_attr('window',
+                                          MacroCode(MacroType.BOOLEAN, False, False,
+                                                    compile(flag, f"<{parent.path()}:window>", "eval"), flag))
             if len(sides)>1:
                 self.current.set_attr('index_func',
                                       MacroCode(MacroType.INDEX, False, False, index_func, sides[1]))
@@ -341,9 +364,122 @@ def load(filename: Path, error_callback: typing.Callable[[str], None]) -> typing
 
     res: HTMLTemplate = visitor.root
     res.hex_digest = hashlib.md5(Path(filename).read_bytes()).hexdigest()
+    if config.STATIC_FRAGMENTS:
+        hoist_static(res)
     return res
 
 
+class StaticInfo(typing.NamedTuple):
+    html: str
+    tag_name: str | None  # `None` for text
+    tags: set[str]  # tag names of the subtree
+
+
+def _static_attributes(template: HTMLTemplate) -> str | None:
+    res = []
+    classes = ''
+    for attr, value in template.attributes.items():
+        attr_type = template.attr_specs[attr][0]
+        if attr_type not in STATIC_ATTRIBUTES or ':' in attr:
+            return None
+        if isinstance(value, str) and NOT_STATIC_CHARS.search(value):
+            return None
+        if attr_type == AttrType.CLASS or attr_type == AttrType.STYLE:
+            if not isinstance(value, str):
+                return None
+            try:
+                value = str(DynamicClasses() + value if attr_type == AttrType.CLASS else DynamicStyles() + value)
+            except (ValueError, TypeError):
+                return None
+            if attr_type == AttrType.CLASS:
+                classes = value
+                continue
+        elif attr_type == AttrType.TYPE:
+            if not isinstance(value, str):
+                return None
+        elif value is True:
+            value = 'true'
+        elif type(value) is int:
+            value = str(value)
+        elif value is not None and value is not False and not isinstance(value, str):
+            return None
+        # client-side drops attributes with empty values
+        if value:
+            res.append(f' {attr}="{html.escape(value)}"')
+    res.append(f' class="{CLASS_MARK}{html.escape(classes)}"' if classes else NO_CLASS_MARK)
+    return ''.join(res)
+
+
+def _static_tag(template: HTMLTemplate, children: list[StaticInfo | None]) -> StaticInfo | None:
+    tag_name = template.tag_name
+    if tag_name in NOT_STATIC_ELEMENTS or None in children:
+        return None
+    if tag_name == 'section' and template.parent.node_type == NodeType.TEMPLATE_TAG:
+        # named slot
+        return None
+    if (attributes := _static_attributes(template)) is None:
+        return None
+
+    descendants = set().union(*(child.tags for child in children))
+    if tag_name == 'p' and descendants & P_CLOSING_ELEMENTS:
+        return None
+    if (not_nested := NOT_NESTED_ELEMENTS.get(tag_name)) and descendants & not_nested:
+        return None
+    if (child_tags := TABLE_ELEMENTS.get(tag_name)) is not None:
+        if any(child.tag_name not in child_tags for child in children):
+            return None
+    elif any(child.tag_name in TABLE_PARTS for child in children):
+        return None
+
+    if len(children) == 1 and children[0].tag_name is None:
+        content = children[0].html
+    else:
+        content = ''.join(child.html if child.tag_name else f'<text>{child.html}</text>' for child in children)
+    if tag_name in VOID_ELEMENTS:
+        return StaticInfo(f'<{tag_name}{attributes}>', tag_name, descendants | {tag_name})
+    return StaticInfo(f'<{tag_name}{attributes}>{content}</{tag_name}>', tag_name, descendants | {tag_name})
+
+
+def _hoist(template: HTMLTemplate) -> StaticInfo | None:
+    node_type = template.node_type
+    if node_type == NodeType.AT_TEXT:
+        text = template.content
+        if not isinstance(text, str) or NOT_STATIC_CHARS.search(text):
+            return None
+        return StaticInfo(html.escape(text, False), None, set())
+
+    children = [_hoist(child) for child in template.children]
+    if node_type == NodeType.HTML_TAG and (info := _static_tag(template, children)) is not None:
+        return info
+
+    for child, info in zip(template.children, children):
+        if info is not None and info.tag_name is not None:
+            _make_static(child, info.html)
+    return None
+
+
+def _make_static(template: HTMLTemplate, raw: str):
+    # the original element stays as the only child, to be rendered when the fragment can't be used
+    parent = template.parent
+    static = HTMLTemplate('@static', text=StaticFragment(raw))
+    static._parent = parent
+    parent.children[parent.children.index(template)] = static
+    template._parent = static
+    static.children.append(template)
+
+
+def hoist_static(root: HTMLTemplate):
+    """replace the largest static subtrees of HTML elements with `@static` nodes, holding pre-built HTML
+
+    Element is static if it has constant attributes only (no macros, events, references, etc.), and all its
+    children are static elements or constant text. Components with `<event>` tags bind events by selectors,
+    their elements are left as is.
+    """
+    if next(root.select(lambda t: t.node_type == NodeType.AT_EVENT), None) is not None:
+        return
+    _hoist(root)
+
+
 class StyleVisitor(PMLParserVisitor):
     parser = cssutils.CSSParser(validate=False, raiseExceptions=True)
 
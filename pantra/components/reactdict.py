@@ -1,6 +1,8 @@
 from __future__ import annotations
 import typing
+import threading
 from collections import defaultdict
+from contextlib import contextmanager
 
 from ..common import typename
 from .controllers import process_call
@@ -9,6 +11,59 @@ if typing.TYPE_CHECKING:
     from .render.render_node import RenderNode
     from .context import ReactNode
 
+__all__ = ['ReactDict', 'batch']
+
+
+class _BatchState(threading.local):
+    def __init__(self):
+        self.depth: int = 0
+        self.nodes: dict[RenderNode, ReactDict] = {}
+
+
+_batch_state = _BatchState()
+
+
+@contextmanager
+def batch():
+    """defer reactions to variable changes till the end of the block
+
+    Every reacting node is updated once, ancestors first. Nodes removed by ancestor update are skipped,
+    as well as descendants of react nodes (they are updated as a whole). Batches are per-thread and can be nested.
+    """
+    state = _batch_state
+    state.depth += 1
+    try:
+        yield
+    finally:
+        state.depth -= 1
+        if not state.depth and state.nodes:
+            nodes, state.nodes = state.nodes, {}
+            _flush(nodes)
+
+
+def _flush(nodes: dict[RenderNode, ReactDict]):
+    react_nodes = {node for node in nodes if typename(node) == 'ReactNode'}
+    for node in sorted(nodes, key=lambda n: n.oid):
+        if node not in nodes[node].react_nodes:
+            continue
+        if react_nodes:
+            parent = node.parent
+            while parent is not None and parent not in react_nodes:
+                parent = parent.parent
+            if parent is not None:
+                continue
+        _react(node)
+
+
+def _react(node: RenderNode | ReactNode):
+    if typename(node) == 'ReactNode':
+        node.update_tree()
+        if isinstance(node.action, str):
+            process_call(node.context.session, node.context, node.action, node)
+    else:
+        node.update(True)
+
+
 class ReactDict(dict):
     """Extended dictionary with reactions the changes
 
@@ -52,16 +107,16 @@ class ReactDict(dict):
         old_value = self[key]
         dict.__setitem__(self, key, value)
         if (nodes:=self.react_vars.get(key, None)) is not None and value != old_value:
+            pending = _batch_state.nodes if _batch_state.depth else None
             for node in list(nodes): # type: RenderNode | ReactNode
                 # WARNING: `nodes` list is dynamically changed by updates, but we need to avoid new nodes
                 # as well as deleted ones
                 if typename(node) == 'ReactNode':
                     node.value = value
-                    node.update_tree()
-                    if isinstance(node.action, str):
-                        process_call(node.context.session, node.context, node.action, node)
+                if pending is not None:
+                    pending[node] = self
                 else:
-                    node.update(True)
+                    _react(node)
 
     def set_quietly(self, key, value):
         """set variable without effects"""
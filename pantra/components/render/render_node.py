@@ -22,7 +22,8 @@ class RenderNode(UniqueNode):
         shot (ContextShot): snapshot manager to update changes
         session (Session): reference to current session
         scope (DynamicDict): reference to the :ref:`scope <scope>`
-        rebind_requested (bool): whether this node should be rebound to another parent
+        rebind_requested (bool | RenderNode): whether this node should be rebound to another parent
+            (or moved before another node)
         render_this_node (bool): whether this node should be rendered
     """
     render_this: ClassVar[bool] = False
@@ -46,7 +47,7 @@ class RenderNode(UniqueNode):
         else:
             self.context: Context = self
 
-        self.rebind_requested: bool = False
+        self.rebind_requested: bool | RenderNode = False
 
         self.render_this_node: bool = self.render_this
         if self.render_this_node:
@@ -74,14 +75,18 @@ class RenderNode(UniqueNode):
     def __str__(self):
         return 'node'
 
-    def rebind(self):
-        """request rebind for this node after parent changed"""
+    def rebind(self, anchor: Optional[RenderNode] = None):
+        """request rebind for this node after parent changed
+
+        Arguments:
+            anchor: rendered node to put this one before (to the end by default)
+        """
         if self.render_this_node:
-            self.rebind_requested = True
+            self.rebind_requested = anchor or True
             self.shot(self)
         else:
             for child in self.children:
-                child.rebind()
+                child.rebind(anchor)
 
     def render(self, template: Union[str, HTMLTemplate], locals: dict = None, build: bool = True):
         """render new child node.
@@ -8,18 +8,65 @@ from dataclasses import dataclass
 from pantra.compiler import ContextInitFailed
 from ..template import MacroCode
 from ..context import HTMLElement, Slot
+from ..shot import NullContextShot
 
 if typing.TYPE_CHECKING:
     from typing import *
     from types import CodeType
     from pantra.session import Session
-    from ..context import Context
+    from ..context import Context, LoopNode
     from ..template import HTMLTemplate
     from .render_node import RenderNode
 
 ValueOrCode = typing.Any | MacroCode
 
-__all__ = ['RendererBase', 'ValueOrCode', 'ForLoopType']
+__all__ = ['RendererBase', 'ValueOrCode', 'ForLoopType', 'first_rendered', 'last_rendered']
+
+def longest_increasing_subsequence(seq: Sequence[int]) -> set[int]:
+    """return indices of longest increasing subsequence items, O(n log n)"""
+    tails: list[int] = []
+    prev: list[int] = [-1] * len(seq)
+    for i, value in enumerate(seq):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if seq[tails[mid]] < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo:
+            prev[i] = tails[lo - 1]
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
+    res = set()
+    i = tails[-1] if tails else -1
+    while i >= 0:
+        res.add(i)
+        i = prev[i]
+    return res
+
+
+def first_rendered(node: RenderNode) -> Optional[RenderNode]:
+    """find the node itself or its first rendered descendant"""
+    if node.render_this_node:
+        return node
+    for child in node.children:
+        if (res := first_rendered(child)) is not None:
+            return res
+    return None
+
+
+def last_rendered(node: RenderNode) -> Optional[RenderNode]:
+    """find the node itself or its last rendered descendant"""
+    if node.render_this_node:
+        return node
+    for child in reversed(node.children):
+        if (res := last_rendered(child)) is not None:
+            return res
+    return None
+
 
 @dataclass(slots=True)
 class ForLoopType:
@@ -67,6 +114,14 @@ class RendererBase(ABC):
         node = HTMLElement(tag_name, parent, context=self.ctx)
         return node
 
+    def use_static(self, parent: RenderNode) -> bool:
+        """whether static subtree goes to `parent` as pre-built fragment, rather than element by element
+
+        Elements are built one by one for namespaced contexts, node processors and data nodes.
+        """
+        return (not self.ctx.ns_type and not self.ctx.code_metrics.has_node_processor
+                and type(parent.shot) is not NullContextShot)
+
     @contextmanager
     def override_ns_type(self, slot: Slot):
         if self.ctx.ns_type:
@@ -86,23 +141,19 @@ class RendererBase(ABC):
 
     def trace_eval(self, macro: MacroCode, node: RenderNode, bind_ctx: Context = None):
         ctx = bind_ctx or self.ctx
-        with ctx.session.node_context(node):
-            if isinstance(macro.code, str):
-                return ctx.locals[macro.code]
-            if type(macro.code) == list:
-                var_name = macro.code[0]
-                if len(macro.code) == 1:
-                    return ctx.locals[var_name]
-                if var_name == 'ctx':
-                    value = ctx
-                elif var_name == 'this':
-                    value = node
-                else:
-                    value = ctx.locals[var_name]
-                for chunk in macro.code[1:]:
-                    value = getattr(value, chunk)
-                return value
-            return eval(macro.code, {'ctx': ctx, 'this': node}, ctx.locals)
+        try:
+            return macro.func(ctx, node, ctx.locals)
+        except KeyError as e:
+            # undefined names are looked up in locals directly, report them the way `eval` does
+            if e.args and e.args[0] in macro.vars and e.args[0] not in ctx.locals:
+                e = NameError(f"name '{e.args[0]}' is not defined", name=e.args[0])
+                e.node = node
+                raise e from None
+            e.node = node
+            raise
+        except Exception as e:
+            e.node = node
+            raise
 
     def makeup_value(self, source: ValueOrCode, node: RenderNode, evaluate_once: bool = False) -> Any:
         ctx = self.ctx  # save ctx to lambda instead of self, as ctx could be temporarily changed by slot
@@ -139,6 +190,42 @@ class RendererBase(ABC):
             else:
                 child.update_tree()
 
+    @staticmethod
+    def arrange_loop_items(node: LoopNode, items: dict[Hashable, list[RenderNode]], old_positions: dict[Hashable, int]):
+        """Put keyed loop items in new order
+
+        Only items out of the longest increasing subsequence of old positions are moved on client-side,
+        new items are inserted in place.
+
+        Arguments:
+            node: loop node
+            items: item nodes by index in new order
+            old_positions: old order of indices kept
+        """
+        keys = list(items)
+        kept = [i for i, key in enumerate(keys) if key in old_positions]
+        stable = {keys[kept[i]] for i in longest_increasing_subsequence([old_positions[keys[i]] for i in kept])}
+        node.children[:] = [sub for key in keys for sub in items[key]]
+
+        anchors = {}
+        stable_anchor = existing_anchor = None
+        for key in reversed(keys):
+            if key not in stable:
+                anchors[key] = stable_anchor if key in old_positions else existing_anchor
+            if key not in old_positions:
+                continue
+            for sub in items[key]:
+                if (first := first_rendered(sub)) is not None:
+                    existing_anchor = first
+                    if key in stable:
+                        stable_anchor = first
+                    break
+
+        for key in keys:
+            if key in anchors and (key in old_positions or anchors[key] is not None):
+                for sub in items[key]:
+                    sub.rebind(anchors[key])
+
     @abstractmethod
     def update(self, node: RenderNode, recursive: bool = False):
         """Update rendered node, to sync changes
@@ -8,7 +8,7 @@ from pantra.compiler import ContextInitFailed, compile_context_code
 from pantra.settings import config
 from ..template import AttrType, NodeType, collect_template, MacroCode, MacroType
 from ..context import HTMLElement, Context, Slot, ConditionNode, Condition, LoopNode, SetNode, ScriptNode, \
-    EventNode, TextNode, ReactNode
+    EventNode, TextNode, ReactNode, WindowLoopNode, StaticNode
 from ..shot import NullContextShot
 from .renderer_base import RendererBase, ValueOrCode, ForLoopType
 from .render_node import RenderNode
@@ -388,18 +388,22 @@ class RendererHTML(RendererBase):
         return node
 
     def _build_macro_for(self, template, parent):
-        node: LoopNode = LoopNode(parent, template, self)
         loop_template = template[0]
+        windowed = self.makeup_value(loop_template.attributes.get('window', False), parent, True)
+        node: LoopNode = (WindowLoopNode if windowed else LoopNode)(parent, template, self)
         node.var_name = loop_template.attributes['var_name']
         node.iterator = self.makeup_value(loop_template.attributes['iter'], node)
         if (index_func:=loop_template.attributes.get('index_func')) is not None:
             node.index_func = self.makeup_value(index_func, node)
+        elif windowed:
+            node.index_func = lambda: self.ctx.locals['forloop'].counter0
 
         node.loop_template = loop_template
         if len(template.children) > 1:
             node.else_template = template[1]
 
-        self.arrange_the_block(node, template)
+        if not windowed:
+            self.arrange_the_block(node, template)
         self.update(node)
         return node
 
@@ -498,6 +502,11 @@ class RendererHTML(RendererBase):
 
         return node
 
+    def _build_at_static(self, template, parent):
+        if not self.use_static(parent):
+            return self.build_node(template.children[0], parent)
+        return StaticNode(parent, template.content, self.ctx)
+
     NODE_BUILDERS: dict[int, Callable[[Self, HTMLTemplate, RenderNode], RenderNode]] = {
         NodeType.HTML_TAG.value: _build_html_tag,
         NodeType.AT_TEXT: _build_at_text,
@@ -513,6 +522,7 @@ class RendererHTML(RendererBase):
         NodeType.AT_STYLE.value: _build_at_style,
         NodeType.AT_EVENT.value: _build_at_event,
         NodeType.AT_REACT.value: _build_at_react,
+        NodeType.AT_STATIC.value: _build_at_static,
     }
     #endregion
 
@@ -530,19 +540,22 @@ class RendererHTML(RendererBase):
     #region Node updaters
     def _update_html_node(self, node: HTMLElement, recursive):
         # attributes, classes, styles and text evaluation
-        node.attributes.refresh()
+        changed = node.attributes.refresh()
         if (v := node.attributes.get('bind:value')) is not None:
-            node.value = self.ctx.locals[v]
+            if (value := self.ctx.locals[v]) != node._value:
+                node.value = value
 
         if isinstance(node.classes, DynamicClasses):
-            node.classes.refresh()
+            changed = node.classes.refresh() or changed
         if isinstance(node.style, DynamicStyles):
-            node.style.refresh()
+            changed = node.style.refresh() or changed
         node.data.refresh()
 
         node.text = node.attributes.get('$')
 
-        node.shot(node)
+        # nothing to send if re-evaluation produced the same output
+        if changed:
+            node.shot(node)
         return recursive
 
     def _update_context_node(self, node, recursive):
@@ -587,7 +600,7 @@ class RendererHTML(RendererBase):
                 parentloop = self.ctx.locals.get('forloop')
                 for_loop = ForLoopType(parentloop)
                 self.ctx.locals['forloop'] = for_loop
-                for i, value in enumerate(iter):
+                for i, value in node.enumerate(iter):
                     empty = False
                     self.ctx.locals[node.var_name] = value
                     for_loop.counter = i + 1
@@ -604,34 +617,27 @@ class RendererHTML(RendererBase):
             if empty:
                 node.empty()
             iter = node.iterator()
-            if iter:
+            if iter is not None:
                 oldmap = node.index_map
+                old_positions = {index: pos for pos, index in enumerate(oldmap)}
                 node.index_map = newmap = {}
 
-                pos = 0
                 parentloop = self.ctx.locals.get('forloop')
                 for_loop = ForLoopType(parentloop)
                 self.ctx.locals['forloop'] = for_loop
-                for i, value in enumerate(iter):
+                for i, value in node.enumerate(iter):
                     self.ctx.locals[node.var_name] = value
                     for_loop.counter = i + 1
                     for_loop.counter0 = i
                     index = node.index_func()
                     for_loop.index = index
                     if index in oldmap:
-                        for sub in oldmap[index]:  # type: RenderNode
-                            sub.move(pos)
-                            sub.rebind()
-                            pos += 1
-                        newmap[index] = oldmap[index]
-                        del oldmap[index]
+                        newmap[index] = oldmap.pop(index)
                     else:
                         newmap[index] = []
                         for temp_child in node.loop_template:
                             sub = node.renderer.build_node(temp_child, node)
-                            sub.move(pos)
                             newmap[index].append(sub)
-                            pos += 1
                 if node.var_name in self.ctx.locals:
                     del self.ctx.locals[node.var_name]
                 if parentloop:
@@ -642,6 +648,7 @@ class RendererHTML(RendererBase):
                     for sub in lst:
                         sub.remove()
                     lst.clear()
+                self.arrange_loop_items(node, newmap, old_positions)
                 empty = not node.index_map
 
         if empty and node.else_template:
@@ -671,8 +678,13 @@ class RendererHTML(RendererBase):
         'TextNode': _update_text_node,
         'ConditionNode': _update_condition_node,
         'LoopNode': _update_loop_node,
+        'WindowLoopNode': _update_loop_node,
         'SetNode': _update_set_node,
         'ReactNode': lambda *args: True,
+        'GroupNode': lambda *args: True,
+        'EventNode': lambda *args: False,
+        'ScriptNode': lambda *args: False,
+        'StaticNode': lambda *args: False,
     }
     #endregion
 
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import typing
 from contextlib import contextmanager
-from queue import Queue
+from threading import Lock
 
 if typing.TYPE_CHECKING:
     from .render.render_node import RenderNode
@@ -47,56 +47,91 @@ class NullContextShot:
 class ContextShot:
     """Snapshot manager to update context changes
 
+    Every queue is an insertion-ordered dict used as a set, so repeated updates of the same node are coalesced.
+
     Attributes:
-        created (Queue[RenderNode]): nodes just created
-        updated (Queue[RenderNode]): nodes just updated
-        deleted (Queue[RenderNode]): nodes just deleted
-        flickering (Queue[RenderNode]): faster updated nodes
+        created (dict[RenderNode, None]): nodes just created
+        updated (dict[RenderNode, None]): nodes just updated
+        deleted (dict[int, None]): OIDs of nodes just deleted
+        flickering (dict[RenderNode, None]): faster updated nodes
     """
-    __slots__ = ['created', 'updated', 'deleted', 'flickering']
+    __slots__ = ['created', 'updated', 'deleted', 'flickering', '_lock']
 
     def __init__(self):
-        self.created: Queue[RenderNode] = Queue()
-        self.updated: Queue[RenderNode] = Queue()
-        self.flickering: Queue[RenderNode] = Queue()
-        self.deleted: Queue[int] = Queue()
+        self.created: dict[RenderNode, None] = {}
+        self.updated: dict[RenderNode, None] = {}
+        self.flickering: dict[RenderNode, None] = {}
+        self.deleted: dict[int, None] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _under_created(node: RenderNode, created: dict[RenderNode, None], known: dict[RenderNode, bool]) -> bool:
+        chain = []
+        parent = node.parent
+        res = False
+        while parent is not None:
+            if (res := known.get(parent)) is not None:
+                break
+            if parent in created:
+                res = True
+                break
+            chain.append(parent)
+            parent = parent.parent
+        else:
+            res = False
+        for parent in chain:
+            known[parent] = res
+        return res
 
     def pop(self) -> tuple[list[RenderNode], list[RenderNode], list[RenderNode], list[int]]:
-        deleted = []
-        while not self.deleted.empty():
-            deleted.append(self.deleted.get())
-        created = []
-        while not self.created.empty():
-            item = self.created.get()
-            if item.oid not in deleted:
-                created.append(item)
-        updated = []
-        while not self.updated.empty():
-            item = self.updated.get()
-            if item.oid not in deleted and item not in created:
-                updated.append(item)
-        flickering = []
-        while not self.flickering.empty():
-            item = self.flickering.get()
-            if item not in deleted and item not in created and item not in updated:
-                flickering.append(item)
-        return flickering, created, updated, deleted
+        """take all changes collected and reset queues
+
+        Updates of created or deleted nodes are dropped, as well as updates of nodes which ancestor is just created
+        (unless rebind requested).
+        """
+        with self._lock:
+            created_set, updated_set, flickering_set, deleted = self.created, self.updated, self.flickering, self.deleted
+            self.created, self.updated, self.flickering, self.deleted = {}, {}, {}, {}
+
+        if deleted:
+            created_set = {node: None for node in created_set if node.oid not in deleted}
+        created = list(created_set)
+
+        known = {}
+        updated = [node for node in updated_set
+                   if node not in created_set and node.oid not in deleted
+                   and (not created_set or node.rebind_requested or not self._under_created(node, created_set, known))]
+        flickering = [node for node in flickering_set
+                      if node not in created_set and node not in updated_set and node.oid not in deleted]
+        return flickering, created, updated, list(deleted)
+
+    def pop_flickering(self) -> list[RenderNode]:
+        """take faster updated nodes only, other changes stay queued"""
+        with self._lock:
+            flickering, self.flickering = self.flickering, {}
+            return [node for node in flickering
+                    if node not in self.created and node not in self.updated and node.oid not in self.deleted]
 
     def __call__(self, node):
-        """put the node in "update" queue"""
-        self.updated.put(node)
+        """put the node in "update" queue (to the end, to keep rebinds order)"""
+        with self._lock:
+            self.updated.pop(node, None)
+            self.updated[node] = None
 
     def __add__(self, node):
         """put the node to "create" queue"""
-        self.created.put(node)
+        with self._lock:
+            self.created[node] = None
         return self
 
     def __sub__(self, other):
         """put the node to "delete" queue"""
-        self.deleted.put(other.oid)
+        with self._lock:
+            self.deleted[other.oid] = None
         return self
 
     def flick(self, node):
         """put the node to faster updated queue"""
-        self.flickering.put(node)
+        with self._lock:
+            self.flickering[node] = None
         return self
@@ -6,19 +6,20 @@ from pathlib import Path
 import re
 from dataclasses import dataclass, field
 import ast
+import builtins
 
 from pantra.common import UniNode
 from pantra.settings import config
 from pantra.compiler import CodeMetrics
 
 if typing.TYPE_CHECKING:
-    from typing import Self, Optional, Any
+    from typing import Self, Optional, Any, Callable
     from types import CodeType
 
     from pantra.session import Session
 
-__all__ = ['HTMLTemplate', 'MacroCode', 'collect_styles', 'collect_template', 'NodeType', 'AttrType', 'MacroType',
-           'get_template_path']
+__all__ = ['HTMLTemplate', 'MacroCode', 'StaticFragment', 'collect_styles', 'collect_template', 'NodeType', 'AttrType',
+           'MacroType', 'get_template_path']
 
 def is_expression_id(expr: str) -> str:
     # check expression is field "name"
@@ -50,6 +51,7 @@ class NodeType(IntEnum):
     AT_STYLE = auto()
     AT_REACT = auto()
     AT_EVENT = auto()
+    AT_STATIC = auto()
 
     @staticmethod
     def detect(tag_name: str) -> NodeType:
@@ -169,6 +171,84 @@ class AstNamesVisitor(ast.NodeVisitor):
     def visit_Name(self, node):
         self.vars.add(node.id)
 
+MACRO_ARGS = ('ctx', 'this')
+MACRO_LOCALS = '__locals'
+MACRO_GLOBALS = {'__builtins__': builtins}
+
+class MacroNamesTransformer(ast.NodeTransformer):
+    """Rewrite free names of an expression to lookups in context locals
+
+    Names bound inside the expression (lambda arguments, comprehension targets, assignment expressions)
+    stay intact. Builtins are looked up in locals first, as `eval` does.
+    """
+    def __init__(self):
+        self.scopes: list[set[str]] = [set()]
+
+    def _bound(self, name: str) -> bool:
+        return any(name in scope for scope in self.scopes)
+
+    def visit_Name(self, node: ast.Name):
+        if type(node.ctx) is not ast.Load:
+            self.scopes[-1].add(node.id)
+            return node
+        if node.id in MACRO_ARGS or self._bound(node.id):
+            return node
+        locals_node = ast.Name(MACRO_LOCALS, ast.Load())
+        if hasattr(builtins, node.id):
+            new_node = ast.Call(ast.Attribute(locals_node, 'get', ast.Load()),
+                                [ast.Constant(node.id), ast.Name(node.id, ast.Load())], [])
+        else:
+            new_node = ast.Subscript(locals_node, ast.Constant(node.id), ast.Load())
+        return ast.copy_location(new_node, node)
+
+    def visit_Lambda(self, node: ast.Lambda):
+        node.args = self.visit(node.args)
+        args = node.args
+        self.scopes.append({a.arg for a in args.posonlyargs + args.args + args.kwonlyargs}
+                           | {a.arg for a in (args.vararg, args.kwarg) if a})
+        node.body = self.visit(node.body)
+        self.scopes.pop()
+        return node
+
+    def visit_arguments(self, node: ast.arguments):
+        # defaults are evaluated in the outer scope
+        node.defaults = [self.visit(d) for d in node.defaults]
+        node.kw_defaults = [d and self.visit(d) for d in node.kw_defaults]
+        return node
+
+    def _visit_comprehension(self, node, fields: tuple[str, ...]):
+        # the first iterable is evaluated in the outer scope
+        first = node.generators[0]
+        first.iter = self.visit(first.iter)
+        self.scopes.append(set())
+        for i, gen in enumerate(node.generators):
+            if i:
+                gen.iter = self.visit(gen.iter)
+            gen.target = self.visit(gen.target)
+            gen.ifs = [self.visit(cond) for cond in gen.ifs]
+        for name in fields:
+            setattr(node, name, self.visit(getattr(node, name)))
+        self.scopes.pop()
+        return node
+
+    def visit_ListComp(self, node):
+        return self._visit_comprehension(node, ('elt',))
+
+    visit_SetComp = visit_GeneratorExp = visit_ListComp
+
+    def visit_DictComp(self, node):
+        return self._visit_comprehension(node, ('key', 'value'))
+
+
+def compile_macro(src: str, filename: str = '<macro>') -> Callable[[Any, Any, dict], Any]:
+    """compile expression source to function `(ctx, this, locals)`"""
+    expr = ast.parse(src.strip(), filename, 'eval')
+    module = ast.parse(f"def macro({', '.join(MACRO_ARGS)}, {MACRO_LOCALS}): return None", filename)
+    module.body[0].body[0].value = MacroNamesTransformer().visit(expr.body)
+    namespace = {}
+    exec(compile(ast.fix_missing_locations(module), filename, 'exec'), MACRO_GLOBALS, namespace)
+    return namespace['macro']
+
 @dataclass(slots=True)
 class MacroCode:
     """Python code adaptation for scripts and expressions
@@ -180,6 +260,7 @@ class MacroCode:
         src: source text
         code: compiled code in one of three forms
         vars: reactive variables list
+        func: expression compiled to function `(ctx, this, locals)`
     """
     type: MacroType
     reactive: bool
@@ -187,17 +268,50 @@ class MacroCode:
     code: CodeType | list[str] | str | None
     src: str
     vars: set[str] = field(init=False, repr=False)
+    func: Callable[[Any, Any, dict], Any] = field(init=False, repr=False, compare=False)
 
     def __post_init__(self) -> None:
         visitor = AstNamesVisitor()
         visitor.visit(ast.parse(self.src))
         self.vars = visitor.vars
+        self.func = compile_macro(self.src, self.code.co_filename if hasattr(self.code, 'co_filename') else '<macro>')
 
         if is_expression_id(self.src):
             self.code = self.src
         elif is_expression_canonical(self.src):
             self.code = self.src.split('.')
 
+CLASS_MARK = '\x01'  #: place of component class name in `class` attribute of static fragment
+NO_CLASS_MARK = '\x02'  #: place of `class` attribute with component class name only
+
+class StaticFragment:
+    """Pre-built HTML of static subtree, shared by all sessions
+
+    Elements of the fragment get component class name if the component has its own styles,
+    so HTML is made once per class name.
+
+    Attributes:
+        raw: HTML text with marks of class name places
+    """
+    __slots__ = ['raw', '_html']
+
+    def __init__(self, raw: str):
+        self.raw: str = raw
+        self._html: dict[str, str] = {}
+
+    def __repr__(self):
+        return f'StaticFragment({self.raw!r})'
+
+    def html(self, class_name: str = '') -> str:
+        """HTML text with component class name at every element"""
+        if (res := self._html.get(class_name)) is None:
+            if class_name:
+                res = self.raw.replace(CLASS_MARK, class_name + ' ').replace(NO_CLASS_MARK, f' class="{class_name}"')
+            else:
+                res = self.raw.replace(CLASS_MARK, '').replace(NO_CLASS_MARK, '')
+            self._html[class_name] = res
+        return res
+
 def get_template_path(t: HTMLTemplate | CodeType) -> Path:
     if type(t) is HTMLTemplate:
         return t.filename.parent
@@ -0,0 +1,89 @@
+"""Compression of websocket frames sent to client-side
+
+Client-side offers :data:`SUBPROTOCOL` on connection if it is able to decompress frames.
+It is agreed only if web server does not compress frames by `permessage-deflate` extension already,
+see `WS_PER_MESSAGE_DEFLATE` parameter. Compressed frame starts with :data:`FRAME_HEADER` and uncompressed size (4 bytes, little-endian),
+followed by raw deflate data ended with sync flush. Other frames go as is.
+"""
+from __future__ import annotations
+
+import struct
+import time
+import typing
+import zlib
+
+from .metrics import metrics
+from .settings import config
+
+if typing.TYPE_CHECKING:
+    from typing import *
+    from starlette.websockets import WebSocket
+
+__all__ = ['SUBPROTOCOL', 'PLAIN_SUBPROTOCOL', 'FRAME_HEADER', 'FrameCompressor', 'negotiate_subprotocol',
+           'per_message_deflate']
+
+SUBPROTOCOL = 'pantra.z'  #: client-side accepts compressed frames
+PLAIN_SUBPROTOCOL = 'pantra'  #: client-side accepts plain frames only
+FRAME_HEADER = b'Z'
+
+_pack_size = struct.Struct('<I').pack
+
+
+def per_message_deflate(ws: WebSocket) -> bool:
+    """check if web server compresses frames of the connection by itself"""
+    return config.WS_PER_MESSAGE_DEFLATE and 'permessage-deflate' in ws.headers.get('sec-websocket-extensions', '')
+
+
+def negotiate_subprotocol(ws: WebSocket) -> str | None:
+    """choose websocket subprotocol among offered by client-side"""
+    offered = ws.scope.get('subprotocols') or ()
+    if config.WS_COMPRESSION and SUBPROTOCOL in offered and not per_message_deflate(ws):
+        return SUBPROTOCOL
+    if PLAIN_SUBPROTOCOL in offered:
+        return PLAIN_SUBPROTOCOL
+    return None
+
+
+class FrameCompressor:
+    """Streaming compressor of frames to one client-side
+
+    All frames of connection go through one deflate stream, so previous frames serve as dictionary for next ones.
+    Frames shorter than `threshold` are sent as is.
+
+    Frames count, raw and sent bytes, compression time and ratio are collected to :data:`~pantra.metrics.metrics`
+    under `ws.` prefix.
+
+    Arguments:
+        level: zlib compression level
+        threshold: min frame size to compress
+    """
+    __slots__ = ['threshold', '_compressor']
+
+    def __init__(self, level: int = 1, threshold: int = 512):
+        self.threshold = threshold
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    @classmethod
+    def for_websocket(cls, ws: WebSocket) -> FrameCompressor | None:
+        """make compressor if client-side has agreed on compression"""
+        if negotiate_subprotocol(ws) != SUBPROTOCOL:
+            return None
+        return cls(config.WS_COMPRESSION, config.WS_COMPRESSION_THRESHOLD)
+
+    def compress(self, frame: bytes) -> bytes:
+        size = len(frame)
+        metrics.add('ws.frames')
+        if size < self.threshold:
+            metrics.add('ws.raw_bytes', size)
+            metrics.add('ws.sent_bytes', size)
+            return frame
+
+        start = time.perf_counter()
+        data = b''.join((FRAME_HEADER, _pack_size(size),
+                         self._compressor.compress(frame), self._compressor.flush(zlib.Z_SYNC_FLUSH)))
+        metrics.add('ws.compress_time', time.perf_counter() - start)
+        metrics.add('ws.compressed_frames')
+        raw = metrics.add('ws.raw_bytes', size)
+        sent = metrics.add('ws.sent_bytes', len(data))
+        metrics.set('ws.compression_ratio', raw / sent)
+        return data
@@ -15,6 +15,7 @@ This module has no dependencies and works on Python 3.4+.
 """
 
 import bz2
+import copy
 import hashlib
 import logging
 import struct
@@ -57,6 +58,25 @@ def lendecode(f):
     return n
 
 
+_lencodes = [spack('<B', i) for i in range(251)]
+_pack_h = struct.Struct('<h').pack
+_pack_q = struct.Struct('<q').pack
+_pack_d = struct.Struct('<d').pack
+_pack_f = struct.Struct('<f').pack
+_unpack_h = struct.Struct('<h').unpack_from
+_unpack_q = struct.Struct('<q').unpack_from
+_unpack_Q = struct.Struct('<Q').unpack_from
+_unpack_d = struct.Struct('<d').unpack_from
+_unpack_f = struct.Struct('<f').unpack_from
+_unpack_H = struct.Struct('<H').unpack_from
+
+
+def _encode_index(i):
+    """ Encode string table index, one byte up to 250, three bytes after.
+    """
+    return _lencodes[i] if i <= 250 else spack('<BH', 251, i)
+
+
 def encode_type_id(b, ext_id):
     """ Encode the type identifier, with or without extension id.
     """
@@ -90,6 +110,13 @@ class BsdfLiteSerializer(object):
     def __init__(self, extensions=None, **options):
         self._extensions = {}  # name -> extension
         self._extensions_by_cls = {}  # cls -> (name, extension.encode)
+        self._writers = dict(_base_writers)  # cls -> fast writer
+        self._keys = {}  # dict key -> encoded key
+        self._names = {}  # encoded dict key -> dict key
+        self._strings = None  # string -> encoded table index
+        self._strings_size = 0
+        self._value_keys = frozenset()
+        self._table = {}  # table index -> string
         if extensions is None:
             extensions = standard_extensions
         for extension in extensions:
@@ -148,6 +175,7 @@ class BsdfLiteSerializer(object):
         for cls in clss:
             self._extensions_by_cls[cls] = name, extension.encode
         self._extensions[name] = extension
+        self._writers = dict(_base_writers)
         return extension_class
 
     def remove_extension(self, name):
@@ -160,6 +188,7 @@ class BsdfLiteSerializer(object):
         for cls in list(self._extensions_by_cls.keys()):
             if self._extensions_by_cls[cls][0] == name:
                 self._extensions_by_cls.pop(cls)
+        self._writers = dict(_base_writers)
 
     def _encode(self, f, value, ext_id):
         """ Main encoder function.
@@ -390,12 +419,98 @@ class BsdfLiteSerializer(object):
 
         return value
 
+    def with_strings(self, size=4096, value_keys=()):
+        """ Create encoder sharing extensions with this one, which sends
+        repeated strings by their index in a string table.
+
+        This is an extension of the format, the decoder has to keep the
+        table for the whole stream of messages. Dict keys and string
+        values under `value_keys` get into the table, up to `size` entries.
+        Strings of one byte are cheaper to send as is.
+
+        Table items are encoded with explicit indices, so decoder doesn't
+        need to reset its table, it gets overwritten after the encoder
+        calls `reset_strings()`.
+        """
+        encoder = copy.copy(self)
+        encoder._writers = dict(self._writers)
+        encoder._writers[dict] = _write_dict_table
+        encoder._strings = {}
+        encoder._strings_size = min(size, 65536)
+        encoder._value_keys = frozenset(value_keys)
+        encoder._table = {}
+        return encoder
+
+    def reset_strings(self):
+        """ Start the string table over.
+        """
+        self._strings.clear()
+
+    def _intern(self, string):
+        strings = self._strings
+        if len(strings) >= self._strings_size:
+            return None
+        ref = strings[string] = _encode_index(len(strings))
+        return ref
+
+    # Fast encoder, writes the same bytes as `_encode` into a single
+    # bytearray. Values of exact base types go to specialized writers,
+    # other classes are resolved once and their writers are cached.
+
+    def _write(self, buf, value, ext):
+        """ Write value, `ext` is encoded extension id or None.
+        """
+        writer = self._writers.get(value.__class__)
+        if writer is None:
+            self._write_other(buf, value, ext)
+        else:
+            writer(self, buf, value, ext)
+
+    def _write_other(self, buf, value, ext):
+        cls = value.__class__
+        # Subclasses of base types
+        for base, writer in _base_writers.items():
+            if isinstance(value, base) and base is not bool:
+                writer = self._writers[base]
+                self._writers[cls] = writer
+                writer(self, buf, value, ext)
+                return
+        # Implicit conversion of numpy scalars
+        if getattr(value, "shape", None) == () and str(
+            getattr(value, "dtype", "")
+        ).startswith(("uint", "int", "float")):
+            if 'int' in str(value.dtype):
+                _write_int(self, buf, int(value), ext)
+            else:
+                _write_float(self, buf, float(value), ext)
+            return
+        if ext is not None:
+            raise ValueError(
+                'Extension %s wronfully encodes object to another '
+                'extension object (though it may encode to a list/dict '
+                'that contains other extension objects).' % ext[1:].decode('UTF-8'))
+        # Extensions, subclasses are matched once
+        ex = self._extensions_by_cls.get(cls, None)
+        if ex is None:
+            for name, c in self._extensions.items():
+                if c.match(self, value):
+                    ex = name, c.encode
+                    break
+            else:
+                t = ('Class %r is not a valid base BSDF type, nor is it '
+                     'handled by an extension.')
+                raise TypeError(t % cls.__name__)
+        writer = _extension_writer(*ex)
+        self._writers[cls] = writer
+        writer(self, buf, value, None)
+
     def encode(self, ob):
         """ Save the given object to bytes.
         """
-        f = BytesIO()
-        self.save(f, ob)
-        return f.getvalue()
+        buf = bytearray(b'BSDF')
+        buf += spack('<BB', VERSION[0], VERSION[1])
+        self._write(buf, ob, None)
+        return bytes(buf)
 
     def save(self, f, ob):
         """ Write the given object to the given file object.
@@ -406,11 +521,193 @@ class BsdfLiteSerializer(object):
 
         self._encode(f, ob, None)
 
+    # Fast decoder, reads values from a memoryview with an integer cursor
+    # instead of a file object. Dict keys are decoded once and reused.
+
+    def _read(self, data, pos):
+        """ Decode value at position, return it with the next position.
+        """
+        try:
+            c = data[pos]
+        except IndexError:
+            raise EOFError() from None
+        pos += 1
+
+        # Conversion (uppercase value identifiers signify converted values)
+        if 65 <= c <= 90:
+            n = data[pos]
+            ext_id = str(data[pos + 1:pos + 1 + n], 'UTF-8')
+            pos += 1 + n
+            c += 32
+        else:
+            ext_id = None
+
+        if c == 109:  # m
+            value = {}
+            n = data[pos]
+            pos += 1
+            if n == 253:
+                n = _unpack_Q(data, pos)[0]
+                pos += 8
+            names = self._names
+            for i in range(n):
+                n_name = data[pos]
+                pos += 1
+                if n_name == 253:
+                    n_name = _unpack_Q(data, pos)[0]
+                    pos += 8
+                elif n_name >= 254:
+                    # String table reference or definition
+                    index = data[pos]
+                    pos += 1
+                    if index == 251:
+                        index = _unpack_H(data, pos)[0]
+                        pos += 2
+                    if n_name == 254:
+                        name = self._table[index]
+                    else:
+                        n_name = data[pos]
+                        pos += 1
+                        if n_name == 253:
+                            n_name = _unpack_Q(data, pos)[0]
+                            pos += 8
+                        name = self._table[index] = str(data[pos:pos + n_name], 'UTF-8')
+                        pos += n_name
+                    n_name = 0
+                if n_name:
+                    name_b = data[pos:pos + n_name]
+                    pos += n_name
+                    name = names.get(name_b)
+                    if name is None:
+                        name = str(name_b, 'UTF-8')
+                        if len(names) < 4096:
+                            names[bytes(name_b)] = name
+                # Short path for plain scalars
+                c = data[pos]
+                if c == 104:  # h
+                    value[name] = _unpack_h(data, pos + 1)[0]
+                    pos += 3
+                elif c == 115 and data[pos + 1] < 253:  # s
+                    n_s = data[pos + 1]
+                    pos += 2 + n_s
+                    value[name] = str(data[pos - n_s:pos], 'UTF-8')
+                elif c == 118:  # v
+                    value[name] = None
+                    pos += 1
+                else:
+                    value[name], pos = self._read(data, pos)
+        elif c == 115:  # s
+            n = data[pos]
+            pos += 1
+            if n == 253:
+                n = _unpack_Q(data, pos)[0]
+                pos += 8
+            value = str(data[pos:pos + n], 'UTF-8')
+            pos += n
+        elif c == 104:  # h
+            value = _unpack_h(data, pos)[0]
+            pos += 2
+        elif c == 108:  # l
+            n = data[pos]
+            pos += 1
+            streaming = n == 255
+            if n >= 253:
+                n = _unpack_Q(data, pos)[0]
+                pos += 8
+            if streaming:
+                # Unclosed stream, up to the end of data
+                value = []
+                while pos < len(data):
+                    v, pos = self._read(data, pos)
+                    value.append(v)
+            else:
+                value = [None] * n
+                for i in range(n):
+                    value[i], pos = self._read(data, pos)
+        elif c == 118:  # v
+            value = None
+        elif c == 121:  # y
+            value = True
+        elif c == 110:  # n
+            value = False
+        elif c == 100:  # d
+            value = _unpack_d(data, pos)[0]
+            pos += 8
+        elif c == 105:  # i
+            value = _unpack_q(data, pos)[0]
+            pos += 8
+        elif c == 102:  # f
+            value = _unpack_f(data, pos)[0]
+            pos += 4
+        elif c == 114:  # r, string table reference
+            index = data[pos]
+            pos += 1
+            if index == 251:
+                index = _unpack_H(data, pos)[0]
+                pos += 2
+            value = self._table[index]
+        elif c == 107:  # k, string table definition
+            index = data[pos]
+            pos += 1
+            if index == 251:
+                index = _unpack_H(data, pos)[0]
+                pos += 2
+            n = data[pos]
+            pos += 1
+            if n == 253:
+                n = _unpack_Q(data, pos)[0]
+                pos += 8
+            value = self._table[index] = str(data[pos:pos + n], 'UTF-8')
+            pos += n
+        elif c == 98:  # b
+            sizes = []
+            for i in range(3):
+                size = data[pos]
+                pos += 1
+                if size == 253:
+                    size = _unpack_Q(data, pos)[0]
+                    pos += 8
+                sizes.append(size)
+            allocated_size, used_size, data_size = sizes
+            compression = data[pos]
+            has_checksum = data[pos + 1]
+            pos += 18 if has_checksum else 2
+            # Skip alignment
+            pos += 1 + data[pos]
+            compressed = bytes(data[pos:pos + used_size])
+            pos += allocated_size
+            if compression == 0:
+                value = compressed
+            elif compression == 1:
+                value = zlib.decompress(compressed)
+            elif compression == 2:
+                value = bz2.decompress(compressed)
+            else:
+                raise RuntimeError('Invalid compression %i' % compression)
+        else:
+            raise RuntimeError('Parse error %r' % bytes((c,)))
+
+        # Convert value if we have a nextension for it
+        if ext_id is not None:
+            extension = self._extensions.get(ext_id, None)
+            if extension is not None:
+                value = extension.decode(self, value)
+            else:
+                logger.warn('BSDF warning: no extension found for %r' % ext_id)
+
+        return value, pos
+
     def decode(self, bb):
         """ Load the data structure that is BSDF-encoded in the given bytes.
         """
-        f = BytesIO(bb)
-        return self.load(f)
+        data = memoryview(bb)
+        if not data.readonly:
+            # dict keys are looked up by slices, writable ones are unhashable
+            data = memoryview(bytes(data))
+        if data[:4] != b'BSDF':
+            raise RuntimeError('This does not look a BSDF file.')
+        self._check_version(data[4], data[5])
+        return self._read(data, 6)[0]
 
     def load(self, f):
         """ Load a BSDF-encoded object from the given file object.
@@ -421,17 +718,248 @@ class BsdfLiteSerializer(object):
         # Check version
         major_version = strunpack('<B', f.read(1))[0]
         minor_version = strunpack('<B', f.read(1))[0]
-        file_version = '%i.%i' % (major_version, minor_version)
+        self._check_version(major_version, minor_version)
+
+        return self._decode(f)
+
+    @staticmethod
+    def _check_version(major_version, minor_version):
         if major_version != VERSION[0]:  # major version should be 2
-            t = ('Reading file with different major version (%s) '
+            t = ('Reading file with different major version (%i.%i) '
                  'from the implementation (%s).')
-            raise RuntimeError(t % (file_version, __version__))
+            raise RuntimeError(t % (major_version, minor_version, __version__))
         if minor_version > VERSION[1]:  # minor should be < ours
-            t = ('BSDF warning: reading file with higher minor version (%s) '
+            t = ('BSDF warning: reading file with higher minor version (%i.%i) '
                  'than the implementation (%s).')
-            logger.warn(t % (file_version, __version__))
+            logger.warn(t % (major_version, minor_version, __version__))
 
-        return self._decode(f)
+
+# %% Fast encoder writers
+
+
+def _extension_writer(name, encode):
+    bb = name.encode('UTF-8')
+    ext_id = lencode(len(bb)) + bb
+
+    def write_extension(s, buf, value, ext):
+        if ext is not None:
+            raise ValueError(
+                'Extension %s wronfully encodes object to another '
+                'extension object (though it may encode to a list/dict '
+                'that contains other extension objects).' % name)
+        s._write(buf, encode(s, value), ext_id)
+    return write_extension
+
+
+def _write_none(s, buf, value, ext):
+    if ext is None:
+        buf += b'v'
+    else:
+        buf += b'V'
+        buf += ext
+
+
+def _write_bool(s, buf, value, ext):
+    if ext is None:
+        buf += b'y' if value else b'n'
+    else:
+        buf += b'Y' if value else b'N'
+        buf += ext
+
+
+def _write_int(s, buf, value, ext):
+    if -32768 <= value <= 32767:
+        if ext is None:
+            buf += b'h'
+        else:
+            buf += b'H'
+            buf += ext
+        buf += _pack_h(value)
+    else:
+        if ext is None:
+            buf += b'i'
+        else:
+            buf += b'I'
+            buf += ext
+        buf += _pack_q(value)
+
+
+def _write_float(s, buf, value, ext):
+    if s._float64:
+        if ext is None:
+            buf += b'd'
+        else:
+            buf += b'D'
+            buf += ext
+        buf += _pack_d(value)
+    else:
+        if ext is None:
+            buf += b'f'
+        else:
+            buf += b'F'
+            buf += ext
+        buf += _pack_f(value)
+
+
+def _write_str(s, buf, value, ext):
+    bb = value.encode('UTF-8')
+    n = len(bb)
+    if ext is None:
+        buf += b's'
+    else:
+        buf += b'S'
+        buf += ext
+    buf += _lencodes[n] if n <= 250 else spack('<BQ', 253, n)
+    buf += bb
+
+
+def _write_list(s, buf, value, ext):
+    n = len(value)
+    if ext is None:
+        buf += b'l'
+    else:
+        buf += b'L'
+        buf += ext
+    buf += _lencodes[n] if n <= 250 else spack('<BQ', 253, n)
+    writers = s._writers
+    for v in value:
+        writer = writers.get(v.__class__)
+        if writer is None:
+            s._write_other(buf, v, None)
+        else:
+            writer(s, buf, v, None)
+
+
+def _write_dict(s, buf, value, ext):
+    n = len(value)
+    if ext is None:
+        buf += b'm'
+    else:
+        buf += b'M'
+        buf += ext
+    buf += _lencodes[n] if n <= 250 else spack('<BQ', 253, n)
+    writers = s._writers
+    keys = s._keys
+    for key, v in value.items():
+        name_b = keys.get(key)
+        if name_b is None:
+            assert isinstance(key, str)
+            name_b = key.encode('UTF-8')
+            name_b = lencode(len(name_b)) + name_b
+            if len(keys) < 4096:
+                keys[key] = name_b
+        buf += name_b
+        writer = writers.get(v.__class__)
+        if writer is None:
+            s._write_other(buf, v, None)
+        else:
+            writer(s, buf, v, None)
+
+
+def _write_symbol(s, buf, value):
+    ref = s._strings.get(value)
+    if ref is not None:
+        buf += b'r'
+        buf += ref
+        return
+    bb = value.encode('UTF-8')
+    n = len(bb)
+    if n > 1 and (ref := s._intern(value)) is not None:
+        buf += b'k'
+        buf += ref
+    else:
+        buf += b's'
+    buf += _lencodes[n] if n <= 250 else spack('<BQ', 253, n)
+    buf += bb
+
+
+def _write_dict_table(s, buf, value, ext):
+    n = len(value)
+    if ext is None:
+        buf += b'm'
+    else:
+        buf += b'M'
+        buf += ext
+    buf += _lencodes[n] if n <= 250 else spack('<BQ', 253, n)
+    writers = s._writers
+    strings = s._strings
+    value_keys = s._value_keys
+    for key, v in value.items():
+        ref = strings.get(key)
+        if ref is not None:
+            buf.append(254)
+            buf += ref
+        else:
+            assert isinstance(key, str)
+            name_b = key.encode('UTF-8')
+            if len(name_b) > 1 and (ref := s._intern(key)) is not None:
+                buf.append(255)
+                buf += ref
+            buf += lencode(len(name_b))
+            buf += name_b
+        if key in value_keys:
+            if v.__class__ is str:
+                _write_symbol(s, buf, v)
+                continue
+            if v.__class__ is list and all(item.__class__ is str for item in v):
+                buf += b'l'
+                buf += lencode(len(v))
+                for item in v:
+                    _write_symbol(s, buf, item)
+                continue
+        writer = writers.get(v.__class__)
+        if writer is None:
+            s._write_other(buf, v, None)
+        else:
+            writer(s, buf, v, None)
+
+
+def _write_bytes(s, buf, value, ext):
+    if ext is None:
+        buf += b'b'
+    else:
+        buf += b'B'
+        buf += ext
+    compression = s._compression
+    if compression == 0:
+        compressed = value
+    elif compression == 1:
+        compressed = zlib.compress(value, 9)
+    else:
+        compressed = bz2.compress(value, 9)
+    data_size = len(value)
+    used_size = len(compressed)
+    if used_size <= 250 and compression == 0:
+        buf += spack('<BB', used_size, used_size)
+        buf += lencode(data_size)
+    else:
+        buf += spack('<BQBQBQ', 253, used_size, 253, used_size, 253, data_size)
+    buf += spack('B', compression)
+    if s._use_checksum:
+        buf += b'\xff' + hashlib.md5(compressed).digest()
+    else:
+        buf += b'\x00'
+    if compression == 0:
+        alignment = 8 - (len(buf) + 1) % 8
+        buf += spack('<B', alignment)
+        buf += b'\x00' * alignment
+    else:
+        buf += b'\x00'
+    buf += compressed
+
+
+# Exact types, the order is used to resolve subclasses
+_base_writers = {
+    type(None): _write_none,
+    bool: _write_bool,
+    int: _write_int,
+    float: _write_float,
+    str: _write_str,
+    list: _write_list,
+    tuple: _write_list,
+    dict: _write_dict,
+    bytes: _write_bytes,
+}
 
 
 # %% Standard extensions
@@ -14,6 +14,7 @@ if typing.TYPE_CHECKING:
     from .routes import BaseRouter
     from .workers.base import BaseWorkerServer, BaseWorkerClient
     from .session_storage import SessionStorage
+    from .codecs.base import WireCodec
 
 def get_proj_path():
     if 'sphinx._cli' in sys.modules:
@@ -86,19 +87,37 @@ class Config:
     DEFAULT_LANGUAGE: str = 'en' #: Default language `code <https://www.unicode.org/cldr/charts/48/supplemental/territory_language_information.html>`__
     PRODUCTIVE: bool = False  #: Flag app as "productive-ready"
     RUN_CACHED: bool = False  #: Load components from :doc:`pre-cached <cache>` directory
+    RUN_JIT: bool = False  #: Generate :doc:`cached <cache>` component classes in memory on first use
+    COMPONENT_PROTOTYPES: bool = True  #: Execute shared part of component code once per process, see :ref:`prototypes <prototypes>`
+    STATIC_FRAGMENTS: bool = True  #: Send static subtrees of templates as pre-built HTML fragments, see :ref:`static fragments <static fragments>`
+    SSR: bool = False  #: Render `Main` component into bootstrap page for the first paint, see :ref:`SSR <ssr>`
+    SSR_TTL: int = 30  #: Drop prerendered session if client-side doesn't connect within specified amount of seconds
+    SSR_LIMIT: int = 1000  #: Max. amount of prerendered sessions waiting for client-side, pages go without content above it
 
     MIN_TASK_THREADS: int = 2  #: Min. amount of threads to execute clicks/callbacks
     MAX_TASK_THREADS: int = 100  #: Max. amount of threads. Check :doc:`threads <threads>`
-    CREATE_THREAD_LAG: int = 3  #: Time in seconds to wait for relaxed thread before create one
-    KILL_THREAD_LAG: int = 300  #: Kill redundant threads after specified amount of seconds
+    CREATE_THREAD_LAG: float = 0.05  #: Target time in seconds a task waits for relaxed thread, more threads are created above it
+    KILL_THREAD_LAG: int = 300  #: Redundant thread quits after being idle for specified amount of seconds, 0 to keep all
     THREAD_TIMEOUT: int = 0  #: Kill occupied thread if it hangs for too long
 
     SOCKET_TIMEOUT: int = 180  #: Amount of seconds to wait websocket connection restored
     WS_HEARTBEAT_INTERVAL: float | None = None  #: Websocket ping interval to support connection
     SESSION_TTL: int = 1800  #: Reset passive user session after specified amount of seconds
     MAX_MESSAGE_SIZE: int = 4 * 1024 * 1024  #: Websocket max message size in bytes
+    WS_PER_MESSAGE_DEFLATE: bool = True  #: Web server compresses websocket frames by `permessage-deflate` extension if client-side offers it
+    WS_COMPRESSION: int = 1  #: zlib level to compress websocket frames when `permessage-deflate` is not in use, `0` to send them plain. See :mod:`pantra.compression`
+    WS_COMPRESSION_THRESHOLD: int = 512  #: Websocket frames shorter than this are sent uncompressed
+    RESEND_CHUNK_SIZE: int = 500  #: Max nodes per message when the whole page is resent after refresh
+    REPLAY_BUFFER_SIZE: int = 1024 * 1024  #: Max bytes of sent messages kept to :mod:`replay <pantra.replay>` after reconnect, `0` to resend whole page
+    OUTBOUND_SOFT_LIMIT: int = 256 * 1024  #: Bytes of messages waiting for slow client, then DOM changes are held and merged until it catches up
+    OUTBOUND_HARD_LIMIT: int = 4 * 1024 * 1024  #: Bytes of messages waiting for slow client, then they are dropped and whole page is resent
+    METRICS_PATH: str = ''  #: URL to report runtime :mod:`metrics <pantra.metrics>` in JSON, empty to turn off
     LOCKS_TIMEOUT: int = 5  #: Amount of seconds to wait requested data from client side
     SHOTS_PER_SECOND: int = 25  #: Max fps for flickering shots (resize, grab/move, etc)
+    LOOP_WINDOW_SIZE: int = 50  #: Items rendered by :ref:`windowed loop <windowed loop>` until client reports its viewport
+    LOOP_WINDOW_OVERSCAN: int = 20  #: Extra items rendered by windowed loop above and below the viewport
+    WIRE_CODEC: str | type[WireCodec] = '{pantra.codecs.bsdf:BsdfCodec}'  #: Canonic path to :doc:`wire codec <wire_codec>` class
+    WIRE_STRINGS: int = 4096  #: Size of per-session table of names sent to client-side by index, `0` to turn off
 
     BOOTSTRAP_FILENAME: Path = COMPONENTS_PATH / "bootstrap.html"  #: Path to bootstrap :doc:`template <template>`
     APP_TITLE: str = "Pantra Web App"  #: Page title in the browser
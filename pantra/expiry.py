@@ -0,0 +1,75 @@
+"""Expiration index of sessions
+
+Deadlines are kept in a min-heap with lazy deletion. Moving a deadline later costs a dict update only:
+the key keeps its heap entry, and when the entry comes due it is pushed again with the actual deadline.
+Moving a deadline earlier pushes one more entry, so the key could have stale duplicates in the heap.
+Actual deadlines are kept in a dict, and entries which do not match it are skipped or pushed again when
+they come due. So the session TTL controller takes expired keys once, without looking at others,
+see :meth:`~pantra.workers.base.BaseWorkerServer.session_killer`.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import typing
+
+if typing.TYPE_CHECKING:
+    from typing import *
+
+__all__ = ['ExpiryHeap']
+
+
+class ExpiryHeap:
+    """Keys by deadline, thread-safe
+
+    Deadlines are arbitrary increasing numbers, e.g. :func:`time.monotonic`.
+    """
+    __slots__ = ['_heap', '_deadlines', '_counter', '_lock']
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._deadlines: dict[Hashable, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def touch(self, key: Hashable, deadline: float):
+        """set deadline of the key"""
+        with self._lock:
+            current = self._deadlines.get(key)
+            self._deadlines[key] = deadline
+            if current is None or deadline < current:
+                heapq.heappush(self._heap, (deadline, next(self._counter), key))
+
+    def remove(self, key: Hashable):
+        """forget the key, its heap entry is dropped when it comes due"""
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def next_deadline(self) -> float | None:
+        """the earliest deadline, or earlier one if the key is touched since"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> list[Hashable]:
+        """remove and return keys with deadlines up to `now`"""
+        res = []
+        heap = self._heap
+        deadlines = self._deadlines
+        with self._lock:
+            while heap and heap[0][0] <= now:
+                _, _, key = heapq.heappop(heap)
+                if (deadline := deadlines.get(key)) is None:
+                    continue
+                if deadline > now:
+                    heapq.heappush(heap, (deadline, next(self._counter), key))
+                    continue
+                del deadlines[key]
+                res.append(key)
+        return res
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable):
+        return key in self._deadlines
@@ -106,6 +106,8 @@ function BsdfSerializer(extensions) {
      * Other formats also use it to associate options, but we don't have any.
      */
     this.extensions = [];
+    // Strings table of the encoder, filled while decoding (format extension)
+    this.strings = [];
     if (extensions === undefined) { extensions = standard_extensions; }
     if (!Array.isArray(extensions)) { throw new TypeError("Extensions must be an array."); }
     for (var i=0; i<extensions.length; i++) {
@@ -463,6 +465,17 @@ function BytesReader(buf) {
     function get_uint8() {
         return buf8[pos++];
     }
+    function unget() {
+        pos--;
+    }
+    function get_index() {
+        var s = buf8[pos++];
+        if (s == 251) {
+            s = bufdv.getUint16(pos, true);
+            pos += 2;
+        }
+        return s;
+    }
     function get_int16() {
         var s = bufdv.getInt16(pos, true);
         pos += 2;
@@ -492,7 +505,7 @@ function BytesReader(buf) {
     }
 
     return {tell: tell, get_size:get_size, get_bytes: get_bytes,
-            get_uint8: get_uint8, get_int16: get_int16, get_int64: get_int64,
+            get_uint8: get_uint8, get_int16: get_int16, get_int64: get_int64, unget: unget, get_index: get_index,
             get_float32: get_float32, get_float64: get_float64, get_char: get_char, get_str: get_str};
 
 }
@@ -529,6 +542,11 @@ BsdfSerializer.prototype.decode_object = function (f) {
         value = f.get_float64();
     } else if (c == 's') {
         value = f.get_str();
+    } else if (c == 'r') {
+        value = this.strings[f.get_index()];
+    } else if (c == 'k') {
+        var index = f.get_index();
+        value = this.strings[index] = f.get_str();
     } else if (c == 'l') {
         var n = f.get_size();
         if (n < 0) {
@@ -550,7 +568,17 @@ BsdfSerializer.prototype.decode_object = function (f) {
         var nm = f.get_size();
         value = {};
         for (var j=0; j<nm; j++) {
-            var key = f.get_str();
+            var key;
+            var ks = f.get_uint8();
+            if (ks == 254) {
+                key = this.strings[f.get_index()];
+            } else if (ks == 255) {
+                var key_index = f.get_index();
+                key = this.strings[key_index] = f.get_str();
+            } else {
+                f.unget();
+                key = f.get_str();
+            }
             value[key] = this.decode_object(f);
         }
     } else if (c == 'b') {
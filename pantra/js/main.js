@@ -17,15 +17,22 @@ function start(newLocalId, newTabId, cacheId, webPath) {
         localStorage.setItem('local_id', localId);
     }
     let tabId = sessionStorage.getItem('tab_id');
-    if (!tabId) {
+    // prerendered content belongs to the new session only
+    let prerendered = OID.adopt(rootNode()) > 0;
+    if (!tabId || prerendered) {
         tabId = newTabId;
         sessionStorage.setItem('tab_id', tabId);
     }
+    if (prerendered)
+        contentFilled = true;
     let protocol = location.protocol === "http:"? "ws" : "wss";
     let app_name = location.pathname === "/" ? "" : location.pathname;
     wsConnection = new WSClient(`${protocol}://${location.host}${app_name}/ws/${localId}/${tabId}${location.search}`);
     wsConnection.onrefresh = () => {
-        sendMessage(Messages.up())
+        sendMessage(Messages.up(wsConnection.lastSeq))
+    };
+    wsConnection.onack = (seq) => {
+        sendMessage(Messages.ack(seq))
     };
 
     wsConnection.onmessage = (data) => {
@@ -0,0 +1,206 @@
+/* MessagePack codec (https://msgpack.org), alternative to BSDF
+ *
+ * Extensions are the same as for BSDF. Each one goes as MessagePack extension type
+ * with the code of its one-letter name, holding the packed value.
+ */
+
+class MsgpackSerializer {
+    constructor(extensions) {
+        this.extensions = {};
+        this.encoders = [];
+        for (let e of extensions) {
+            let code = e.name.charCodeAt(0);
+            this.extensions[code] = e;
+            if (e.match)
+                this.encoders.push([code, e]);
+        }
+        this.textDecoder = new TextDecoder('utf-8');
+        this.textEncoder = new TextEncoder();
+    }
+
+    //---- decoder
+
+    decode(buf) {
+        this.view = buf instanceof ArrayBuffer ? new DataView(buf) : new DataView(buf.buffer, buf.byteOffset, buf.byteLength);
+        this.bytes = new Uint8Array(this.view.buffer, this.view.byteOffset, this.view.byteLength);
+        this.pos = 0;
+        let value = this.decodeObject();
+        this.view = this.bytes = null;
+        return value;
+    }
+
+    decodeObject() {
+        let view = this.view;
+        let c = this.bytes[this.pos++];
+        if (c <= 0x7f) return c;
+        if (c <= 0x8f) return this.decodeMap(c & 0x0f);
+        if (c <= 0x9f) return this.decodeArray(c & 0x0f);
+        if (c <= 0xbf) return this.decodeStr(c & 0x1f);
+        if (c >= 0xe0) return c - 0x100;
+        let value;
+        switch (c) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return this.decodeBin(this.bytes[this.pos++]);
+            case 0xc5: value = view.getUint16(this.pos); this.pos += 2; return this.decodeBin(value);
+            case 0xc6: value = view.getUint32(this.pos); this.pos += 4; return this.decodeBin(value);
+            case 0xc7: this.pos += 1; return this.decodeExt();
+            case 0xc8: this.pos += 2; return this.decodeExt();
+            case 0xc9: this.pos += 4; return this.decodeExt();
+            case 0xca: value = view.getFloat32(this.pos); this.pos += 4; return value;
+            case 0xcb: value = view.getFloat64(this.pos); this.pos += 8; return value;
+            case 0xcc: return this.bytes[this.pos++];
+            case 0xcd: value = view.getUint16(this.pos); this.pos += 2; return value;
+            case 0xce: value = view.getUint32(this.pos); this.pos += 4; return value;
+            case 0xcf: value = Number(view.getBigUint64(this.pos)); this.pos += 8; return value;
+            case 0xd0: value = view.getInt8(this.pos); this.pos += 1; return value;
+            case 0xd1: value = view.getInt16(this.pos); this.pos += 2; return value;
+            case 0xd2: value = view.getInt32(this.pos); this.pos += 4; return value;
+            case 0xd3: value = Number(view.getBigInt64(this.pos)); this.pos += 8; return value;
+            case 0xd4: case 0xd5: case 0xd6: case 0xd7: case 0xd8: return this.decodeExt();
+            case 0xd9: return this.decodeStr(this.bytes[this.pos++]);
+            case 0xda: value = view.getUint16(this.pos); this.pos += 2; return this.decodeStr(value);
+            case 0xdb: value = view.getUint32(this.pos); this.pos += 4; return this.decodeStr(value);
+            case 0xdc: value = view.getUint16(this.pos); this.pos += 2; return this.decodeArray(value);
+            case 0xdd: value = view.getUint32(this.pos); this.pos += 4; return this.decodeArray(value);
+            case 0xde: value = view.getUint16(this.pos); this.pos += 2; return this.decodeMap(value);
+            case 0xdf: value = view.getUint32(this.pos); this.pos += 4; return this.decodeMap(value);
+        }
+        throw new Error(`Invalid MessagePack value at pos ${this.pos - 1}: ${c}`);
+    }
+
+    decodeStr(n) {
+        let value = this.textDecoder.decode(this.bytes.subarray(this.pos, this.pos + n));
+        this.pos += n;
+        return value;
+    }
+
+    decodeBin(n) {
+        let value = new DataView(this.view.buffer, this.view.byteOffset + this.pos, n);
+        this.pos += n;
+        return value;
+    }
+
+    decodeArray(n) {
+        let value = new Array(n);
+        for (let i = 0; i < n; i++)
+            value[i] = this.decodeObject();
+        return value;
+    }
+
+    decodeMap(n) {
+        let value = {};
+        for (let i = 0; i < n; i++) {
+            let key = this.decodeObject();
+            value[key] = this.decodeObject();
+        }
+        return value;
+    }
+
+    decodeExt() {
+        // packed value follows the type code, it is decoded in place
+        let code = this.view.getInt8(this.pos++);
+        let value = this.decodeObject();
+        let ext = this.extensions[code];
+        if (ext)
+            return ext.decode(this, value);
+        console.warn(`MessagePack warning: no known extension for ${code}, value passes in raw form.`);
+        return value;
+    }
+
+    //---- encoder
+
+    encode(value) {
+        this.out = [];
+        this.encodeObject(value);
+        let result = new Uint8Array(this.out);
+        this.out = null;
+        return result;
+    }
+
+    pushUint(prefix, value, size) {
+        let out = this.out;
+        out.push(prefix);
+        for (let shift = (size - 1) * 8; shift >= 0; shift -= 8)
+            out.push(Math.floor(value / 2 ** shift) & 0xff);
+    }
+
+    encodeObject(value) {
+        let out = this.out;
+        if (value === null || value === undefined) out.push(0xc0);
+        else if (value === false) out.push(0xc2);
+        else if (value === true) out.push(0xc3);
+        else if (typeof value === 'number') {
+            if (Number.isSafeInteger(value)) {
+                if (value >= 0) {
+                    if (value <= 0x7f) out.push(value);
+                    else if (value <= 0xff) this.pushUint(0xcc, value, 1);
+                    else if (value <= 0xffff) this.pushUint(0xcd, value, 2);
+                    else if (value <= 0xffffffff) this.pushUint(0xce, value, 4);
+                    else this.pushUint(0xcf, value, 8);
+                } else if (value >= -32) {
+                    out.push(value + 0x100);
+                } else {
+                    let bytes = new Uint8Array(9);
+                    bytes[0] = 0xd3;
+                    new DataView(bytes.buffer).setBigInt64(1, BigInt(value));
+                    out.push(...bytes);
+                }
+            } else {
+                let bytes = new Uint8Array(9);
+                bytes[0] = 0xcb;
+                new DataView(bytes.buffer).setFloat64(1, value);
+                out.push(...bytes);
+            }
+        } else if (typeof value === 'string') {
+            let bytes = this.textEncoder.encode(value);
+            let n = bytes.length;
+            if (n <= 31) out.push(0xa0 | n);
+            else if (n <= 0xff) this.pushUint(0xd9, n, 1);
+            else if (n <= 0xffff) this.pushUint(0xda, n, 2);
+            else this.pushUint(0xdb, n, 4);
+            for (let b of bytes) out.push(b);
+        } else if (Array.isArray(value)) {
+            let n = value.length;
+            if (n <= 15) out.push(0x90 | n);
+            else if (n <= 0xffff) this.pushUint(0xdc, n, 2);
+            else this.pushUint(0xdd, n, 4);
+            for (let item of value)
+                this.encodeObject(item);
+        } else if (value instanceof ArrayBuffer || value instanceof DataView) {
+            let bytes = value instanceof ArrayBuffer ? new Uint8Array(value) : new Uint8Array(value.buffer, value.byteOffset, value.byteLength);
+            let n = bytes.length;
+            if (n <= 0xff) this.pushUint(0xc4, n, 1);
+            else if (n <= 0xffff) this.pushUint(0xc5, n, 2);
+            else this.pushUint(0xc6, n, 4);
+            for (let b of bytes) out.push(b);
+        } else if (typeof value === 'object' && value.constructor === Object) {
+            let keys = Object.keys(value);
+            let n = keys.length;
+            if (n <= 15) out.push(0x80 | n);
+            else if (n <= 0xffff) this.pushUint(0xde, n, 2);
+            else this.pushUint(0xdf, n, 4);
+            for (let key of keys) {
+                this.encodeObject(key);
+                this.encodeObject(value[key]);
+            }
+        } else {
+            for (let [code, ext] of this.encoders) {
+                if (ext.match(this, value)) {
+                    // extension value is packed separately to know its size
+                    let saved = this.out;
+                    this.out = [];
+                    this.encodeObject(ext.encode(this, value));
+                    let packed = this.out;
+                    this.out = saved;
+                    this.pushUint(0xc9, packed.length, 4);
+                    saved.push(code);
+                    for (let b of packed) saved.push(b);
+                    return;
+                }
+            }
+            throw new TypeError(`cannot encode object of type ${typeof value}`);
+        }
+    }
+}
@@ -1,6 +1,7 @@
 let OID = {
     object2id: new WeakMap(),
     id2object: new Map(),
+    adopted: new WeakSet(),
     set: function(obj, oid) {
         //obj.id = oid;
         this.object2id.set(obj, oid);
@@ -20,7 +21,18 @@ let OID = {
     },
     clear: function () {
         this.id2object.clear();
+        this.adopted = new WeakSet();
         SCRIPTS.clear();
+    },
+    adopt: function (root) {
+        // server-side rendered elements, they get events with the first update
+        let elements = root.querySelectorAll('[data-oid]');
+        for (let element of elements) {
+            this.set(element, parseInt(element.getAttribute('data-oid')));
+            element.removeAttribute('data-oid');
+            this.adopted.add(element);
+        }
+        return elements.length;
     }
 };
 
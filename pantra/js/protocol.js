@@ -19,19 +19,14 @@ function process_message(obj) {
             break;
 
         case 'd':
-            for (let v of obj.l) {
-                let element = OID.node(v);
-                if (!!element) {
-                    seLog(`removing ${v} ${element.tagName}`);
-                    element.remove();
-                    OID.delete(v);
-                } else {
-                    seLog(`element ${v} not found for removing`)
-                }
-            }
+            removeNodes(obj.l);
             //root_node().style.visibility = 'hidden';
             break;
 
+        case 'shot':
+            // deletions, updates and creations are applied in order while decoding
+            break;
+
         case 'm': {
             let node = OID.node(obj.l);
             let rect = node.getBoundingClientRect();
@@ -78,6 +73,7 @@ function process_message(obj) {
             dragEventsAttached = false;
             spinnerCounter = 0;
             resetEvents();
+            loopWindows = {};
             break;
 
         case 'recon':
@@ -110,7 +106,8 @@ function process_message(obj) {
 }
 
 let Messages = {
-    up: () => { return {C: "UP"} },
+    up: (seq) => { return {C: "UP", q: seq} },
+    ack: (seq) => { return {C: "ACK", q: seq} },
     refresh: () => { return {C: "REFRESH"} },
     click: (method, oid) => { return {C: "CLICK", method: method, oid: oid} },
     change: (method, oid, value) => { return {C: "CHANGE", method: method, oid: oid, x: value} },
@@ -135,4 +132,5 @@ let Messages = {
             }
     },
     validity: (oid, validity) => { return {C: 'VALID', oid: oid, validity: validity} },
+    window: (oid, start, size) => { return {C: 'WIN', oid: oid, start: start, size: size} },
 };
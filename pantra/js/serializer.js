@@ -12,10 +12,26 @@ function rootNode() {
     return document.getElementById('display');
 }
 
+function insertNode(parent, element, anchor) {
+    let before = typeof anchor === 'number' ? OID.node(anchor) : null;
+    if (before && before.parentNode === parent)
+        parent.insertBefore(element, before);
+    else
+        parent.appendChild(element);
+}
+
+function adoptNode(v, element) {
+    let parent = v.p === null ? rootNode() : OID.node(v.p);
+    if (parent && element.parentNode !== parent)
+        insertNode(parent, element, v['#']);
+    if (config.JS_ADD_IDS)
+        element.setAttribute('id',  `o${v.i}`);
+}
+
 function rebindNode(v, element) {
     let parent = element.parentNode;
     parent.removeChild(element);
-    parent.appendChild(element);
+    insertNode(parent, element, v['#']);
 }
 
 function localizeDate(flag, v) {
@@ -26,9 +42,68 @@ function localizeDate(flag, v) {
     return v;
 }
 
+function setElementValue(v, element) {
+    if (v.type === 'checkbox' || v.type === 'radio') element.checked = v.v;
+    else if (v.v === '') element.value = '';
+    else if (v.type === 'number') element.valueAsNumber = v.v;
+    else if (v.type === 'time') element.valueAsDate = localizeDate(v.l, v.v);
+    else if (v.type === 'date') element.valueAsDate = localizeDate(v.l, v.v);
+    else element.value = v.v;
+}
+
+function patchElement(v) {
+    let element = OID.node(v.i);
+    if (!element) {
+        seLog(`element #${v.i} not found to patch`);
+        return null;
+    }
+    if (v['#'])
+        rebindNode(v, element);
+    for (let at in v.a) {
+        if (!processSpecialAttribute(at, v.a[at], element, v.i, false))
+            if (v.a[at])
+                element.setAttribute(at, v.a[at]);
+            else
+                element.removeAttribute(at);
+    }
+    if (v['C-'])
+        element.classList.remove(...v['C-']);
+    if (v['C+'])
+        element.classList.add(...v['C+']);
+    if (v.S) {
+        for (let key in v.S) {
+            let value = v.S[key];
+            if (value === null)
+                element.style.removeProperty(key);
+            else if (value.endsWith('!important'))
+                element.style.setProperty(key, value.slice(0, -10).trim(), 'important');
+            else
+                element.style.setProperty(key, value);
+        }
+    } else if (v.s !== undefined) {
+        if (v.s)
+            element.setAttribute('style', v.s);
+        else
+            element.removeAttribute('style');
+    }
+    if (v.T !== undefined) {
+        if (v.T !== element.innerHTML) element.innerHTML = v.T;
+    } else if (v.t !== undefined && v.t !== null) {
+        if (v.t !== element.textContent)
+            element.textContent = v.t;
+    }
+    if (v.f)
+        element.focus();
+    if (v.v !== undefined)
+        setElementValue(v, element);
+    return element;
+}
+
 const HTMLElementSerializer = {
     name: 'h',
     decode: function(s, v) {
+        if (v['~'])
+            return patchElement(v);
         let element = OID.node(v.i);
         let is_new = false;
         if (!element) {
@@ -55,11 +130,15 @@ const HTMLElementSerializer = {
 
             //element.typical = true;
             OID.set(element, v.i);
-            parent.appendChild(element);
+            insertNode(parent, element, v['#']);
             is_new = true;
 
             if (v.type !== undefined)
                 element.type = v.type;
+        } else if (OID.adopted.delete(element)) {
+            // prerendered element gets its events like the new one
+            adoptNode(v, element);
+            is_new = true;
         } else if (v['#'])
             rebindNode(v, element);
         for (let at in v.a) {
@@ -91,12 +170,7 @@ const HTMLElementSerializer = {
         if (v.f)
             element.focus();
         if (v.v !== undefined)
-            if (v.type === 'checkbox' || v.type === 'radio') element.checked = v.v;
-            else if (v.v === '') element.value = '';
-            else if (v.type === 'number') element.valueAsNumber = v.v;
-            else if (v.type === 'time') element.valueAsDate = localizeDate(v.l, v.v);
-            else if (v.type === 'date') element.valueAsDate = localizeDate(v.l, v.v);
-            else element.value = v.v;
+            setElementValue(v, element);
         return element;
     }
 };
@@ -113,8 +187,10 @@ const TextSerializer = {
             if (config.JS_ADD_IDS)
                 element.setAttribute('id',  `o${v.i}`);
             OID.set(element, v.i);
-            parent.appendChild(element);
-        } else if (v['#'])
+            insertNode(parent, element, v['#']);
+        } else if (OID.adopted.delete(element))
+            adoptNode(v, element);
+        else if (v['#'])
             rebindNode(v, element);
         element.textContent = v.t;
         return element;
@@ -147,12 +223,160 @@ const StubElementSerializer = {
                 element.setAttribute('class', v['$']);
             
             OID.set(element, v.i);
-            parent.appendChild(element);
-        } if (v['#'])
+            insertNode(parent, element, v['#']);
+        } else if (OID.adopted.delete(element))
+            adoptNode(v, element);
+        else if (v['#'])
             rebindNode(v, element);
     }
 };
 
+const staticFragments = new Map();
+
+function staticElement(html) {
+    // fragment is parsed once, context-free, so table parts go as is
+    let template = staticFragments.get(html);
+    if (!template) {
+        template = document.createElement('template');
+        template.innerHTML = html;
+        staticFragments.set(html, template);
+    }
+    return document.importNode(template.content.firstElementChild, true);
+}
+
+const StaticSerializer = {
+    name: 'f',
+    decode: function (s, v) {
+        let element = OID.node(v.i);
+        if (!element) {
+            let parent = OID.node(v.p);
+            if (!parent) {
+                if (v.p === null)
+                    seLog(`fragment #${v.i} created in root node`);
+                else
+                    seLog(`fragment #${v.i} created in root node (#${v.p} not found)`);
+                parent = rootNode();
+                if (!contentFilled) {
+                    parent.innerText = '';
+                    contentFilled = true;
+                }
+            }
+            element = staticElement(v.H);
+            if (config.JS_ADD_IDS)
+                element.setAttribute('id',  `o${v.i}`);
+            OID.set(element, v.i);
+            insertNode(parent, element, v['#']);
+        } else if (OID.adopted.delete(element))
+            adoptNode(v, element);
+        else if (v['#'])
+            rebindNode(v, element);
+        return element;
+    }
+};
+
+let loopWindows = {};
+
+function scrollParent(element) {
+    for (let node = element; node && node !== document.body; node = node.parentElement) {
+        let overflow = getComputedStyle(node).overflowY;
+        if (overflow === 'auto' || overflow === 'scroll')
+            return node;
+    }
+    return window;
+}
+
+class LoopWindow {
+    constructor(oid) {
+        this.oid = oid;
+        this.top = null;
+        this.bottom = null;
+        this.scroller = null;
+        this.itemHeight = 0;
+        this.pending = false;
+    }
+
+    update(v) {
+        this.parentOid = v.p;
+        this.start = v.s;
+        this.count = v.c;
+        this.total = v.n;
+        this.first = v.f;
+        this.last = v.l;
+        this.pending = false;
+        // items are created later in the same message
+        queueMicrotask(() => this.arrange());
+    }
+
+    makeSpacer(tagName) {
+        let spacer = document.createElement(tagName);
+        if (tagName === 'TR') {
+            let cell = document.createElement('td');
+            cell.setAttribute('colspan', '1000');
+            cell.style.padding = '0';
+            cell.style.border = 'none';
+            spacer.appendChild(cell);
+        }
+        return spacer;
+    }
+
+    arrange() {
+        let parent = this.parentOid === null ? rootNode() : OID.node(this.parentOid);
+        if (!parent) return;
+        let first = OID.node(this.first);
+        let last = OID.node(this.last);
+        if (!this.top || this.top.parentNode !== parent || (first && first.tagName !== this.top.tagName)) {
+            if (this.top) this.top.remove();
+            if (this.bottom) this.bottom.remove();
+            let tagName = first ? first.tagName : 'DIV';
+            this.top = this.makeSpacer(tagName);
+            this.bottom = this.makeSpacer(tagName);
+        }
+        if (first && last) {
+            parent.insertBefore(this.top, first);
+            parent.insertBefore(this.bottom, last.nextSibling);
+            this.itemHeight = (last.getBoundingClientRect().bottom - first.getBoundingClientRect().top) / this.count;
+        } else {
+            parent.appendChild(this.top);
+            parent.appendChild(this.bottom);
+        }
+        this.top.style.height = `${this.start * this.itemHeight}px`;
+        this.bottom.style.height = `${Math.max(0, this.total - this.start - this.count) * this.itemHeight}px`;
+        if (!this.scroller) {
+            this.scroller = scrollParent(parent);
+            this.scroller.addEventListener('scroll', () => this.onScroll(), {passive: true});
+        }
+        this.onScroll();
+    }
+
+    onScroll() {
+        if (this.pending || !this.itemHeight || !this.top.isConnected) return;
+        let viewTop = 0, viewHeight = window.innerHeight;
+        if (this.scroller !== window) {
+            let rect = this.scroller.getBoundingClientRect();
+            viewTop = rect.top;
+            viewHeight = this.scroller.clientHeight;
+        }
+        let offset = viewTop - this.top.getBoundingClientRect().top;
+        let visibleStart = Math.max(0, Math.floor(offset / this.itemHeight));
+        let visibleCount = Math.ceil(viewHeight / this.itemHeight) + 1;
+        let end = this.start + this.count;
+        if ((visibleStart < this.start && this.start > 0)
+            || (visibleStart + visibleCount > end && end < this.total)) {
+            this.pending = true;
+            sendMessage(Messages.window(this.oid, visibleStart, visibleCount));
+        }
+    }
+}
+
+const WindowLoopSerializer = {
+    name: 'w',
+    decode: function (s, v) {
+        if (!(v.i in loopWindows))
+            loopWindows[v.i] = new LoopWindow(v.i);
+        loopWindows[v.i].update(v);
+    }
+};
+
 const EventSerializer = {
     name: 'e',
     decode: function (s, v) {
@@ -191,6 +415,27 @@ const TimeSerializer = {
     },
 };
 
+function removeNodes(oids) {
+    for (let v of oids) {
+        let element = OID.node(v);
+        if (!!element) {
+            seLog(`removing ${v} ${element.tagName}`);
+            element.remove();
+            OID.delete(v);
+        } else {
+            seLog(`element ${v} not found for removing`)
+        }
+    }
+}
+
+const RemovedNodesSerializer = {
+    name: 'r',
+    decode: function (s, v) {
+        removeNodes(v);
+        return v;
+    }
+};
+
 const ScriptSerializer = {
     name: 's',
     decode: function(s, v) {
@@ -237,7 +482,24 @@ const ScriptSerializer = {
 };
 
 
-const serializer = new bsdf.BsdfSerializer(
-    [DateSerializer, TimeSerializer, HTMLElementSerializer, TextSerializer, EventSerializer, ScriptSerializer,
-    StubElementSerializer]);
+const serializerExtensions = [DateSerializer, TimeSerializer, HTMLElementSerializer, TextSerializer, EventSerializer,
+    ScriptSerializer, StubElementSerializer, RemovedNodesSerializer, WindowLoopSerializer, StaticSerializer];
+
+const serializer = {
+    bsdf: new bsdf.BsdfSerializer(serializerExtensions),
+    msgpack: new MsgpackSerializer(serializerExtensions),
+    current: null,
+
+    decode: function (data) {
+        // server codec is recognized by BSDF magic, messages to server go with the same codec
+        let head = new Uint8Array(data, 0, 4);
+        let isBsdf = head[0] === 66 && head[1] === 83 && head[2] === 68 && head[3] === 70;
+        this.current = isBsdf ? this.bsdf : this.msgpack;
+        return this.current.decode(data);
+    },
+
+    encode: function (message) {
+        return (this.current || this.bsdf).encode(message);
+    }
+};
 
@@ -1,4 +1,40 @@
 let CONNECT_INTERVALS = [5,5,5,5,10,20,30,60,120,300,600];
+const FRAME_COMPRESSED = 0x5a; // 'Z'
+const FRAME_SEQUENCED = 0x51; // 'Q'
+const FRAME_SYNC = 0x53; // 'S'
+const ACK_DELAY = 1000;
+
+/* Browsers without 'deflate-raw' format throw on construction, they ask for plain frames */
+const DEFLATE_RAW = (() => {
+	try {
+		new DecompressionStream('deflate-raw');
+		return true;
+	} catch (e) {
+		return false;
+	}
+})();
+
+/* Decompresses frames of one connection, they share one deflate stream (see `pantra.compression`) */
+class FrameInflater {
+	constructor() {
+		let stream = new DecompressionStream('deflate-raw');
+		this.writer = stream.writable.getWriter();
+		this.reader = stream.readable.getReader();
+	}
+	async inflate(data) {
+		let view = new DataView(data);
+		let size = view.getUint32(1, true);
+		this.writer.write(new Uint8Array(data, 5));
+		let result = new Uint8Array(size);
+		let pos = 0;
+		while (pos < size) {
+			let {value} = await this.reader.read();
+			result.set(value, pos);
+			pos += value.length;
+		}
+		return result.buffer;
+	}
+}
 
 function showOnlineBar() {
 	let bar = document.getElementById('online-bar');
@@ -17,14 +53,19 @@ class WSClient {
 		this.connected = false;
 		this.init = false;
 		this.want_refresh = false;
+		this.inflater = null;
+		this.incoming = Promise.resolve();
+		this.lastSeq = null;
+		this.ackTimer = null;
 	}
 	refresh(callback=null) {
 		if (!this.connected) {
 			this.callback = callback;
-			this.ws = new WebSocket(this.url);
+			let protocols = DEFLATE_RAW ? ['pantra.z', 'pantra'] : ['pantra'];
+			this.ws = new WebSocket(this.url, protocols);
 			this.ws.binaryType = "arraybuffer";
 			this.ws.onopen = () => this.onopen();
-			this.ws.onmessage = (message) => this.onmessage(message.data);
+			this.ws.onmessage = (message) => this.receive(message.data);
 			this.ws.onclose = (e) => this.onclose(e);
 		}
 	}
@@ -49,8 +90,10 @@ class WSClient {
 		wsLog('refreshing connection')
 	}
 	onopen() {
-		wsLog('connected');
+		wsLog(`connected (${this.ws.protocol || 'no protocol'})`);
 		this.connected = true;
+		this.inflater = this.ws.protocol === 'pantra.z' ? new FrameInflater() : null;
+		this.incoming = Promise.resolve();
 		this.currentInterval = 0;
 		showOnlineBar();
 		if (this.init)
@@ -80,6 +123,45 @@ class WSClient {
 				wsLog(`unrecoverable error ${e.code}`);
 		}
 	}
+	receive(data) {
+		if (!this.inflater) {
+			this.deliver(data);
+			return;
+		}
+		// frames are inflated asynchronously, keep them in order
+		let inflater = this.inflater;
+		this.incoming = this.incoming.then(() => {
+			if (new Uint8Array(data, 0, 1)[0] === FRAME_COMPRESSED)
+				return inflater.inflate(data).then((raw) => this.deliver(raw));
+			this.deliver(data);
+		}).catch((e) => console.error(e));
+	}
+	deliver(data) {
+		// session frames go once and in order, missed ones are replayed after reconnect (see `pantra.replay`)
+		let head = new Uint8Array(data, 0, 1)[0];
+		if (head === FRAME_SEQUENCED || head === FRAME_SYNC) {
+			let seq = new DataView(data).getUint32(1, true);
+			if (head === FRAME_SEQUENCED && this.lastSeq !== null && seq !== this.lastSeq + 1) {
+				wsLog(`frame #${seq} skipped, #${this.lastSeq + 1} expected`);
+				return;
+			}
+			this.lastSeq = seq;
+			this.scheduleAck();
+			data = new Uint8Array(data, 5);
+		}
+		this.onmessage(data);
+	}
+	scheduleAck() {
+		if (this.ackTimer !== null)
+			return;
+		this.ackTimer = setTimeout(() => {
+			this.ackTimer = null;
+			if (this.connected)
+				this.onack(this.lastSeq);
+		}, ACK_DELAY);
+	}
+	onack(seq) {
+	}
 	onmessage(data) {
 		wsLog(`message coming ${data}`);
 	}
@@ -32,6 +32,7 @@ def run(host=None, port=8005):
         ws_ping_interval=config.WS_HEARTBEAT_INTERVAL,
         ws_ping_timeout=config.SOCKET_TIMEOUT,
         ws_max_size=config.MAX_MESSAGE_SIZE,
+        ws_per_message_deflate=config.WS_PER_MESSAGE_DEFLATE,
         log_config=None,
     )
 
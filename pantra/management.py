@@ -64,19 +64,23 @@ def _expose_db(app) -> tuple[DBFactory, str] | tuple[None, None]:
 class Main(AppProvider):
     """Pantra management CLI"""
 
-    def run(self, host: str = '127.0.0.1', port: int = 8005, cached: bool = False):
+    def run(self, host: str = '127.0.0.1', port: int = 8005, cached: bool = False, jit: bool = False):
         """run pantra application bound to host and port
 
         Args:
             host: local IP address to bind
             port: number of local port
             cached: whether to use cached app
+            jit: whether to generate cached components in memory
         """
         from pantra.main import run as run_main
 
         if cached:
             os.environ['PANTRA_RUN_CACHED'] = 'yes'
             config._late_init()
+        elif jit:
+            os.environ['PANTRA_RUN_JIT'] = 'yes'
+            config._late_init()
         run_main(host, port)
 
     def run_backend(self):
@@ -523,6 +527,105 @@ class Locale(AppProvider):
         CommandLineInterface().run(args)
 
 
+class Bench:
+    """Rendering pipeline micro benchmarks"""
+
+    def delta(self, rows: int = 200, changed: int = 20, repeat: int = 5):
+        """DataTable refresh message size and encoding speed, in full and in deltas
+
+        Args:
+            rows: number of table rows
+            changed: number of rows with changed price
+            repeat: number of runs to take the best of
+        """
+        from .bench import bench_delta
+        for mode, res in bench_delta(rows, changed, repeat).items():
+            print(f"{mode:>10}: {res['size']:,} bytes, encode {res['encode']:,.1f} messages/s")
+
+    def eval(self, rows: int = 1000, repeat: int = 5):
+        """template expression evaluations per second over a loop render
+
+        Args:
+            rows: number of loop items
+            repeat: number of runs to take the best of
+        """
+        from .bench import bench_eval
+        for method, rate in bench_eval(rows, repeat).items():
+            print(f'{method:>10}: {rate:,.0f} evals/s')
+
+    def instantiate(self, component: str = 'DataTable', count: int = 2000, repeat: int = 5):
+        """component module executions per second, with and without prototypes
+
+        Args:
+            component: component name
+            count: number of instances per run
+            repeat: number of runs to take the best of
+        """
+        from .bench import bench_instantiate
+        for method, rate in bench_instantiate(component, count, repeat).items():
+            print(f'{method:>15}: {rate:,.0f} instances/s')
+
+    def encode(self, nodes: int = 1000, repeat: int = 5):
+        """`Messages.update` encodings per second, fast and reference encoders
+
+        Args:
+            nodes: number of HTML elements to update
+            repeat: number of runs to take the best of
+        """
+        from .bench import bench_encode
+        for method, rate in bench_encode(nodes, repeat).items():
+            print(f'{method:>10}: {rate:,.1f} messages/s')
+
+    def resend(self, depth: int = 20, windows: int = 10, count: int = 100, repeat: int = 5):
+        """page refresh messages per second over deeply nested layout
+
+        Args:
+            depth: number of nested blocks around each element
+            windows: number of windows
+            count: number of items in each window
+            repeat: number of runs to take the best of
+        """
+        from .bench import bench_resend
+        print(f'{bench_resend(depth, windows, count, repeat):,.1f} messages/s')
+
+    def shot(self, entries: int = 0, repeat: int = 3):
+        """`ContextShot` fill and pop time, new and old implementations
+
+        Args:
+            entries: number of nodes changed, 10k and 100k if not specified
+            repeat: number of runs to take the best of
+        """
+        from .bench import bench_shot
+        sizes = (entries,) if entries else (10000, 100000)
+        for size, res in bench_shot(sizes, repeat=repeat).items():
+            print(f'{size:>10,}: ' + ', '.join(f'{shot} {seconds * 1000:,.1f} ms' for shot, seconds in res.items()))
+
+    def codecs(self, app: str = None, nodes: int = 1000, repeat: int = 5):
+        """wire codecs payload size, encoding and decoding speed
+
+        Args:
+            app: application to render `Main` component of, or list of `nodes` items if not specified
+            nodes: number of list items
+            repeat: number of runs to take the best of
+        """
+        from .bench import bench_codecs
+        for name, res in bench_codecs(app, nodes, repeat).items():
+            print(f"{name:>10}: {res['size']:,} bytes ({res['compressed']:,} compressed), encode {res['encode']:,.1f} messages/s, "
+                  f"decode {res['decode']:,.0f} messages/s")
+
+    def static(self, count: int = 100, repeat: int = 5):
+        """building and sending static content, with static fragments and element by element
+
+        Args:
+            count: number of cards
+            repeat: number of runs to take the best of
+        """
+        from .bench import bench_static
+        for mode, res in bench_static(count, repeat).items():
+            print(f"{mode:>10}: {res['nodes']:,} nodes, {res['size']:,} bytes, build {res['build']:,.1f}/s, "
+                  f"encode {res['encode']:,.1f} messages/s")
+
+
 def execute_from_command_line(argv=None):
     run_command({
         "main": Main,
@@ -532,6 +635,7 @@ def execute_from_command_line(argv=None):
             "schema": Schema,
         },
         "locale": Locale,
+        "bench": Bench,
     }, argv)
 
 
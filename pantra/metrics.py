@@ -0,0 +1,121 @@
+"""Runtime metrics of the process
+
+Values are collected by name in :data:`metrics` and reported by the router at :attr:`~pantra.defaults.Config.METRICS_PATH`,
+if it is set. Names are dot-separated, the first part is the subsystem.
+
+Histograms are reported as their count, sum, percentiles and counts of values up to every bucket bound,
+e.g. `tasks.wait_time.p95` or `tasks.wait_time.le_0.05`.
+"""
+from __future__ import annotations
+
+import threading
+import typing
+from bisect import bisect_left
+
+if typing.TYPE_CHECKING:
+    from typing import *
+
+__all__ = ['Histogram', 'Metrics', 'metrics']
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  #: default bounds, seconds
+PERCENTILES = (50, 95, 99)  #: percentiles reported for every histogram
+
+
+class Histogram:
+    """Counts of values falling into buckets
+
+    Percentiles are estimated as upper bound of the bucket, values above the last bound
+    count as the max value seen.
+
+    Arguments:
+        buckets: ascending upper bounds of buckets
+    """
+    __slots__ = ['buckets', 'counts', 'count', 'sum', 'max']
+
+    def __init__(self, buckets: Sequence[float] = TIME_BUCKETS):
+        self.buckets: Sequence[float] = buckets
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0
+        self.max: float = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0
+        rank = self.count * p / 100
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def report(self, name: str, res: dict[str, float]):
+        res[f'{name}.count'] = self.count
+        res[f'{name}.sum'] = self.sum
+        res[f'{name}.max'] = self.max
+        for p in PERCENTILES:
+            res[f'{name}.p{p}'] = self.percentile(p)
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            res[f'{name}.le_{bound}'] = total
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and histograms"""
+    __slots__ = ['_lock', '_values', '_histograms']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: dict[str, float] = {}
+        self._histograms: dict[str, Histogram] = {}
+
+    def add(self, name: str, value: float = 1) -> float:
+        """increase counter and return its new value"""
+        with self._lock:
+            value = self._values[name] = self._values.get(name, 0) + value
+        return value
+
+    def set(self, name: str, value: float):
+        """set gauge value"""
+        with self._lock:
+            self._values[name] = value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = TIME_BUCKETS):
+        """add value to histogram, `buckets` are used when it is created"""
+        with self._lock:
+            if (histogram := self._histograms.get(name)) is None:
+                histogram = self._histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def get(self, name: str, default: float = 0) -> float:
+        return self._values.get(name, default)
+
+    def percentile(self, name: str, p: float) -> float:
+        """estimated percentile of histogram values"""
+        with self._lock:
+            return (histogram := self._histograms.get(name)) and histogram.percentile(p) or 0
+
+    def snapshot(self) -> dict[str, float]:
+        """copy of all values and reports of histograms, sorted by name"""
+        with self._lock:
+            res = dict(self._values)
+            for name, histogram in self._histograms.items():
+                histogram.report(name, res)
+        return dict(sorted(res.items()))
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+
+
+metrics: Metrics = Metrics()  #: metrics of this process
@@ -15,7 +15,7 @@ if TYPE_CHECKING:
 @wipe_logger
 async def process_message(session: Session, data: dict):
     from .components.controllers import process_drag_start, process_drag_move, process_drag_stop, process_click, \
-        process_select, process_key, process_bind_value, process_direct_call, process_change
+        process_select, process_key, process_bind_value, process_direct_call, process_change, process_window
 
     command = data['C']
     if command in ('REFRESH', 'UP'):
@@ -24,21 +24,25 @@ async def process_message(session: Session, data: dict):
             session.just_connected = False
 
             @thread_worker
-            def restart():
+            def restart(session: Session):
                 session.restart()
 
-            restart()
+            restart(session)
         else:
             if command == 'REFRESH':
                 logger.debug("[REFRESH] command")
                 if hasattr(session.state, 'drag'):
                     process_drag_stop(session, 0, 0)
-                await session.resend_root()
-                if session.title:
-                    await session.send_title(session.title)
+                session.start_resend()
+            else:
+                logger.debug(f"[UP] command after #{data.get('q')}")
+                await session.resume(data.get('q'))
             #await session.recover_messages()
             await session.remind_errors()
 
+    elif command == 'ACK':
+        session.replay.ack(data['q'])
+
     elif command == 'CLICK':
         if not config.WIPE_LOGGING:
             ctx = getattr(session.get_node(data['oid']), 'context', None)
@@ -94,11 +98,23 @@ async def process_message(session: Session, data: dict):
         if node:
             node._set_validity(data['validity'])
 
+    elif command == 'WIN':
+        logger.debug(f"[WIN]dow shift to {data['start']} for <{data['oid']}>")
+        process_window(session, data['oid'], data['start'], data['size'])
+
     elif command == 'CALL':
         logger.debug(f"[CALL] command `{data['method']}` to  <{getattr(session.get_node(data['oid']), 'context', 'none')}>")
         process_direct_call(session, data['oid'], data['method'], data['args'])
 
 
+class RemovedNodes:
+    """OIDs to remove, client-side drops them while decoding, before following updates"""
+    __slots__ = ['oids']
+
+    def __init__(self, oids: list[int]):
+        self.oids = oids
+
+
 class Messages:
     class Command(TypedDict):
         m: str
@@ -109,6 +125,11 @@ class Messages:
     class RequestValue(CommandArg):
         t: str
 
+    class Shot(Command):
+        d: RemovedNodes
+        u: list[RenderNode]
+        c: list[RenderNode]
+
     class Call(Command):
         method: str
         args: typing.Sequence[typing.Any]
@@ -141,6 +162,10 @@ class Messages:
     def update(items: list[RenderNode]):
         return Messages.CommandArg(m="u", l=items)
 
+    @staticmethod
+    def shot(deleted: list[int], updated: list[RenderNode], created: list[RenderNode]):
+        return Messages.Shot(m="shot", d=RemovedNodes(deleted), u=updated, c=created)
+
     @staticmethod
     def request_measures(oid: int):
         return Messages.CommandArg(m="m", l=oid)
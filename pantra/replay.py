@@ -0,0 +1,82 @@
+"""Sequenced messages and their replay after reconnect
+
+Every message of the session goes in a frame starting with :data:`SEQ_HEADER` (or :data:`SYNC_HEADER`)
+and its sequence number (4 bytes, little-endian). Client-side processes frames in order only, skips repeated ones
+and acknowledges the last one from time to time.
+
+Frames not acknowledged yet are kept in :class:`ReplayBuffer`. Reconnected client-side reports the last frame it got,
+so the session replays missed frames only. If they are dropped already, the session starts client-side
+from scratch with a sync frame, which is accepted whatever sequence number client-side expects.
+"""
+from __future__ import annotations
+
+import struct
+import typing
+from collections import deque
+
+if typing.TYPE_CHECKING:
+    from typing import *
+
+__all__ = ['SEQ_HEADER', 'SYNC_HEADER', 'ReplayBuffer']
+
+SEQ_HEADER = b'Q'
+SYNC_HEADER = b'S'
+
+_pack_seq = struct.Struct('<I').pack
+
+
+class ReplayBuffer:
+    """Sequence counter and buffer of unacknowledged frames of one session
+
+    It is used from the event loop only.
+
+    Arguments:
+        size: max bytes of frames to keep, `0` to keep none
+    """
+    __slots__ = ['size', 'seq', '_frames', '_bytes']
+
+    def __init__(self, size: int):
+        self.size: int = size
+        self.seq: int = 0
+        self._frames: deque[tuple[int, bytes]] = deque()
+        self._bytes: int = 0
+
+    def push(self, data: bytes, sync: bool = False) -> bytes:
+        """make frame of the next message and keep it until acknowledged
+
+        Sync frame starts client-side over, so previous frames are not needed anymore.
+        """
+        self.seq += 1
+        frame = b''.join((SYNC_HEADER if sync else SEQ_HEADER, _pack_seq(self.seq), data))
+        if sync:
+            self.clear()
+        frames = self._frames
+        frames.append((self.seq, frame))
+        self._bytes += len(frame)
+        while self._bytes > self.size and frames:
+            self._bytes -= len(frames.popleft()[1])
+        return frame
+
+    def ack(self, seq: int):
+        """drop frames client-side has got"""
+        frames = self._frames
+        while frames and frames[0][0] <= seq:
+            self._bytes -= len(frames.popleft()[1])
+
+    def since(self, seq: int | None) -> list[bytes] | None:
+        """frames after specified one, `None` if some of them are dropped already"""
+        if seq is None or seq > self.seq:
+            return None
+        frames = self._frames
+        if seq == self.seq:
+            return []
+        if not frames or frames[0][0] > seq + 1:
+            return None
+        return [frame for n, frame in frames if n > seq]
+
+    def clear(self):
+        self._frames.clear()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._frames)
@@ -9,6 +9,7 @@ import mimetypes
 import traceback
 from datetime import datetime
 from contextlib import asynccontextmanager
+from typing import Mapping
 
 import sass
 
@@ -19,12 +20,19 @@ from starlette.responses import Response, HTMLResponse, JSONResponse, PlainTextR
 from starlette.websockets import WebSocket, WebSocketDisconnect
 from starlette.staticfiles import StaticFiles
 
+from pantra.compression import negotiate_subprotocol
 from pantra.components.template import collect_template, get_template_path, collect_styles
 from pantra.patching import wipe_logger
+from pantra.metrics import metrics
 from pantra.session import Session
 from pantra.settings import config, logger
+from pantra.ssr import render_html
 from pantra import jsmap
 
+CONTENT_START = '<!--content-->'  #: bootstrap page mark of prerendered content start
+CONTENT_END = '<!--/content-->'  #: bootstrap page mark of prerendered content end
+SSR_COOKIE = 'pantra_ssr'  #: cookie with tab ID of the prerendered page, to give the same session on reload
+
 def route(pattern: str, method: str = None):
     """The decorator to mark method as a router to specific regex pattern"""
     def inner(func):
@@ -66,6 +74,15 @@ class BaseRouter:
 
         self.bootstrap: str = config.BOOTSTRAP_FILENAME.read_text()
 
+        self.ssr: bool = False
+        if config.SSR:
+            if not config.WORKER_SERVER.run_with_web:
+                logger.warning('SSR requires task processor running with web server, disabled')
+            elif CONTENT_START not in self.bootstrap or CONTENT_END not in self.bootstrap:
+                logger.warning(f'SSR requires content marks in `{config.BOOTSTRAP_FILENAME.name}`, disabled')
+            else:
+                self.ssr = True
+
     @staticmethod
     @asynccontextmanager
     async def lifespan(app: Starlette):
@@ -96,6 +113,8 @@ class BaseRouter:
 
     def routes(self):
         res = []
+        if config.METRICS_PATH:
+            res.append(Route(config.METRICS_PATH, self.get_metrics))
         for func_name in dir(self):
             if func_name.startswith("_"):
                 continue
@@ -131,6 +150,24 @@ class BaseRouter:
         """Shortcut method to return CSS content"""
         return Response(value, 200, media_type="text/css")
 
+    @staticmethod
+    def accept_languages(headers: Mapping[str, str]) -> list[str]:
+        """languages preferred by browser"""
+        lang_info = headers.get('Accept-Language', config.DEFAULT_LANGUAGE)
+        return [part.split(';')[0].replace('-', '_') for part in lang_info.split(',')]
+
+    @staticmethod
+    def put_content(body: str, content: str) -> str:
+        """replace bootstrap page content between marks"""
+        start = body.index(CONTENT_START) + len(CONTENT_START)
+        end = body.index(CONTENT_END, start)
+        return body[:start] + content + body[end:]
+
+    @staticmethod
+    async def get_metrics(request: Request):
+        """Report :mod:`runtime metrics <pantra.metrics>` in JSON"""
+        return JSONResponse(metrics.snapshot())
+
     @get("/{app}")
     @get("/")
     async def get_main_page(self, request: Request):
@@ -148,14 +185,39 @@ class BaseRouter:
             app_module = None
         app_title = getattr(app_module, "APP_TITLE", None) or config.APP_TITLE
 
+        content = ''
+        if self.ssr:
+            # page reloaded before client-side connects gets the same session
+            tab_id = request.cookies.get(SSR_COOKIE)
+            if tab_id and f'{tab_id}/{app}' in Session.unadopted and (session := Session.sessions.get(f'{tab_id}/{app}')):
+                session_id = tab_id
+                session.touch()
+                content = await asyncio.to_thread(render_html, session.root)
+                metrics.add('ssr.reused')
+            elif len(Session.unadopted) < config.SSR_LIMIT:
+                session = Session(f'{session_id}/{app}', app, self.accept_languages(request.headers),
+                                  dict(request.query_params))
+                content = await asyncio.to_thread(session.prerender)
+            else:
+                session = None
+                metrics.add('ssr.skipped')
+            if session is not None:
+                app_title = session.title or app_title
+
         body = self.bootstrap.replace('{{LOCAL_ID}}', local_id)\
             .replace('{{TAB_ID}}', session_id)\
             .replace('{{WEB_PATH}}', config.WEB_PATH)\
             .replace('{{APP_TITLE}}', app_title)\
             .replace('{{INSTANCE_ID}}', self.INSTANCE_ID)
+        if content:
+            body = self.put_content(body, content)
 
         logger.debug(f"Bootstrap page rendered {local_id}/{session_id}")
-        return HTMLResponse(body)
+        response = HTMLResponse(body)
+        if content:
+            response.set_cookie(SSR_COOKIE, session_id, max_age=config.SSR_TTL, path=config.WEB_PATH or '/',
+                                httponly=True, samesite='strict')
+        return response
 
     @route('/ws/{local_id}/{session_id}', method="ws")
     @route('/{app}/ws/{local_id}/{session_id}', method="ws")
@@ -166,7 +228,7 @@ class BaseRouter:
 
         #ws = web.WebSocketResponse(receive_timeout=config.SOCKET_TIMEOUT, max_msg_size=config.MAX_MESSAGE_SIZE,
         #                           heartbeat=config.WS_HEARTBEAT_INTERVAL)
-        await websocket.accept()
+        await websocket.accept(negotiate_subprotocol(websocket))
 
         if not app:
             app = config.DEFAULT_APP
@@ -174,8 +236,7 @@ class BaseRouter:
         logger.debug(
             f"WebSocket connected {{{app}}} {local_id}/{session_id}")
 
-        lang_info = websocket.headers.get('Accept-Language', config.DEFAULT_LANGUAGE)
-        lang = [part.split(';')[0].replace('-', '_') for part in lang_info.split(',')]
+        lang = self.accept_languages(websocket.headers)
 
         # session = Session(request.match_info['local_id'], session_id, ws, app, lang)
 
@@ -3,9 +3,13 @@ from datetime import date, time, datetime, timezone
 
 from .contrib import bsdf_lite as bsdf
 from .common import HTML
+from .settings import config
+from .codecs.base import WireCodec
+from .protocol import RemovedNodes
 from .components.render.render_node import RenderNode
 from .components.context import HTMLElement, TextNode, EventNode, NSElement, ScriptNode, ConditionNode, LoopNode, \
-    ReactNode
+    ReactNode, WindowLoopNode, StaticNode
+from .components.render.renderer_base import first_rendered, last_rendered
 
 __all__ = ['serializer']
 
@@ -17,18 +21,67 @@ def get_parent_oid(node: RenderNode) -> typing.Optional[int]:
     return parent and parent.oid
 
 
+def pop_rebind(node: RenderNode) -> typing.Union[bool, int]:
+    """take rebind request: `True` to append to parent, or OID of the node to insert before"""
+    anchor = node.rebind_requested
+    node.rebind_requested = False
+    return True if anchor is True else anchor.oid
+
+
+class SentState(typing.NamedTuple):
+    """HTML element state as the client-side saw it last time"""
+    attributes: dict[str, typing.Any]
+    classes: frozenset[str]
+    style: typing.Union[str, dict[str, str]]
+    text: typing.Any
+
+
+def split_style(style: str) -> typing.Union[str, dict[str, str]]:
+    """split inline style to properties, keep it whole if it can't be split safely"""
+    if '(' in style:
+        return style
+    res = {}
+    for item in style.split(';'):
+        if not item.strip():
+            continue
+        key, sep, value = item.partition(':')
+        if not sep:
+            return style
+        res[key.strip()] = value.strip()
+    return res
+
+
 class HTMLElementSerializer(bsdf.Extension):
+    """HTML element encoder
+
+    The first time the element goes in full. Then only changed parts are sent (marked with `~`):
+
+    * `a` - changed attributes (`None` to remove)
+    * `C+`, `C-` - classes to add and to remove
+    * `S` - changed style properties (`None` to remove), or `s` when the style can't be split
+    * `t`/`T` - text, if changed
+    """
     name = 'h'
     cls = HTMLElement
 
     def encode(self, s, v: typing.Union[HTMLElement, NSElement]):
+        attributes = dict(v.attributes.items())
+        classes = str(v.classes)
+        style = str(v.style)
+        state = SentState(attributes, frozenset(classes.split()), split_style(style), v.text)
+        sent_states = v.session.sent_states
+        prev = sent_states.get(v)
+        sent_states[v] = state
+        if prev is not None:
+            return self.encode_patch(v, prev, state, style)
+
         res = {
             'n': v.name,
             'i': v.oid,
             'p': get_parent_oid(v),
-            'a': v.attributes,
-            'C': str(v.classes),
-            's': str(v.style),
+            'a': attributes,
+            'C': classes,
+            's': style,
             'f': v._set_focused,
             'l': v.localize,
         }
@@ -38,19 +91,54 @@ class HTMLElementSerializer(bsdf.Extension):
             res['t'] = v.text
         if type(v) == NSElement:
             res['x'] = v.ns_type.value
-        if v.rebind_requested:
-            res['#'] = True
-            v.rebind_requested = False
         if v.context._restyle:
             res['$'] = v.context.name
-        if v.value_type:
-            res['type'] = v.value_type
+        self.encode_tail(v, res)
+        return res
+
+    @staticmethod
+    def encode_patch(v: HTMLElement, prev: SentState, state: SentState, style: str):
+        res = {'i': v.oid, '~': True}
+        if state.attributes != prev.attributes:
+            res['a'] = {k: value for k, value in state.attributes.items()
+                        if k not in prev.attributes or prev.attributes[k] != value}
+            for k in prev.attributes.keys() - state.attributes.keys():
+                res['a'][k] = None
+        if state.classes != prev.classes:
+            if added := state.classes - prev.classes:
+                res['C+'] = list(added)
+            if removed := prev.classes - state.classes:
+                res['C-'] = list(removed)
+        if state.style != prev.style:
+            if isinstance(state.style, dict) and isinstance(prev.style, dict):
+                res['S'] = {k: value for k, value in state.style.items() if prev.style.get(k) != value}
+                for k in prev.style.keys() - state.style.keys():
+                    res['S'][k] = None
+            else:
+                res['s'] = style
+        if type(state.text) != type(prev.text) or state.text != prev.text:
+            if isinstance(v.text, HTML):
+                res['T'] = v.text
+            else:
+                res['t'] = v.text
+        if v._set_focused:
+            res['f'] = True
+        HTMLElementSerializer.encode_tail(v, res)
+        if 'v' in res:
+            res['l'] = v.localize
+        return res
+
+    @staticmethod
+    def encode_tail(v: HTMLElement, res: dict[str, typing.Any]):
+        if v.rebind_requested:
+            res['#'] = pop_rebind(v)
         value = getattr(v, '_value', None)
         if isinstance(value, HTMLElement):
             value = value.oid
         if value is not None:
             res['v'] = value
-        return res
+        if v.value_type and ('n' in res or 'v' in res):
+            res['type'] = v.value_type
 
 
 class TextSerializer(bsdf.Extension):
@@ -60,8 +148,23 @@ class TextSerializer(bsdf.Extension):
     def encode(self, s, v: TextNode):
         res = {'i': v.oid, 'p': get_parent_oid(v), 't': v.text}
         if v.rebind_requested:
-            res['#'] = True
-            v.rebind_requested = False
+            res['#'] = pop_rebind(v)
+        return res
+
+
+class StaticSerializer(bsdf.Extension):
+    """static subtree encoder, `H` is HTML of the whole subtree"""
+    name = 'f'
+    cls = StaticNode
+
+    def encode(self, s, v: StaticNode):
+        res = {
+            'i': v.oid,
+            'p': get_parent_oid(v),
+            'H': v.fragment.html(v.context.name if v.context._restyle else ''),
+        }
+        if v.rebind_requested:
+            res['#'] = pop_rebind(v)
         return res
 
 
@@ -75,13 +178,35 @@ class StubElementSerializer(bsdf.Extension):
             'p': get_parent_oid(v),
         }
         if v.rebind_requested:
-            res['#'] = True
-            v.rebind_requested = False
+            res['#'] = pop_rebind(v)
         if v.context._restyle:
             res['$'] = v.context.name
         return res
 
 
+class WindowLoopSerializer(bsdf.Extension):
+    name = 'w'
+    cls = WindowLoopNode
+
+    def encode(self, s, v: WindowLoopNode):
+        first = last = None
+        for child in v.children:
+            if (first := first_rendered(child)) is not None:
+                break
+        for child in reversed(v.children):
+            if (last := last_rendered(child)) is not None:
+                break
+        return {
+            'i': v.oid,
+            'p': get_parent_oid(v),
+            's': v.first,
+            'c': len(v.index_map),
+            'n': v.total,
+            'f': first and first.oid,
+            'l': last and last.oid,
+        }
+
+
 class EventSerializer(bsdf.Extension):
     name = 'e'
     cls = EventNode
@@ -90,6 +215,14 @@ class EventSerializer(bsdf.Extension):
         return {'ctx': v.context.name, 's': v.selector, 'e': v.events, 'oid': v.context.oid}
 
 
+class RemovedNodesSerializer(bsdf.Extension):
+    name = 'r'
+    cls = RemovedNodes
+
+    def encode(self, s, v: RemovedNodes):
+        return v.oids
+
+
 class DateSerializer(bsdf.Extension):
     name = 'D'
     cls = date
@@ -123,8 +256,8 @@ class ScriptSerializer(bsdf.Extension):
         return {'i': v.oid, 'u': v.uid, 'p': get_parent_oid(v), 'a': v.attributes, 't': v.text, 'h': v.put_to_head}
 
 
-serializer = bsdf.BsdfLiteSerializer([HTMLElementSerializer, TextSerializer, EventSerializer,
-                                      DateSerializer, TimeSerializer, ScriptSerializer, StubElementSerializer],
-                                     compression='bz2')
-
+#: node and special values extensions for any codec
+EXTENSIONS = [HTMLElementSerializer, TextSerializer, EventSerializer, DateSerializer, TimeSerializer, ScriptSerializer,
+              StubElementSerializer, RemovedNodesSerializer, WindowLoopSerializer, StaticSerializer]
 
+serializer: WireCodec = config.WIRE_CODEC(EXTENSIONS)
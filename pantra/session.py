@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import time
 from concurrent import futures
 import functools
@@ -7,6 +9,7 @@ import threading
 import traceback
 import typing
 import uuid
+import weakref
 from queue import Queue
 from datetime import datetime
 import inspect
@@ -15,22 +18,28 @@ from starlette.websockets import WebSocket
 
 from .protocol import Messages
 from .settings import config, logger
-from .common import UniNode, raise_exception_in_thread, UniqueNode
+from .common import UniNode, raise_exception_in_thread, UniqueNode, typename
 from .patching import wipe_logger
 from .compiler import exec_restart
 from .workers.decorators import async_worker
 from .trans import get_locale, get_translation, zgettext, Translations
 from .session_storage import SessionStorage, NullSessionStorage
 from .components.shot import ContextShot
+from .metrics import metrics
+from .replay import ReplayBuffer
+from .timers import SessionTimer
+from .expiry import ExpiryHeap
 
 if typing.TYPE_CHECKING:
-    from typing import Self, ClassVar, Optional, Any, Callable, Coroutine, Mapping, ContextManager
+    from typing import Self, ClassVar, Optional, Any, Callable, Coroutine, Mapping, ContextManager, Iterator
 
     from .components.context import Context, HTMLElement, AnyNode
     from .components.shot import ContextShotLike
     from .components.render.render_node import RenderNode
     from .workers.base import BaseWorkerServer
     from .trans.locale import Locale
+    from .serializer import SentState
+    from .codecs.base import WireCodec
 
 class SessionTask(typing.NamedTuple):
     task: threading.Thread | futures.Future
@@ -40,11 +49,13 @@ class SessionTask(typing.NamedTuple):
 def trace_errors(func: Callable[[Session, ...], None]):
     @functools.wraps(func)
     def res(session, *args, **kwargs):
+        from .components.reactdict import batch
         dont_refresh = kwargs.pop("dont_refresh", False)
         if type(session) is not Session:
             raise RuntimeError('trace_errors() wrong call: `session` must be provided')
         try:
-            func(session, *args, **kwargs)
+            with batch():
+                func(session, *args, **kwargs)
         except SystemExit:
             """The task killed gracefully"""
         except Exception as e:
@@ -95,17 +106,27 @@ class Session:
         params (dict[str, str]): URL params (http://localhost/app/?a=1&b=2&c=3)
         last_touch (datetime): last time event was triggered on this session
         tasks (dict[str, SessionTask]): all tasks running (see :doc:`more <session_tasks>`)
+        timers (set[SessionTimer]): active :mod:`timers <pantra.timers>`
+        sent_states (WeakKeyDictionary[RenderNode, SentState]): last HTML elements states sent to client,
+            to send changes only, they are dropped with elements
+        encoder (WireCodec): messages encoder with the session state of :doc:`wire codec <wire_codec>`
+        replay (ReplayBuffer): sent messages to :mod:`replay <pantra.replay>` after reconnect
         sessions (dict[str, Session]): (class variable) all sessions collection
+        expiry (ExpiryHeap): (class variable) :mod:`expiration <pantra.expiry>` deadlines of sessions by ID
+        unadopted (set[str]): (class variable) IDs of prerendered sessions client-side hasn't connected to yet
         pending_errors (Queue[str]): (class variable) all pending errors queue, to send to next user on next session
         server_worker (BaseWorkerServer): (class variable) main server worker to host all sessions
     """
     pending_errors: ClassVar[Queue[str]] = Queue()
     sessions: ClassVar[dict[str, Self]] = dict()
+    expiry: ClassVar[ExpiryHeap] = ExpiryHeap()
+    unadopted: ClassVar[set[str]] = set()
     server_worker: ClassVar[BaseWorkerServer | None] = None
 
     __slots__ = ['session_id', 'just_connected', 'state', 'root', 'app', 'user', 'title',
                  'locale', 'translations', 'storage', 'last_touch', 'finish_flag', 'params', 'tasks', '_in_node',
-                 '_flicker_next_time']
+                 '_flicker_next_time', 'sent_states', 'encoder', 'prerendered',
+                 'replay', '_resending', '_resend_task', 'timers', '_held_shot']
 
     @classmethod
     async def run_server_worker(cls):
@@ -130,15 +151,23 @@ class Session:
         self.app: str = app
         self.params: dict[str, str] = params
         self.storage: SessionStorage | None = config.SESSION_STORAGE(self)
-        self.last_touch: datetime = datetime.now()
+        self.touch()
         self.finish_flag: bool = False
         self.tasks: dict[str, SessionTask] = {}
 
         self._in_node: RenderNode | None = None
         self._flicker_next_time: int = 0
+        self.sent_states: weakref.WeakKeyDictionary[RenderNode, SentState] = weakref.WeakKeyDictionary()
+        self.encoder: WireCodec | None = None
         if not hasattr(self, "state"):
             self.state: dict[str, Any] = {} # Session.states['browser_id']
             self.just_connected: bool = True
+            self.prerendered: bool = False
+            self.replay: ReplayBuffer = ReplayBuffer(config.REPLAY_BUFFER_SIZE)
+            self._resending: object | None = None
+            self._resend_task: asyncio.Task | None = None
+            self.timers: set[SessionTimer] = set()
+            self._held_shot: asyncio.Task | None = None
             self.root: Optional[Context] = None
             self.title = ''
             self.user: Optional[dict[str, Any]] = None
@@ -164,6 +193,15 @@ class Session:
         """check variable in state"""
         return item in self.state
 
+    def touch(self):
+        """mark the session used now, postpone its expiration by :attr:`~pantra.defaults.Config.SESSION_TTL`
+
+        Prerendered session gets :attr:`~pantra.defaults.Config.SSR_TTL` only, until client-side connects.
+        """
+        self.last_touch = datetime.now()
+        ttl = config.SSR_TTL if getattr(self, 'prerendered', False) else config.SESSION_TTL
+        Session.expiry.touch(self.session_id, time.monotonic() + ttl)
+
     @staticmethod
     def gen_session_id() -> str:
         """simple unique session id generator"""
@@ -179,6 +217,7 @@ class Session:
         """restart application and rebuild main context"""
         from .components.context import Context
         logger.debug(f"{{{self.app}}} Going to restart...")
+        self.cancel_timers()
         self.send_message(Messages.restart())
         shot = ContextShot()
         ctx = Context("Main", shot=shot, session=self)
@@ -187,20 +226,99 @@ class Session:
             logger.debug(f"{{{self.app}}} Build [Main] context")
             run_safe(self, ctx.renderer.build)
 
+    def prerender(self) -> str:
+        """build main context before client-side connects and render it to HTML (see :ref:`SSR <ssr>`)
+
+        :meta private:
+        """
+        from .components.context import Context
+        from .ssr import render_html
+        ctx = Context("Main", shot=ContextShot(), session=self)
+        if not ctx.template:
+            return ''
+        self.root: Context = ctx
+        self.just_connected = False
+        self.prerendered = True
+        Session.unadopted.add(self.session_id)
+        self.touch()
+        logger.debug(f"{{{self.app}}} Prerender [Main] context")
+        run_safe(self, ctx.renderer.build, dont_refresh=True)
+        # client-side gets the whole tree on connection by `resend_root`
+        ctx.shot.pop()
+        return render_html(ctx)
+
     @async_worker
     async def send_message(self, message: dict[str, Any]):
         """send message to client-side using inner protocol
 
+        If more than `OUTBOUND_HARD_LIMIT` bytes wait for client-side, they are dropped with the message,
+        and client-side starts over, see :meth:`resync`.
+
         :meta private:
         """
         from .serializer import serializer
+        if Session.sessions.get(self.session_id) is not self:
+            # expired already
+            return
+        listener = self.server_worker.listener
+        sync = message.get('m') == 'rst'
+        if not sync and listener.backlog(self.session_id) > config.OUTBOUND_HARD_LIMIT:
+            await self.overflow()
+            return
         try:
-            code = serializer.encode(message)
+            if self.encoder is None:
+                self.encoder = serializer.session_encoder()
+            if sync:
+                self.sent_states.clear()
+                self.encoder.reset()
+            code = self.encoder.encode(message)
         except Exception as e:
             await self.send_message(Messages.error(f'Serialization error: {traceback.format_exc(-3)}'))
             return
-        self.last_touch = datetime.now()
-        await self.server_worker.listener.send(self.session_id, code)
+        self.touch()
+        await listener.send(self.session_id, self.replay.push(code, sync))
+
+    async def overflow(self):
+        """drop messages waiting for too slow client-side and start it over, unless the whole page is about to go
+
+        :meta private:
+        """
+        await self.server_worker.listener.discard(self.session_id)
+        if self._resend_task is not None and self._resending is None:
+            return
+        logger.warning(f"{{{self.app}}} Client-side is too slow, starting it over")
+        metrics.add('outbound.resyncs')
+        self.resync()
+
+    def resync(self):
+        """start client-side over in background: restart it, then resend the whole page and title
+
+        :meta private:
+        """
+        self.start_resend(restart=True)
+
+    async def resume(self, seq: int | None):
+        """replay messages client-side missed while reconnecting, or start it over if they are dropped already
+
+        Arguments:
+            seq: sequence number of the last message client-side got
+
+        :meta private:
+        """
+        if (frames := self.replay.since(seq)) is None:
+            logger.debug(f"{{{self.app}}} Messages after #{seq} are dropped, restarting client-side")
+            metrics.add('replay.fallbacks')
+            self.resync()
+            return
+        logger.debug(f"{{{self.app}}} Replaying {len(frames)} messages after #{seq}")
+        metrics.add('replay.resumes')
+        metrics.add('replay.frames', len(frames))
+        listener = self.server_worker.listener
+        for frame in frames:
+            if listener.backlog(self.session_id) > config.OUTBOUND_HARD_LIMIT:
+                await self.overflow()
+                return
+            await listener.send(self.session_id, frame)
 
     @staticmethod
     def node_context(node: RenderNode) -> ContextManager[None]:
@@ -270,12 +388,27 @@ class Session:
 
     @async_worker
     async def send_shot(self):
-        """send DOM changes snapshot"""
+        """send DOM changes snapshot
+
+        While more than `OUTBOUND_SOFT_LIMIT` bytes wait for client-side, changes are held in the shot,
+        so the latest state of changed nodes goes at once when client-side catches up.
+        """
         if not self.root.shot:
             logger.error('Shot is not prepared yet')
             return
 
         shot: ContextShotLike = self.root.shot
+        if self._held_shot is not None:
+            return
+        if self._resending is None and self.server_worker.listener.backlog(self.session_id) > config.OUTBOUND_SOFT_LIMIT:
+            metrics.add('outbound.held_shots')
+            self._held_shot = asyncio.create_task(self._release_shot())
+            return
+        if self._resending is not None:
+            # other changes wait for the end of `resend_root`, not sent nodes go there as they are
+            if flickering := [node for node in shot.pop_flickering() if node in self.sent_states]:
+                await self.send_message(Messages.update(flickering))
+            return
         flickering, created, updated, deleted = shot.pop()
 
         this_time = time.perf_counter()
@@ -285,39 +418,109 @@ class Session:
             if has_changes or this_time >= self._flicker_next_time:
                 self._flicker_next_time = this_time + 1 / config.SHOTS_PER_SECOND
                 logger.debug(f"{{{self.app}}} Sending flickering:{len(flickering)}")
-                await self.send_message(Messages.update(flickering))
+                if not has_changes:
+                    await self.send_message(Messages.update(flickering))
+                    return
+            else:
+                flickering = []
 
         if not has_changes:
             return
         logger.debug(f"{{{self.app}}} Sending shot NEW:{len(created)} UPD:{len(updated)} DEL:{len(deleted)}")
-        if deleted:
-            await self.send_message(Messages.delete(deleted))
-        if updated:
-            await self.send_message(Messages.update(updated))
-        if created:
-            await self.send_message(Messages.update(created))
-
-    def _collect_children(self, children: list[UniNode], lst: list[UniNode]):
-        for child in children:  # type: RenderNode
-            if not child:
+        await self.send_message(Messages.shot(deleted, flickering + updated, created))
+
+    async def _release_shot(self):
+        try:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.server_worker.listener.drain(self.session_id), config.LOCKS_TIMEOUT)
+        finally:
+            self._held_shot = None
+        await self.send_shot()
+
+    def cancel_outbound(self):
+        """stop held shot and resend of the page, call it from the event loop only
+
+        :meta private:
+        """
+        for task in (self._held_shot, self._resend_task):
+            if task is not None:
+                task.cancel()
+
+    @staticmethod
+    def iter_rendered(root: RenderNode) -> Iterator[RenderNode]:
+        """all nodes to render client-side, parents before children"""
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if not node:
                 continue
-            if not child.render_this_node:
-                pass
-            else:
-                lst.append(child)
-            self._collect_children(child.children, lst)
+            if node.render_this_node or typename(node) == 'WindowLoopNode':
+                yield node
+            stack.extend(reversed(node.children))
+
+    def start_resend(self, restart: bool = False):
+        """resend the whole page and title in background, instead of the resend in progress
 
-    def resend_root(self):
+        Call it from the event loop only, other sessions' messages are processed meanwhile.
+
+        Arguments:
+            restart: start client-side over first
+
+        :meta private:
+        """
+        if self._resend_task is not None:
+            self._resend_task.cancel()
+        self._resend_task = asyncio.create_task(self._resend(restart))
+
+    async def _resend(self, restart: bool):
+        try:
+            if restart:
+                await self.send_message(Messages.restart())
+            await self.resend_root()
+            if self.title:
+                await self.send_title(self.title)
+        finally:
+            if self._resend_task is asyncio.current_task():
+                self._resend_task = None
+
+    @async_worker
+    async def resend_root(self):
         """resend root context after page refresh
 
+        The tree goes in chunks of `RESEND_CHUNK_SIZE` nodes. Each next chunk waits for the previous one to be sent,
+        so errors, "task done" signals and flickering updates of nodes sent already go first.
+        Other changes of the tree are sent after the last chunk. Use :meth:`start_resend` not to wait for it.
+
         :meta private:
         """
         logger.debug(f"{{{self.app}}} Sending root")
-        lst = []
-        if 'on_restart' in self.root.locals:
+        if 'on_restart' in self.root.locals and not self.prerendered:
             exec_restart(self.root)
-        self._collect_children([self.root], lst)
-        return self.send_message(Messages.update(lst))
+        if self.prerendered:
+            self.prerendered = False
+            Session.unadopted.discard(self.session_id)
+        self.sent_states.clear()
+        if self.encoder is not None:
+            self.encoder.reset()
+        self._resending = token = object()
+        try:
+            chunk = []
+            chunks = 0
+            for node in self.iter_rendered(self.root):
+                chunk.append(node)
+                if len(chunk) >= config.RESEND_CHUNK_SIZE:
+                    await self.send_message(Messages.update(chunk))
+                    chunk = []
+                    chunks += 1
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self.server_worker.listener.drain(self.session_id), config.LOCKS_TIMEOUT)
+                    await asyncio.sleep(0)
+            if chunk or not chunks:
+                await self.send_message(Messages.update(chunk))
+        finally:
+            if self._resending is token:
+                self._resending = None
+        await self.send_shot()
 
     def kill_task(self, task_name: str):
         """kill :doc:`task <session_tasks>` by name"""
@@ -340,6 +543,20 @@ class Session:
                 else:
                     self.send_shot()
 
+    def call_later(self, delay: float, func: Callable, *args) -> SessionTimer:
+        """call function in task thread after `delay` seconds (see :mod:`timers <pantra.timers>`)"""
+        return SessionTimer(self, delay, func, args).start()
+
+    def call_every(self, interval: float, func: Callable, *args) -> SessionTimer:
+        """call function in task thread every `interval` seconds, until it returns `False`
+        or the timer is cancelled (see :mod:`timers <pantra.timers>`)"""
+        return SessionTimer(self, interval, func, args, repeat=True).start()
+
+    def cancel_timers(self):
+        """cancel all timers of the session"""
+        for timer in list(self.timers):
+            timer.cancel()
+
     def kill_all_tasks(self, ctx: UniqueNode = None):
         """kill all :doc:`tasks <session_tasks>` for specified context and all"""
         for task_name, stask in list(self.tasks.items()):
@@ -133,6 +133,9 @@ class LazyConfig(AbstractConfig):
             config.BOOTSTRAP_FILENAME = config.CACHE_PATH / 'bootstrap.html'
             config.COMPONENTS_PATH = config.CACHE_PATH / 'core'
             config.APPS_PATH = config.CACHE_PATH / 'apps'
+        elif self.RUN_JIT:
+            from pantra.cached.renderer import RendererJIT
+            config.DEFAULT_RENDERER = RendererJIT
 
         if not self.WIPE_LOGGING:
             self.SETUP_LOGGER(getattr(logging, self.LOG_LEVEL.upper()))
@@ -0,0 +1,110 @@
+"""Server-side rendering of the first paint
+
+With :attr:`~pantra.defaults.Config.SSR` set, the bootstrap page request builds `Main` component of a new session
+and puts its HTML into the page. Every element gets `data-oid` attribute, so client-side adopts existing elements
+instead of creating them again, see :ref:`SSR <ssr>`.
+
+Events, scripts and values go with the first update message after connection, as usual.
+"""
+from __future__ import annotations
+
+import html
+import re
+import typing
+
+from .common import HTML
+from .components.context import HTMLElement, NSElement, TextNode, StaticNode, ConditionNode, LoopNode, ReactNode
+from .components.loader import VOID_ELEMENTS
+
+if typing.TYPE_CHECKING:
+    from .components.render.render_node import RenderNode
+
+__all__ = ['render_html']
+
+NOT_RENDERED_ATTRIBUTES = ('on:', 'bind:')  #: attributes processed by client-side only
+BOOLEAN_ATTRIBUTES = ('checked', 'required', 'disabled')
+ATTRIBUTE_NAME = re.compile(r'^[^\s"\'<>/=\x00-\x1f]+$')
+TAG_NAME_END = re.compile(r'[\s/>]')
+
+
+def _attribute(name: str, value: typing.Any) -> str:
+    if name in BOOLEAN_ATTRIBUTES:
+        return f' {name}' if value else ''
+    if not value:
+        return ''
+    if value is True:
+        value = 'true'
+    return f' {name}="{html.escape(str(value))}"'
+
+
+def _element(node: HTMLElement, res: list[str]):
+    name = node.name
+    res.append(f'<{name} data-oid="{node.oid}"')
+    for attr, value in node.attributes.items():
+        if not attr.startswith(NOT_RENDERED_ATTRIBUTES) and ATTRIBUTE_NAME.match(attr):
+            res.append(_attribute(attr, value))
+    classes = str(node.classes)
+    if node.context._restyle:
+        classes = f'{node.context.name} {classes}'.rstrip()
+    if classes:
+        res.append(f' class="{html.escape(classes)}"')
+    if style := str(node.style):
+        res.append(f' style="{html.escape(style)}"')
+    if node.value_type and 'type' not in node.attributes:
+        res.append(f' type="{html.escape(node.value_type)}"')
+    value = node._value
+    if value is not None and not isinstance(value, HTMLElement):
+        if node.value_type in ('checkbox', 'radio'):
+            res.append(' checked' if value else '')
+        elif name == 'input' and isinstance(value, (str, int, float)):
+            res.append(f' value="{html.escape(str(value))}"')
+    res.append('>')
+    if name in VOID_ELEMENTS and type(node) is not NSElement:
+        return
+    if isinstance(node.text, HTML):
+        res.append(node.text)
+    elif node.text is not None:
+        res.append(html.escape(str(node.text), False))
+    _children(node, res)
+    res.append(f'</{name}>')
+
+
+def _static(node: StaticNode, res: list[str]):
+    text = node.fragment.html(node.context.name if node.context._restyle else '')
+    pos = TAG_NAME_END.search(text).start()
+    res.append(f'{text[:pos]} data-oid="{node.oid}"{text[pos:]}')
+
+
+def _stub(node: RenderNode, res: list[str]):
+    res.append(f'<div data-oid="{node.oid}"')
+    if node.context._restyle:
+        res.append(f' class="{node.context.name}"')
+    res.append('>')
+    _children(node, res)
+    res.append('</div>')
+
+
+def _children(node: RenderNode, res: list[str]):
+    for child in node.children:
+        if child:
+            _render(child, res)
+
+
+def _render(node: RenderNode, res: list[str]):
+    if isinstance(node, HTMLElement):
+        _element(node, res)
+    elif type(node) is TextNode:
+        res.append(f'<text data-oid="{node.oid}">{html.escape(str(node.text or ""), False)}</text>')
+    elif type(node) is StaticNode:
+        _static(node, res)
+    elif type(node) in (ConditionNode, LoopNode, ReactNode) and node.render_this_node:
+        _stub(node, res)
+    elif not node.render_this_node:
+        _children(node, res)
+
+
+def render_html(root: RenderNode) -> str:
+    """render built tree to HTML, every element marked with its OID"""
+    res = []
+    _render(root, res)
+    return ''.join(res)
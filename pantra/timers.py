@@ -0,0 +1,94 @@
+"""Delayed and periodic calls of the session
+
+Timers of all sessions are kept in the timer heap of the event loop, so waiting takes no thread.
+When the timer fires, its function is put to the task queue in the session lane, so it runs in a task thread
+one by one with other actions of the session, see :doc:`threads`. Changes are sent to client-side after every call.
+
+Use :meth:`Session.call_later <pantra.session.Session.call_later>` and
+:meth:`Session.call_every <pantra.session.Session.call_every>` to create timers.
+"""
+from __future__ import annotations
+
+import traceback
+import typing
+
+if typing.TYPE_CHECKING:
+    from typing import *
+    from asyncio import TimerHandle
+    from .session import Session
+
+__all__ = ['SessionTimer']
+
+
+class SessionTimer:
+    """Timer of the session
+
+    Periodic timer is armed again after the call is over, so calls never overlap.
+    It stops when the function returns `False` or raises an error.
+
+    Arguments:
+        session: session to call function in
+        delay: time in seconds before the call, or between the calls
+        func: function to call
+        args: function arguments
+        repeat: call the function periodically
+    """
+    __slots__ = ['session', 'delay', 'func', 'args', 'repeat', 'cancelled', '_handle']
+
+    def __init__(self, session: Session, delay: float, func: Callable, args: tuple = (), repeat: bool = False):
+        self.session: Session = session
+        self.delay: float = delay
+        self.func: Callable = func
+        self.args: tuple = args
+        self.repeat: bool = repeat
+        self.cancelled: bool = False
+        self._handle: TimerHandle | None = None
+
+    def start(self) -> Self:
+        """arm the timer, thread-safe"""
+        loop = self.session.server_worker.async_loop
+        when = loop.time() + self.delay
+        self.session.timers.add(self)
+        loop.call_soon_threadsafe(self._arm, when)
+        return self
+
+    def cancel(self):
+        """stop the timer, thread-safe, the call running already is not interrupted"""
+        self.cancelled = True
+        self.session.timers.discard(self)
+        if (handle := self._handle) is not None:
+            self.session.server_worker.async_loop.call_soon_threadsafe(handle.cancel)
+
+    @property
+    def active(self) -> bool:
+        return not self.cancelled and self in self.session.timers
+
+    def _arm(self, when: float):
+        if not self.cancelled:
+            self._handle = self.session.server_worker.async_loop.call_at(when, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        if not self.cancelled:
+            self.session.server_worker.task_queue.put(self.session, (self._run, (), {}))
+
+    def _run(self):
+        from .components.reactdict import batch
+        if self.cancelled:
+            return
+        session = self.session
+        try:
+            with batch():
+                res = self.func(*self.args)
+        except SystemExit:
+            """The task killed gracefully"""
+            res = False
+        except Exception as e:
+            session.error(traceback.format_exc(-3), e)
+            res = False
+        else:
+            session.send_shot()
+        if self.repeat and res is not False and not self.cancelled:
+            self.start()
+        else:
+            session.timers.discard(self)
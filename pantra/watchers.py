@@ -16,10 +16,11 @@ observer: typing.Optional[Observer] = None
 
 class AppFilesEventHandler(PatternMatchingEventHandler):
 
-    def __init__(self, templates, code_base):
-        super().__init__(['*.html', '*.py'])
+    def __init__(self, templates, code_base, prototypes):
+        super().__init__(patterns=['*.html', '*.py'])
         self.templates = templates
         self.code_base = code_base
+        self.prototypes = prototypes
 
     def refresh_template(self, filename: Path):
         if filename.suffix == '.html':
@@ -28,10 +29,13 @@ class AppFilesEventHandler(PatternMatchingEventHandler):
                 if v and v.filename == filename and v.hex_digest != hex_digest:
                     logger.warning(f'File `{filename.relative_to(config.BASE_PATH)}` changed, refreshing')
                     del self.templates[k]
+                    self.prototypes.pop(str(filename), None)
                     break
         else:
             logger.warning(f'File `{filename.relative_to(config.BASE_PATH)}` changed, refreshing')
-            if filename in self.code_base:
+            # prototypes hold objects imported from changed modules
+            self.prototypes.clear()
+            if str(filename) in self.code_base:
                 del self.code_base[str(filename)]
             else:
                 module_name = '.'.join(filename.relative_to(config.BASE_PATH).parts).removesuffix('.py').removesuffix('.__init__')
@@ -50,15 +54,15 @@ class AppFilesEventHandler(PatternMatchingEventHandler):
 def start_observer():
     global observer
 
-    from .compiler import code_base
+    from .compiler import code_base, prototypes
 
     templates = config.DEFAULT_RENDERER.templates
 
     logger.info("Starting files watchers")
     observer = Observer()
     observer.daemon = True
-    observer.schedule(AppFilesEventHandler(templates, code_base), str(config.APPS_PATH), True)
-    observer.schedule(AppFilesEventHandler(templates, code_base), str(config.COMPONENTS_PATH), True)
+    observer.schedule(AppFilesEventHandler(templates, code_base, prototypes), str(config.APPS_PATH), True)
+    observer.schedule(AppFilesEventHandler(templates, code_base, prototypes), str(config.COMPONENTS_PATH), True)
     observer.start()
 
 
@@ -6,13 +6,15 @@ import contextlib
 import typing
 import time
 from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass
 import threading
 import queue
 from datetime import datetime
-from enum import IntEnum, auto
 
 from ..common import raise_exception_in_thread
+from ..metrics import metrics
+from .lanes import TaskLanes
 from ..settings import config, logger
 
 if typing.TYPE_CHECKING:
@@ -20,15 +22,14 @@ if typing.TYPE_CHECKING:
     from ..session import Session
     from ..components.render.render_node import RenderNode
 
-class ThreadMode(IntEnum):
-    NORMAL = auto()
-    REDUCED = auto()
+RECENT_WAITS = 200  #: amount of the last queue wait times to estimate pool load
+WAIT_PERCENTILE = 95  #: percentile of recent queue wait times compared to :attr:`~pantra.defaults.Config.CREATE_THREAD_LAG`
+EXPIRY_BATCH = 1  #: seconds to wait after the earliest session expiration to drop others expiring meanwhile at once
 
 @dataclass
 class WorkerStat:
     active: bool = False
     last_tick: float = 0
-    mode: ThreadMode = ThreadMode.NORMAL
     thread: threading.Thread = None
     task_info: str = ""
 
@@ -53,8 +54,22 @@ class BaseWorkerServer(ABC):
         async def close(self):
             """Close active connection"""
 
+        async def drain(self, session_id: str):
+            """Wait until messages sent to client by `session_id` are passed on, if it is known"""
+
+        def backlog(self, session_id: str) -> int:
+            """Bytes of messages to client by `session_id` waiting to be passed on, if it is known"""
+            return 0
+
+        async def discard(self, session_id: str):
+            """Drop messages to client by `session_id` waiting to be passed on, if possible"""
+
     workers: typing.ClassVar[dict[str, WorkerStat]] = {}
-    task_queue: typing.ClassVar[queue.Queue | None] = queue.Queue()
+    workers_lock: typing.ClassVar[threading.Lock] = threading.Lock()
+    starting_threads: typing.ClassVar[int] = 0
+    scale_event: typing.ClassVar[threading.Event] = threading.Event()
+    task_queue: typing.ClassVar[TaskLanes] = TaskLanes(scale_event.set)
+    recent_waits: typing.ClassVar[deque[float]] = deque(maxlen=RECENT_WAITS)
     thread_counter: typing.ClassVar[int] = 0
 
     listener: Listener
@@ -64,27 +79,41 @@ class BaseWorkerServer(ABC):
     def task_processor(cls):
         """Single task thread processor.
 
-        It extracts new function call with args from `task_queue` and let it run in this thread"""
+        It extracts new function call with args from `task_queue` and let it run in this thread.
+        Calls of one session are taken one by one, see :func:`~pantra.workers.decorators.thread_worker`.
+        Thread idle for :attr:`~pantra.defaults.Config.KILL_THREAD_LAG` seconds quits, if it is redundant."""
         try:
             ident = threading.current_thread().name
+            stat = cls.workers[ident]
             logger.info('Task thread started')
+            with cls.workers_lock:
+                cls.starting_threads -= 1
             while True:
                 try:
-                    func, args, kwargs = cls.task_queue.get(timeout=5)
+                    lane, (func, args, kwargs), waited = cls.task_queue.get(timeout=config.KILL_THREAD_LAG or None)
                 except queue.Empty:
-                    if cls.workers[ident].mode == ThreadMode.REDUCED:
+                    if cls.retire_task_thread(ident):
                         break
                     continue
-                if func is None: break
-                cls.workers[ident].last_tick = time.perf_counter()
-                cls.workers[ident].active = True
-                cls.workers[ident].task_info = func.__name__
-                func(*args, **kwargs)
+                if func is None:
+                    cls.task_queue.done(lane)
+                    break
+                cls.recent_waits.append(waited)
+                metrics.observe('tasks.wait_time', waited)
+                stat.last_tick = time.perf_counter()
+                stat.active = True
+                stat.task_info = func.__name__
+                try:
+                    func(*args, **kwargs)
+                finally:
+                    cls.task_queue.done(lane)
                 if ident not in cls.workers:
                     break
-                cls.workers[ident].last_tick = time.perf_counter()
-                cls.workers[ident].active = False
-                cls.workers[ident].task_info = ''
+                tick = time.perf_counter()
+                metrics.observe('tasks.run_time', tick - stat.last_tick)
+                stat.last_tick = tick
+                stat.active = False
+                stat.task_info = ''
         except SystemExit:
             logger.info('Task thread got exit signal')
 
@@ -111,66 +140,130 @@ class BaseWorkerServer(ABC):
         session.tasks[func_name] = SessionTask(task, func)
         task.add_done_callback(on_done)
 
+    @classmethod
+    def add_task_threads(cls, count: int, prefix: str = 'X#'):
+        """start new task threads, but not more than :attr:`~pantra.defaults.Config.MAX_TASK_THREADS` in total"""
+        with cls.workers_lock:
+            if config.MAX_TASK_THREADS:
+                count = min(count, config.MAX_TASK_THREADS - len(cls.workers))
+            for _ in range(count):
+                cls.thread_counter += 1
+                thread = threading.Thread(target=cls.task_processor, name=f'{prefix}{cls.thread_counter}', daemon=True)
+                cls.workers[thread.name] = WorkerStat(thread=thread)
+                cls.starting_threads += 1
+                thread.start()
+        if count > 0:
+            logger.warning(f'New threads created: {count}, total {len(cls.workers)}')
+            metrics.add('tasks.threads_created', count)
+
+    @classmethod
+    def retire_task_thread(cls, ident: str) -> bool:
+        """forget idle thread if there are more than :attr:`~pantra.defaults.Config.MIN_TASK_THREADS`"""
+        with cls.workers_lock:
+            if len(cls.workers) <= config.MIN_TASK_THREADS:
+                return False
+            del cls.workers[ident]
+        logger.info(f'Thread retired `{ident}`')
+        metrics.add('tasks.threads_retired')
+        return True
+
+    @classmethod
+    def recent_wait(cls) -> float:
+        """percentile of the last queue wait times, see :data:`WAIT_PERCENTILE`"""
+        if not (waits := sorted(cls.recent_waits)):
+            return 0
+        return waits[min(len(waits) * WAIT_PERCENTILE // 100, len(waits) - 1)]
+
+    @classmethod
+    def check_task_threads(cls):
+        """drop dead threads, stop hung ones"""
+        tick = time.perf_counter()
+        for k, v in list(cls.workers.items()):  # type: str, WorkerStat
+            if not v.thread.is_alive():
+                logger.warning(f"Thread killed `{k}` ({v.task_info})")
+                cls.workers.pop(k, None)
+            elif v.active and config.THREAD_TIMEOUT and tick - v.last_tick > config.THREAD_TIMEOUT:
+                logger.warning(f"Thread timeout `{k}` ({v.task_info})")
+                raise_exception_in_thread(v.thread.native_id)
+                cls.workers.pop(k, None)
+
     @classmethod
     def tasks_controller(cls):
         """Common task controller
 
-        It supervises all task threads life cycle. See also :doc:`threads`.
+        It wakes up when tasks are ready and no thread waits for them. If tasks wait in the queue longer than
+        :attr:`~pantra.defaults.Config.CREATE_THREAD_LAG`, either now or by recent measures, it adds as many threads
+        as there are tasks lacking them. Once a second it supervises dead and hung threads and reports
+        pool metrics. See also :doc:`threads`.
         """
+        timeout = 1
+        next_check = time.perf_counter() + 1
         while True:
-            time.sleep(1)
-            tick = time.perf_counter()
-            last_tick = 0
-            for k, v in list(cls.workers.items()):  # type: str, WorkerStat
-                if not v.thread.is_alive():
-                    logger.warning(f"Thread killed `{k}` ({v.task_info})")
-                    del cls.workers[k]
-                elif v.active and config.THREAD_TIMEOUT and tick - v.last_tick > config.THREAD_TIMEOUT:
-                    logger.warning(f"Thread timeout `{k}` ({v.task_info})")
-                    raise_exception_in_thread(v.thread.native_id)
-                    del cls.workers[k]
-                elif (config.MAX_TASK_THREADS and config.KILL_THREAD_LAG
-                      and len(cls.workers) > config.MAX_TASK_THREADS
-                      and not v.active and v.last_tick
-                      and tick - v.last_tick > config.KILL_THREAD_LAG):
-                    logger.warning(f"Thread killing `{k}` ({v.task_info})")
-                    v.mode = ThreadMode.REDUCED
-                elif v.active and v.last_tick > last_tick:
-                    last_tick = v.last_tick
-            if (config.MIN_TASK_THREADS and config.CREATE_THREAD_LAG
-                    and len(cls.workers) < config.MIN_TASK_THREADS
-                    or not cls.task_queue.empty() and last_tick
-                    and tick - last_tick > config.CREATE_THREAD_LAG):
-                cls.thread_counter += 1
-                thread_name = f'X#{cls.thread_counter}'
-                thread = threading.Thread(target=cls.task_processor, name=thread_name, daemon=True)
-                logger.warning(f'New thread created `{thread_name}`')
-                cls.workers[thread_name] = WorkerStat(thread=thread)
-                thread.start()
+            cls.scale_event.wait(timeout)
+            cls.scale_event.clear()
+            timeout = 1
+            task_queue = cls.task_queue
+            if (tick := time.perf_counter()) >= next_check:
+                next_check = tick + 1
+                cls.check_task_threads()
+                if (lack := config.MIN_TASK_THREADS - len(cls.workers)) > 0:
+                    cls.add_task_threads(lack)
+                metrics.set('tasks.threads', len(cls.workers))
+                metrics.set('tasks.idle_threads', task_queue.idle())
+                metrics.set('tasks.queue', task_queue.qsize())
+                metrics.set('tasks.ready', task_queue.ready())
+            if (lack := task_queue.ready() - task_queue.idle() - cls.starting_threads) > 0:
+                waited = max(task_queue.oldest_wait(), cls.recent_wait())
+                if waited >= config.CREATE_THREAD_LAG:
+                    cls.add_task_threads(lack)
+                else:
+                    timeout = config.CREATE_THREAD_LAG - waited
+            timeout = min(timeout, next_check - tick)
 
     @staticmethod
     def session_killer():
-        """Session TTL controller"""
+        """Session TTL controller
+
+        It sleeps until the earliest deadline in :attr:`Session.expiry <pantra.session.Session.expiry>`
+        plus :data:`EXPIRY_BATCH`, then drops all sessions expired by then at once, and stops their timers and tasks.
+        Sessions never connected are kept. With SSR on, it wakes up every `SSR_TTL` seconds at least.
+        """
         from ..session import Session
+        expiry = Session.expiry
         while True:
-            time.sleep(5)
-            now = datetime.now()
-            for session_id in frozenset(Session.sessions):
-                session = Session.sessions[session_id]
-                if not getattr(session, "just_connected", True) and (now - session.last_touch).seconds >= config.SESSION_TTL:
-                    logger.warning(f'Session {session_id} killed by TTL limit {config.SESSION_TTL} seconds')
-                    for task in list(session.tasks.keys()):
-                        session.kill_task(task)
-                    del Session.sessions[session_id]
+            deadline = expiry.next_deadline()
+            # prerendered sessions may get deadlines earlier than the one it sleeps till
+            longest = config.SSR_TTL if config.SSR else config.SESSION_TTL
+            time.sleep(min(max(deadline - time.monotonic(), 0) + EXPIRY_BATCH, longest) if deadline is not None else longest)
+            expired = []
+            for session_id in expiry.pop_due(time.monotonic()):
+                if (session := Session.sessions.get(session_id)) is None:
+                    continue
+                if getattr(session, "just_connected", True):
+                    session.touch()
+                    continue
+                del Session.sessions[session_id]
+                Session.unadopted.discard(session_id)
+                expired.append(session)
+            if not expired:
+                continue
+            logger.warning(f'{len(expired)} sessions killed by TTL limit {config.SESSION_TTL} seconds')
+            for session in expired:
+                logger.debug(f'Session {session.session_id} killed by TTL')
+                asyncio.run_coroutine_threadsafe(Session.server_worker.listener.discard(session.session_id),
+                                                 Session.server_worker.async_loop)
+                Session.server_worker.async_loop.call_soon_threadsafe(session.cancel_outbound)
+                session.cancel_timers()
+                for task in list(session.tasks.keys()):
+                    session.kill_task(task)
+            metrics.add('sessions.expired', len(expired))
+            metrics.set('sessions.active', len(Session.sessions))
 
     @classmethod
     def start_task_workers(cls):
         logger.info("Starting task workers")
-        BaseWorkerServer.task_queue = queue.Queue()
-        for i in range(config.MIN_TASK_THREADS):
-            thread = threading.Thread(target=cls.task_processor, name=f'#{i}', daemon=True)
-            BaseWorkerServer.workers[thread.name] = WorkerStat(thread=thread)
-            thread.start()
+        BaseWorkerServer.task_queue = TaskLanes(cls.scale_event.set)
+        cls.add_task_threads(config.MIN_TASK_THREADS, '#')
         threading.Thread(target=cls.tasks_controller, daemon=True).start()
         threading.Thread(target=cls.session_killer, daemon=True).start()
 
@@ -204,7 +297,7 @@ class BaseWorkerServer(ABC):
                     code = serializer.encode(Messages.reconnect())
                     await Session.server_worker.listener.send(session_id, code)
                 else:
-                    session.last_touch = datetime.now()
+                    session.touch()
                     await process_message(session, data)
 
 
@@ -252,11 +345,17 @@ class BaseWorkerClient(ABC):
         self.connection.close()
 
     def bind_to_websocket(self, ws: WebSocket):
+        from ..compression import FrameCompressor
+
+        compressor = FrameCompressor.for_websocket(ws)
+
         async def task():
             while True:
                 message = await self.connection.receive()
                 self.last_touch = datetime.now()
-                await ws.send_bytes(message) #, compress=len(message)>=1000)
+                if compressor is not None:
+                    message = compressor.compress(message)
+                await ws.send_bytes(message)
         self.sync_task = asyncio.create_task(task())
 
     async def connect_session(self, session_id: str, app: str, lang: list[str], params: dict[str, str]):
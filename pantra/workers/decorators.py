@@ -4,10 +4,15 @@ import threading
 
 
 def thread_worker(func):
+    """run the function in task thread
+
+    Calls with the same session as the first argument run one by one, in order they are made.
+    """
     @functools.wraps(func)
     def res(*args, **kwargs):
         from ..session import Session
-        Session.server_worker.task_queue._put((func, args, kwargs))
+        lane = args[0] if args and isinstance(args[0], Session) else None
+        Session.server_worker.task_queue.put(lane, (func, args, kwargs))
     return res
 
 
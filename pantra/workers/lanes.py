@@ -0,0 +1,112 @@
+"""Task queue with per-session lanes"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+import typing
+from collections import deque
+
+if typing.TYPE_CHECKING:
+    from typing import *
+
+__all__ = ['TaskLanes']
+
+
+class TaskLanes:
+    """Queue of tasks for task threads, split to lanes
+
+    Tasks of one lane run one at a time, in order they are put. Lanes with pending tasks take turns,
+    so one lane can't occupy more than one thread however many tasks it has. Tasks without lane run in parallel.
+
+    Thread-safe, has no global lock held while tasks are running.
+
+    Arguments:
+        on_starving: called when a task gets ready and no thread is waiting for it
+    """
+    __slots__ = ['_lanes', '_ready', '_running', '_size', '_idle', '_cond', 'on_starving']
+
+    def __init__(self, on_starving: Callable[[], Any] | None = None):
+        self._lanes: dict[Hashable, deque[tuple[float, Any]]] = {}
+        self._ready: deque[Hashable] = deque()
+        self._running: set[Hashable] = set()
+        self._size: int = 0
+        self._idle: int = 0
+        self._cond = threading.Condition(threading.Lock())
+        self.on_starving: Callable[[], Any] | None = on_starving
+
+    def put(self, lane: Hashable | None, item: Any):
+        """put task to the end of the lane, `None` for the task running apart"""
+        if lane is None:
+            lane = object()
+        with self._cond:
+            if (tasks := self._lanes.get(lane)) is None:
+                tasks = self._lanes[lane] = deque()
+            tasks.append((time.perf_counter(), item))
+            self._size += 1
+            if len(tasks) == 1 and lane not in self._running:
+                self._ready.append(lane)
+                self._cond.notify()
+            starving = len(self._ready) > self._idle
+        if starving and self.on_starving:
+            self.on_starving()
+
+    def get(self, timeout: float | None = None) -> tuple[Hashable, Any, float]:
+        """take the next task of the next ready lane, raise :class:`queue.Empty` on timeout
+
+        Returns lane, task and time in seconds the task waited in the queue.
+        The lane is busy until :meth:`done` is called.
+        """
+        with self._cond:
+            deadline = timeout is not None and time.monotonic() + timeout
+            self._idle += 1
+            try:
+                while not self._ready:
+                    if timeout is None:
+                        self._cond.wait()
+                    elif (remaining := deadline - time.monotonic()) > 0:
+                        self._cond.wait(remaining)
+                    else:
+                        raise queue.Empty
+            finally:
+                self._idle -= 1
+            lane = self._ready.popleft()
+            put_time, item = self._lanes[lane].popleft()
+            self._size -= 1
+            self._running.add(lane)
+            return lane, item, time.perf_counter() - put_time
+
+    def done(self, lane: Hashable):
+        """release the lane taken by :meth:`get`, its next task gets in turn after other lanes"""
+        with self._cond:
+            self._running.discard(lane)
+            if not self._lanes[lane]:
+                del self._lanes[lane]
+                return
+            self._ready.append(lane)
+            self._cond.notify()
+            starving = len(self._ready) > self._idle
+        if starving and self.on_starving:
+            self.on_starving()
+
+    def ready(self) -> int:
+        """amount of lanes with a task able to run right now"""
+        return len(self._ready)
+
+    def idle(self) -> int:
+        """amount of threads waiting for a task"""
+        return self._idle
+
+    def oldest_wait(self) -> float:
+        """time in seconds the oldest ready task is waiting"""
+        with self._cond:
+            if not self._ready:
+                return 0
+            return time.perf_counter() - min(self._lanes[lane][0][0] for lane in self._ready)
+
+    def qsize(self) -> int:
+        """amount of pending tasks"""
+        return self._size
+
+    def empty(self) -> bool:
+        return not self._size
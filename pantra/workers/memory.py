@@ -1,25 +1,79 @@
 import typing
 from dataclasses import dataclass
 
-from asyncio.queues import Queue
+from asyncio.queues import Queue, QueueEmpty
 
 from .base import BaseWorkerClient, BaseWorkerServer
+from ..metrics import metrics
+
+
+class OutboundQueue(Queue):
+    """Messages to client-side of one session
+
+    It counts bytes of messages queued, and connections reading them.
+    """
+    def __init__(self):
+        super().__init__()
+        self.size: int = 0
+        self.readers: int = 0
+
+    def _put(self, item: bytes):
+        super()._put(item)
+        self.size += len(item)
+
+    def _get(self) -> bytes:
+        item = super()._get()
+        self.size -= len(item)
+        return item
+
+    def clear(self):
+        """drop all messages, as if they are sent"""
+        while True:
+            try:
+                self.get_nowait()
+            except QueueEmpty:
+                break
+            self.task_done()
 
 
 class WorkerServer(BaseWorkerServer):
     run_with_web: typing.ClassVar[bool] = True
 
     queue: typing.ClassVar[Queue[tuple[str, bytes]]] = Queue()
-    queues: typing.ClassVar[dict[str, Queue[bytes]]] = {}
+    queues: typing.ClassVar[dict[str, OutboundQueue]] = {}
 
     class Listener(BaseWorkerServer.Listener):
         async def send(self, session_id: str, message: bytes):
-            await WorkerServer.queues[session_id].put(message)
+            if (queue:=WorkerServer.queues.get(session_id, None)) is None:
+                from ..session import Session
+                # messages may go before client-side connects, when the session is prerendered,
+                # otherwise client-side is away and gets them by replay or resync on reconnect
+                if session_id not in Session.unadopted:
+                    metrics.add('outbound.skipped')
+                    return
+                queue = OutboundQueue()
+                WorkerServer.queues[session_id] = queue
+            await queue.put(message)
 
         async def receive(self) -> tuple[str, bytes]:
             session_id, message = await WorkerServer.queue.get()
             return session_id, message
 
+        async def drain(self, session_id: str):
+            if (queue:=WorkerServer.queues.get(session_id, None)) is not None:
+                await queue.join()
+
+        def backlog(self, session_id: str) -> int:
+            if (queue:=WorkerServer.queues.get(session_id, None)) is not None:
+                return queue.size
+            return 0
+
+        async def discard(self, session_id: str):
+            if (queue:=WorkerServer.queues.get(session_id, None)) is not None:
+                queue.clear()
+                if not queue.readers:
+                    del WorkerServer.queues[session_id]
+
         def close(self):
             pass
 
@@ -31,20 +85,29 @@ class WorkerClient(BaseWorkerClient):
     @dataclass
     class Connection(BaseWorkerClient.Connection):
         session_id: str
-        queue: Queue[bytes]
+        queue: OutboundQueue
 
         async def send(self, message: bytes):
             await WorkerServer.queue.put((self.session_id, message))
 
         async def receive(self) -> bytes:
-            return await self.queue.get()
+            message = await self.queue.get()
+            self.queue.task_done()
+            return message
 
         def close(self):
-            pass
+            # the last connection reclaims the queue, reconnected client-side gets missed messages by replay
+            queue = self.queue
+            queue.readers -= 1
+            if not queue.readers and WorkerServer.queues.get(self.session_id, None) is queue:
+                del WorkerServer.queues[self.session_id]
+                queue.clear()
+                metrics.add('outbound.reclaimed')
 
 
     def open_connection(self, session_id: str):
         if (queue:=WorkerServer.queues.get(session_id, None)) is None:
-            queue = Queue()
+            queue = OutboundQueue()
             WorkerServer.queues[session_id] = queue
+        queue.readers += 1
         self.connection = WorkerClient.Connection(session_id, queue)
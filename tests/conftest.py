@@ -0,0 +1,32 @@
+import pytest
+
+from pantra.settings import config
+
+
+@pytest.fixture
+def session():
+    from pantra.session import Session
+    session = Session('test', config.DEFAULT_APP, ['en'], {})
+    yield session
+    Session.sessions.pop(session.session_id, None)
+    Session.expiry.remove(session.session_id)
+
+
+@pytest.fixture
+def render(session):
+    """render template source to a new context of the session"""
+    from pantra.bench import _load_template
+    from pantra.components.context import Context
+    from pantra.components.render.renderer_html import RendererHTML
+    from pantra.components.shot import ContextShot
+
+    def res(source: str, **locals):
+        RendererHTML.templates.pop(f'{session.app}/Test', None)
+        RendererHTML.templates['Test'] = _load_template(source)
+        ctx = Context('Test', shot=ContextShot(), session=session, locals=locals)
+        session.root = ctx
+        ctx.renderer.build()
+        ctx.shot.pop()
+        return ctx
+    yield res
+    RendererHTML.templates.pop('Test', None)
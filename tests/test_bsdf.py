@@ -0,0 +1,91 @@
+import io
+import struct
+from collections import OrderedDict
+from datetime import date
+
+import pytest
+
+from pantra.contrib import bsdf_lite
+
+VALUES = [
+    None, True, False, 0, 1, -1, 32767, -32768, 32768, 2 ** 40, -2 ** 63, 0.5, -1e300,
+    '', 'a', 'текст', 'x' * 252, 'x' * 253, 'x' * 100000,
+    b'', b'\x00\x01' * 300,
+    [], [1, 'a', None], list(range(300)),
+    {}, {'a': 1, 'b': [True, {'c': 'd'}]}, {str(i): i for i in range(300)}, {'k' * 300: 'long key'},
+    OrderedDict(a=1), 3 + 4j,
+]
+
+
+class Name(str):
+    pass
+
+
+class Number(int):
+    pass
+
+
+def legacy(serializer, value) -> bytes:
+    f = io.BytesIO()
+    serializer.save(f, value)
+    return f.getvalue()
+
+
+@pytest.fixture
+def serializer():
+    return bsdf_lite.BsdfLiteSerializer([bsdf_lite.ComplexExtension])
+
+
+@pytest.mark.parametrize('value', VALUES, ids=lambda v: type(v).__name__)
+def test_fast_encoder_matches_legacy(serializer, value):
+    assert serializer.encode(value) == legacy(serializer, value)
+
+
+def test_subclasses(serializer):
+    value = {Name('n'): [Name('tag'), Number(5)]}
+    assert serializer.encode(value) == legacy(serializer, value)
+    assert serializer.encode(value) == serializer.encode({'n': ['tag', 5]})
+
+
+def test_unknown_class(serializer):
+    with pytest.raises(TypeError):
+        serializer.encode(object())
+
+
+def test_extension_values():
+    from pantra.serializer import EXTENSIONS
+    serializer = bsdf_lite.BsdfLiteSerializer(EXTENSIONS, compression='bz2')
+    value = {'d': date(2024, 2, 29), 'l': [date(1999, 12, 31)]}
+    assert serializer.encode(value) == legacy(serializer, value)
+
+
+def legacy_decode(serializer, data: bytes):
+    return serializer.load(io.BytesIO(data))
+
+
+@pytest.mark.parametrize('value', VALUES, ids=lambda v: type(v).__name__)
+def test_decoder_round_trip(serializer, value):
+    data = serializer.encode(value)
+    res = serializer.decode(data)
+    assert res == value
+    assert res == legacy_decode(serializer, data)
+
+
+@pytest.mark.parametrize('wrap', [bytes, bytearray, memoryview, lambda data: memoryview(bytearray(data))])
+def test_decode_buffers(serializer, wrap):
+    value = {'a': ['b', {'a': 1}], 'c': 'd'}
+    assert serializer.decode(wrap(serializer.encode(value))) == value
+
+
+def test_decode_reuses_names(serializer):
+    data = serializer.encode([{'name': i} for i in range(3)])
+    res = serializer.decode(data)
+    assert res[0].keys() == res[2].keys()
+    assert serializer.decode(bytearray(data)) == res
+
+
+def test_decode_errors(serializer):
+    with pytest.raises(RuntimeError):
+        serializer.decode(b'JSON')
+    with pytest.raises((EOFError, struct.error)):
+        serializer.decode(serializer.encode([1, 2])[:-2])
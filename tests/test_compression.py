@@ -0,0 +1,42 @@
+import zlib
+
+import pytest
+from starlette.websockets import WebSocket
+
+from pantra.compression import SUBPROTOCOL, PLAIN_SUBPROTOCOL, FrameCompressor, negotiate_subprotocol
+from pantra.settings import config
+
+
+def make_ws(protocols, extensions=None):
+    headers = [(b'sec-websocket-extensions', extensions.encode())] if extensions else []
+    scope = {'type': 'websocket', 'subprotocols': protocols, 'headers': headers}
+    return WebSocket(scope, None, None)
+
+
+@pytest.mark.parametrize('protocols, extensions, expected', [
+    ([SUBPROTOCOL, PLAIN_SUBPROTOCOL], None, SUBPROTOCOL),
+    ([SUBPROTOCOL, PLAIN_SUBPROTOCOL], 'permessage-deflate; client_max_window_bits', PLAIN_SUBPROTOCOL),
+    ([PLAIN_SUBPROTOCOL], None, PLAIN_SUBPROTOCOL),
+    ([], None, None),
+])
+def test_negotiate(protocols, extensions, expected):
+    ws = make_ws(protocols, extensions)
+    assert negotiate_subprotocol(ws) == expected
+    assert (FrameCompressor.for_websocket(ws) is not None) == (expected == SUBPROTOCOL)
+
+
+def test_no_server_deflate(monkeypatch):
+    config.WS_PER_MESSAGE_DEFLATE
+    monkeypatch.setattr(config, 'WS_PER_MESSAGE_DEFLATE', False)
+    ws = make_ws([SUBPROTOCOL, PLAIN_SUBPROTOCOL], 'permessage-deflate')
+    assert negotiate_subprotocol(ws) == SUBPROTOCOL
+
+
+def test_stream():
+    compressor = FrameCompressor(threshold=16)
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    assert compressor.compress(b'short') == b'short'
+    for frame in (b'<div>frame</div>' * 20, b'<div>frame</div>' * 21):
+        data = compressor.compress(frame)
+        assert data[:1] == b'Z' and int.from_bytes(data[1:5], 'little') == len(frame)
+        assert decompressor.decompress(data[5:]) == frame
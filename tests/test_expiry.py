@@ -0,0 +1,72 @@
+from pantra.expiry import ExpiryHeap
+
+
+def test_pop_due_in_order():
+    heap = ExpiryHeap()
+    for key, deadline in (('c', 3), ('a', 1), ('b', 2)):
+        heap.touch(key, deadline)
+    assert heap.next_deadline() == 1
+    assert heap.pop_due(0) == []
+    assert heap.pop_due(2) == ['a', 'b']
+    assert len(heap) == 1 and 'c' in heap and 'a' not in heap
+    assert heap.pop_due(10) == ['c']
+    assert heap.next_deadline() is None
+
+
+def test_postponed_key_keeps_one_entry():
+    heap = ExpiryHeap()
+    for deadline in range(1, 101):
+        heap.touch('s', deadline)
+    assert len(heap._heap) == 1
+    # the stale entry comes due and is pushed again with the actual deadline
+    assert heap.pop_due(50) == []
+    assert heap.next_deadline() == 100
+    assert len(heap._heap) == 1
+    assert heap.pop_due(100) == ['s']
+
+
+def test_earlier_deadline():
+    heap = ExpiryHeap()
+    heap.touch('s', 100)
+    heap.touch('s', 10)
+    assert heap.next_deadline() == 10
+    assert heap.pop_due(10) == ['s']
+    # the entry of the later deadline is stale now
+    assert heap.pop_due(100) == []
+    assert len(heap._heap) == 0
+
+
+def test_removed_key():
+    heap = ExpiryHeap()
+    heap.touch('a', 1)
+    heap.touch('b', 2)
+    heap.remove('a')
+    heap.remove('missing')
+    assert 'a' not in heap and len(heap) == 1
+    # heap entry is dropped lazily
+    assert heap.next_deadline() == 1
+    assert heap.pop_due(5) == ['b']
+    assert len(heap._heap) == 0
+
+
+def test_touch_after_pop():
+    heap = ExpiryHeap()
+    heap.touch('s', 1)
+    assert heap.pop_due(1) == ['s']
+    heap.touch('s', 5)
+    assert heap.pop_due(4) == []
+    assert heap.pop_due(5) == ['s']
+
+
+def test_stale_duplicates():
+    heap = ExpiryHeap()
+    heap.touch('s', 10)
+    heap.touch('s', 5)
+    heap.touch('s', 20)
+    assert heap.pop_due(6) == []
+    assert heap.pop_due(15) == []
+    # both entries are pushed again with the actual deadline, the key is taken once
+    assert len(heap._heap) == 2
+    assert heap.pop_due(20) == ['s']
+    assert heap.pop_due(100) == []
+    assert len(heap._heap) == 0
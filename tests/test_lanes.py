@@ -0,0 +1,116 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from pantra.workers.lanes import TaskLanes
+
+
+def take(lanes: TaskLanes, n: int) -> list:
+    """take n tasks, releasing each lane right after"""
+    res = []
+    for _ in range(n):
+        lane, item, waited = lanes.get(0)
+        res.append(item)
+        lanes.done(lane)
+    return res
+
+
+def test_lanes_take_turns():
+    lanes = TaskLanes()
+    for i in range(5):
+        lanes.put('busy', f'busy{i}')
+    lanes.put('a', 'a0')
+    lanes.put('b', 'b0')
+    lanes.put('a', 'a1')
+    assert take(lanes, 8) == ['busy0', 'a0', 'b0', 'busy1', 'a1', 'busy2', 'busy3', 'busy4']
+    assert lanes.empty()
+
+
+def test_one_task_of_lane_at_a_time():
+    lanes = TaskLanes()
+    lanes.put('s', 1)
+    lanes.put('s', 2)
+    lanes.put('t', 3)
+    lane, item, _ = lanes.get(0)
+    assert (lane, item) == ('s', 1)
+    assert lanes.get(0)[1] == 3
+    # the lane is busy until done
+    with pytest.raises(queue.Empty):
+        lanes.get(0.01)
+    assert lanes.qsize() == 1 and lanes.ready() == 0
+    lanes.done('s')
+    assert lanes.ready() == 1
+    assert lanes.get(0)[1] == 2
+
+
+def test_no_lane_runs_apart():
+    lanes = TaskLanes()
+    for i in range(3):
+        lanes.put(None, i)
+    taken = [lanes.get(0) for _ in range(3)]
+    assert [item for _, item, _ in taken] == [0, 1, 2]
+    for lane, _, _ in taken:
+        lanes.done(lane)
+    assert lanes.empty() and lanes.ready() == 0
+
+
+def test_wait_time():
+    lanes = TaskLanes()
+    lanes.put('s', 1)
+    time.sleep(0.02)
+    assert lanes.oldest_wait() >= 0.02
+    assert lanes.get(0)[2] >= 0.02
+    assert lanes.oldest_wait() == 0
+
+
+def test_starving():
+    calls = []
+    lanes = TaskLanes(on_starving=lambda: calls.append(1))
+    got = []
+    thread = threading.Thread(target=lambda: got.append(lanes.get(1)))
+    thread.start()
+    while not lanes.idle():
+        time.sleep(0.001)
+    # a thread is waiting already
+    lanes.put('s', 1)
+    thread.join()
+    assert got[0][1] == 1 and not calls
+    lanes.put('t', 2)
+    assert len(calls) == 1
+
+
+def test_serial_across_threads():
+    lanes = TaskLanes()
+    running = {}
+    overlaps = []
+    order = {lane: [] for lane in range(4)}
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                lane, item, _ = lanes.get(0.2)
+            except queue.Empty:
+                return
+            with lock:
+                if running.get(lane):
+                    overlaps.append(lane)
+                running[lane] = True
+            time.sleep(0.001)
+            order[lane].append(item)
+            with lock:
+                running[lane] = False
+            lanes.done(lane)
+
+    for i in range(20):
+        for lane in range(4):
+            lanes.put(lane, i)
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not overlaps
+    assert all(items == list(range(20)) for items in order.values())
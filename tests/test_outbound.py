@@ -0,0 +1,201 @@
+import asyncio
+
+import pytest
+
+from pantra.protocol import Messages
+from pantra.session import Session
+from pantra.settings import config
+from pantra.workers.memory import OutboundQueue, WorkerServer, WorkerClient
+
+
+@pytest.fixture
+def server_worker(monkeypatch):
+    """in-memory listener on the running event loop of the test"""
+    class Worker:
+        listener = WorkerServer.Listener()
+        async_loop = None
+
+    monkeypatch.setattr(Session, 'server_worker', Worker)
+    yield Worker
+    WorkerServer.queues.clear()
+
+
+def run(coro):
+    async def main():
+        Session.server_worker.async_loop = asyncio.get_running_loop()
+        return await coro()
+    return asyncio.run(main())
+
+
+def test_queue_size():
+    async def main():
+        queue = OutboundQueue()
+        for n in (10, 20, 30):
+            await queue.put(b'x' * n)
+        assert queue.size == 60
+        assert await queue.get() == b'x' * 10
+        queue.task_done()
+        assert queue.size == 50
+        queue.clear()
+        assert queue.size == 0 and queue.empty()
+        # cleared messages count as sent
+        await asyncio.wait_for(queue.join(), 1)
+    asyncio.run(main())
+
+
+def test_listener(server_worker):
+    async def main():
+        listener = server_worker.listener
+        client = WorkerClient()
+        client.open_connection('s')
+        assert listener.backlog('s') == 0
+        await listener.send('s', b'x' * 100)
+        assert listener.backlog('s') == 100
+        await listener.discard('s')
+        assert WorkerServer.queues['s'].empty() and listener.backlog('s') == 0
+        client.connection.close()
+        assert 's' not in WorkerServer.queues
+    run(main)
+
+
+def test_no_reader(server_worker, monkeypatch):
+    monkeypatch.setattr(Session, 'unadopted', {'prerendered'})
+
+    async def main():
+        listener = server_worker.listener
+        # client-side is away, it gets the message by replay on reconnect
+        await listener.send('s', b'x' * 100)
+        assert 's' not in WorkerServer.queues
+        await listener.send('prerendered', b'x' * 100)
+        assert listener.backlog('prerendered') == 100
+        # no connection reads it, so the queue goes away
+        await listener.discard('prerendered')
+        assert 'prerendered' not in WorkerServer.queues
+    run(main)
+
+
+def test_last_connection_reclaims_queue(server_worker):
+    async def main():
+        first, second = WorkerClient(), WorkerClient()
+        first.open_connection('s')
+        second.open_connection('s')
+        queue = WorkerServer.queues['s']
+        await server_worker.listener.send('s', b'message')
+        await server_worker.listener.discard('s')
+        assert WorkerServer.queues['s'] is queue and queue.empty()
+        await server_worker.listener.send('s', b'message')
+        first.connection.close()
+        assert queue.readers == 1 and queue.size == 7
+        second.connection.close()
+        assert 's' not in WorkerServer.queues and queue.size == 0
+    run(main)
+
+
+def test_hard_limit_resync(session, render, server_worker, monkeypatch):
+    monkeypatch.setattr(config, 'OUTBOUND_HARD_LIMIT', 1000)
+    monkeypatch.setattr(config, 'RESEND_CHUNK_SIZE', 5)
+    monkeypatch.setattr(config, 'LOCKS_TIMEOUT', 0.01)
+    render('<ul>{{#for i in range(20)}}<li>{{i}}</li>{{/for}}</ul>')
+    session.just_connected = False
+
+    async def main():
+        listener = server_worker.listener
+        WorkerClient().open_connection(session.session_id)
+        await listener.send(session.session_id, b'x' * 2000)
+        await session.send_message(Messages.task_done())
+        # the page goes in background, the caller is not held
+        assert listener.backlog(session.session_id) == 0
+        assert session._resend_task is not None
+        await session._resend_task
+        queue = WorkerServer.queues[session.session_id]
+        frames = []
+        while not queue.empty():
+            frames.append(queue.get_nowait())
+        assert frames[0][:1] == b'S'
+        assert len(frames) > 2
+        assert session._resend_task is None
+    run(main)
+
+
+def test_soft_limit_holds_changes(session, render, server_worker, monkeypatch):
+    monkeypatch.setattr(config, 'OUTBOUND_SOFT_LIMIT', 1000)
+    ctx = render('<div>{{text}}</div>', text='one')
+    div = next(ctx.select('div'))
+
+    async def main():
+        listener = server_worker.listener
+        WorkerClient().open_connection(session.session_id)
+        await listener.send(session.session_id, b'x' * 2000)
+        for text in ('two', 'three'):
+            ctx.locals['text'] = text
+            ctx.renderer.update(div, True)
+            await session.send_shot()
+        assert session._held_shot is not None
+        assert listener.backlog(session.session_id) == 2000
+        queue = WorkerServer.queues[session.session_id]
+        queue.get_nowait()
+        queue.task_done()
+        await session._held_shot
+        # both changes go as one message
+        assert queue.qsize() == 1
+    run(main)
+
+
+def test_resend_counts_toward_hard_limit(session, render, server_worker, monkeypatch):
+    monkeypatch.setattr(config, 'OUTBOUND_HARD_LIMIT', 200)
+    monkeypatch.setattr(config, 'RESEND_CHUNK_SIZE', 5)
+    monkeypatch.setattr(config, 'LOCKS_TIMEOUT', 0.01)
+    render('<ul>{{#for i in range(50)}}<li>{{i}}</li>{{/for}}</ul>')
+    session.just_connected = False
+
+    async def main():
+        listener = server_worker.listener
+        WorkerClient().open_connection(session.session_id)
+        session.start_resend()
+        first = session._resend_task
+        # nobody reads, the page is dropped and started over
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert session._resend_task is not first
+        session._resend_task.cancel()
+        assert listener.backlog(session.session_id) <= config.OUTBOUND_HARD_LIMIT + 1000
+    run(main)
+
+
+def test_replay_counts_toward_hard_limit(session, server_worker, monkeypatch):
+    monkeypatch.setattr(config, 'OUTBOUND_HARD_LIMIT', 1000)
+
+    async def main():
+        listener = server_worker.listener
+        WorkerClient().open_connection(session.session_id)
+        for _ in range(10):
+            session.replay.push(b'x' * 500)
+        await session.resume(0)
+        assert listener.backlog(session.session_id) <= 1000
+        assert session._resend_task is not None
+        session._resend_task.cancel()
+    run(main)
+
+
+def test_held_shot_released_by_timeout(session, render, server_worker, monkeypatch):
+    monkeypatch.setattr(config, 'OUTBOUND_SOFT_LIMIT', 1000)
+    monkeypatch.setattr(config, 'LOCKS_TIMEOUT', 0.01)
+    ctx = render('<div>{{text}}</div>', text='one')
+    div = next(ctx.select('div'))
+
+    async def main():
+        listener = server_worker.listener
+        WorkerClient().open_connection(session.session_id)
+        await listener.send(session.session_id, b'x' * 2000)
+        ctx.locals['text'] = 'two'
+        ctx.renderer.update(div, True)
+        await session.send_shot()
+        held = session._held_shot
+        # client-side doesn't catch up, the shot is held again after timeout
+        await held
+        assert session._held_shot is not None and session._held_shot is not held
+        session.cancel_outbound()
+        with pytest.raises(asyncio.CancelledError):
+            await session._held_shot
+        assert session._held_shot is None
+    run(main)
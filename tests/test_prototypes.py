@@ -0,0 +1,26 @@
+from pantra.compiler import exec_code, prototypes
+
+
+def run(source: str, filename: str = '<test-prototypes>') -> dict:
+    ctx_locals = {}
+    exec_code(compile(source, filename, 'exec'), ctx_locals, source)
+    return ctx_locals
+
+
+def test_reload_replaces_prototype():
+    size = len(prototypes)
+    for n in range(10):
+        assert run(f'value = {n}\nitems = [{n}]')['value'] == n
+    assert len(prototypes) == size + 1
+    assert prototypes['<test-prototypes>'][1] is not None
+    prototypes.pop('<test-prototypes>')
+
+
+def test_instances_get_copies():
+    code = compile('items = []\ndef add(x): items.append(x)', '<test-copies>', 'exec')
+    first, second = {}, {}
+    exec_code(code, first, 'items = []\ndef add(x): items.append(x)')
+    exec_code(code, second, 'items = []\ndef add(x): items.append(x)')
+    first['add'](1)
+    assert first['items'] == [1] and second['items'] == []
+    prototypes.pop('<test-copies>')
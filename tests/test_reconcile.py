@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from pantra.components.render.renderer_base import longest_increasing_subsequence
+
+LIST = """<ul>
+{{#for item in items #item}}
+<li>{{item}}</li>
+{{/for}}
+</ul>"""
+
+
+def apply_shot(children: list[int], shot) -> list[int]:
+    """replay the shot on client-side children OIDs, the same way serializer.js does"""
+    flickering, created, updated, deleted = shot
+
+    def insert(node):
+        anchor = node.rebind_requested
+        node.rebind_requested = False
+        if anchor is not True and anchor and anchor.oid in children:
+            children.insert(children.index(anchor.oid), node.oid)
+        else:
+            children.append(node.oid)
+
+    children = [oid for oid in children if oid not in deleted]
+    for node in updated:
+        if node.rebind_requested:
+            children.remove(node.oid)
+            insert(node)
+    for node in created:
+        if getattr(node, 'name', None) == 'li':
+            insert(node)
+    return children
+
+
+def render_list(render, items):
+    ctx = render(LIST, items=items)
+    ul = next(ctx.select('ul'))
+    loop = next(ctx.select(lambda node: type(node).__name__ == 'LoopNode'))
+    return ctx, ul, loop
+
+
+def client_items(ul, children):
+    by_oid = {li.oid: li for li in ul.select('li')}
+    return [by_oid[oid].text for oid in children]
+
+
+def update(ctx, loop, ul, children, items):
+    ctx.locals['items'] = items
+    ctx.renderer.update(loop, True)
+    children = apply_shot(children, ctx.shot.pop())
+    assert [li.oid for li in ul.select('li')] == children
+    assert client_items(ul, children) == items
+    return children
+
+
+@pytest.mark.parametrize('seq, expected', [
+    ([], 0),
+    ([5], 1),
+    ([0, 1, 2, 3], 4),
+    ([3, 2, 1, 0], 1),
+    ([3, 0, 1, 2], 3),
+    ([0, 8, 4, 12, 2, 10, 6, 14], 4),
+])
+def test_lis(seq, expected):
+    res = longest_increasing_subsequence(seq)
+    assert len(res) == expected
+    values = [seq[i] for i in sorted(res)]
+    assert values == sorted(values)
+
+
+def test_new_items_before_kept(render):
+    ctx, ul, loop = render_list(render, ['C'])
+    children = [li.oid for li in ul.select('li')]
+    c = children[0]
+    children = update(ctx, loop, ul, children, ['A', 'B', 'C'])
+    assert children[-1] == c
+    children = update(ctx, loop, ul, children, ['A', 'D', 'E', 'B', 'C', 'F'])
+    assert children[-2] == c
+
+
+def test_move_one(render):
+    items = list(range(50))
+    ctx, ul, loop = render_list(render, items)
+    children = [li.oid for li in ul.select('li')]
+    ctx.locals['items'] = items = items[-1:] + items[:-1]
+    ctx.renderer.update(loop, True)
+    shot = ctx.shot.pop()
+    assert [node.rebind_requested is not False for node in shot[2]].count(True) == 1
+    assert client_items(ul, apply_shot(children, shot)) == items
+
+
+def test_random_orders(render):
+    rnd = random.Random(1)
+    items = list(range(20))
+    ctx, ul, loop = render_list(render, items)
+    children = [li.oid for li in ul.select('li')]
+    for _ in range(30):
+        items = rnd.sample(range(30), rnd.randint(0, 25))
+        children = update(ctx, loop, ul, children, items)
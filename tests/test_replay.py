@@ -0,0 +1,67 @@
+import struct
+
+from pantra.replay import ReplayBuffer, SEQ_HEADER, SYNC_HEADER
+
+
+def seq_of(frame: bytes) -> int:
+    return struct.unpack('<I', frame[1:5])[0]
+
+
+def test_frames():
+    buffer = ReplayBuffer(1024)
+    first = buffer.push(b'one')
+    sync = buffer.push(b'two', sync=True)
+    assert first[:1] == SEQ_HEADER and sync[:1] == SYNC_HEADER
+    assert [seq_of(first), seq_of(sync)] == [1, 2]
+    assert first[5:] == b'one'
+
+
+def test_ack_and_replay():
+    buffer = ReplayBuffer(1024)
+    frames = [buffer.push(bytes([i])) for i in range(5)]
+    assert buffer.since(0) == frames
+    assert buffer.since(2) == frames[2:]
+    buffer.ack(3)
+    assert len(buffer) == 2
+    assert buffer.since(3) == frames[3:]
+    assert buffer.since(5) == []
+    # frames acknowledged are dropped, client-side asking for them starts over
+    assert buffer.since(1) is None
+    buffer.ack(5)
+    assert len(buffer) == 0 and buffer.since(5) == []
+
+
+def test_unknown_positions():
+    buffer = ReplayBuffer(1024)
+    buffer.push(b'one')
+    assert buffer.since(None) is None
+    assert buffer.since(2) is None
+
+
+def test_size_limit():
+    buffer = ReplayBuffer(30)
+    frames = [buffer.push(b'x' * 5) for i in range(5)]  # 10 bytes each
+    assert len(buffer) == 3
+    assert buffer.since(2) == frames[2:]
+    assert buffer.since(1) is None
+    buffer.push(b'x' * 100)
+    assert len(buffer) == 0
+    assert buffer.since(5) is None
+
+
+def test_sync_drops_previous():
+    buffer = ReplayBuffer(1024)
+    for i in range(3):
+        buffer.push(b'old')
+    sync = buffer.push(b'new', sync=True)
+    assert len(buffer) == 1
+    assert buffer.since(3) == [sync]
+    assert buffer.since(2) is None
+
+
+def test_disabled():
+    buffer = ReplayBuffer(0)
+    buffer.push(b'one')
+    assert len(buffer) == 0
+    assert buffer.since(1) == []
+    assert buffer.since(0) is None
@@ -0,0 +1,43 @@
+import gc
+
+from pantra.protocol import Messages
+from pantra.serializer import serializer
+
+TABLE = """<table>
+{{#for row in rows #row}}
+<tr><td>{{row}}</td><td><b>{{row}}</b></td></tr>
+{{/for}}
+</table>"""
+
+
+def send_all(session, ctx):
+    return serializer.encode(Messages.update(list(session.iter_rendered(ctx))))
+
+
+def test_states_dropped_with_subtree(session, render):
+    ctx = render(TABLE, rows=list(range(10)))
+    send_all(session, ctx)
+    assert len(session.sent_states) == 41
+
+    loop = next(ctx.select(lambda node: type(node).__name__ == 'LoopNode'))
+    for n in range(3):
+        ctx.locals['rows'] = list(range(100 * (n + 1), 100 * (n + 1) + 10))
+        ctx.renderer.update(loop, True)
+        flickering, created, updated, deleted = ctx.shot.pop()
+        assert len(deleted) == 40
+        serializer.encode(Messages.shot(deleted, updated, created))
+        gc.collect()
+        assert len(session.sent_states) == 41
+
+
+def test_changes_only(session, render):
+    ctx = render('<div class="a" title="{title}">text</div>', title='one')
+    full = send_all(session, ctx)
+    div = next(ctx.select('div'))
+    div.classes += 'b'
+    ctx.locals['title'] = 'two'
+    ctx.renderer.update(div, True)
+    patch = send_all(session, ctx)
+    assert len(patch) < len(full)
+    session.sent_states.clear()
+    assert len(send_all(session, ctx)) > len(patch)
@@ -0,0 +1,64 @@
+import pytest
+
+from pantra.contrib import bsdf_lite
+
+
+@pytest.fixture
+def encoder():
+    return bsdf_lite.BsdfLiteSerializer().with_strings(4096, ('n',))
+
+
+@pytest.fixture
+def decoder():
+    return bsdf_lite.BsdfLiteSerializer()
+
+
+def key_size(encoder, key: str) -> int:
+    """bytes taken by the key in a one-item dict"""
+    return len(encoder.encode({key: None})) - len(encoder.encode({})) - 1
+
+
+@pytest.mark.parametrize('size', [2, 250, 251, 252, 253, 254, 255, 300, 70000])
+def test_key_sizes(encoder, decoder, size):
+    key = 'k' * size
+    messages = [encoder.encode({key: i}) for i in range(3)]
+    assert [decoder.decode(message) for message in messages] == [{key: i} for i in range(3)]
+    assert len(messages[1]) < len(messages[0])
+    assert len(messages[1]) == len(messages[2])
+
+
+def test_index_sizes(encoder):
+    for i in range(251):
+        encoder.encode({f'key{i}': None})
+    assert key_size(encoder, 'key0') == 2          # 254 + index
+    assert key_size(encoder, 'key250') == 2
+    assert key_size(encoder, 'new') == 1 + 3 + 1 + 3  # 255 + 251 + uint16 + size + name
+    assert key_size(encoder, 'new') == 4           # 254 + 251 + uint16
+
+
+def test_one_byte_strings_not_interned(encoder):
+    encoder.encode({'a': None, 'n': 'b'})
+    assert encoder._strings == {}
+
+
+def test_value_keys(encoder, decoder):
+    messages = [encoder.encode({'n': 'div', 'text': 'div'}) for i in range(2)]
+    assert len(messages[1]) < len(messages[0])
+    assert [decoder.decode(message) for message in messages] == [{'n': 'div', 'text': 'div'}] * 2
+    encoder.encode({'n': ['row', 'cell']})
+    assert {'row', 'cell'} <= encoder._strings.keys()
+
+
+def test_table_full(decoder):
+    encoder = bsdf_lite.BsdfLiteSerializer().with_strings(2)
+    message = {'first': 1, 'second': 2, 'third': 3}
+    assert decoder.decode(encoder.encode(message)) == message
+    assert list(encoder._strings) == ['first', 'second']
+    assert decoder.decode(encoder.encode(message)) == message
+
+
+def test_reset(encoder, decoder):
+    assert decoder.decode(encoder.encode({'old': 1})) == {'old': 1}
+    encoder.reset_strings()
+    assert decoder.decode(encoder.encode({'new': 2})) == {'new': 2}
+    assert decoder.decode(encoder.encode({'new': 3})) == {'new': 3}
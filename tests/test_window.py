@@ -0,0 +1,45 @@
+import pytest
+
+LIST = """<ul>
+{{#for:window=windowed item in items}}
+<li>{{item}}</li>
+{{/for}}
+</ul>"""
+
+
+def find_loop(ctx):
+    return next(ctx.select(lambda node: type(node).__name__.endswith('LoopNode')))
+
+
+def rendered(ctx):
+    return [li.text for li in ctx.select('li')]
+
+
+def test_flag_off(render):
+    ctx = render(LIST, items=list(range(100)), windowed=False)
+    assert type(find_loop(ctx)).__name__ == 'LoopNode'
+    assert len(rendered(ctx)) == 100
+
+
+def test_window_shift(render):
+    ctx = render(LIST, items=list(range(1000)), windowed=True)
+    loop = find_loop(ctx)
+    assert type(loop).__name__ == 'WindowLoopNode'
+    length = loop.size + 2 * loop.overscan
+    assert rendered(ctx) == list(range(length))
+    assert loop.total == 1000
+
+    loop.set_window(500, 10)
+    first = 500 - loop.overscan
+    assert loop.first == first
+    assert rendered(ctx) == list(range(first, first + 10 + 2 * loop.overscan))
+
+    # tail is kept full when scrolled beyond the end
+    loop.set_window(2000, 10)
+    assert rendered(ctx)[-1] == 999
+    assert len(rendered(ctx)) == 10 + 2 * loop.overscan
+
+
+def test_requires_sequence(render):
+    with pytest.raises(TypeError):
+        render(LIST, items=iter(range(10)), windowed=True)